@@ -7,26 +7,49 @@ from fastapi.responses import ORJSONResponse
 
 from app.api.schemas import ErrorResponse
 from app.logic.balances.exceptions import BalanceAlreadyExistError, BalanceMerchantDoesNotExistError
-from app.logic.merchants.exceptions import MerchantAlreadyExistError, MerchantDoesNotExistError
+from app.logic.merchants.exceptions import (
+    MerchantAlreadyExistError,
+    MerchantDoesNotExistError,
+    MerchantsBulkLimitError,
+)
 from app.logic.transfers.exceptions import (
+    TransferArchiveError,
     TransferBalanceDoesNotExistError,
+    TransferConflictError,
+    TransferIdempotencyKeyConflictError,
     TransferInsufficientFundsError,
+    TransferInvalidCursorError,
     TransferMerchantDoesNotExistError,
 )
 
+EXCEPTION_STATUS_CODES = {
+    MerchantAlreadyExistError: 409,
+    BalanceAlreadyExistError: 409,
+    BalanceMerchantDoesNotExistError: 404,
+    MerchantDoesNotExistError: 404,
+    MerchantsBulkLimitError: 400,
+    TransferMerchantDoesNotExistError: 404,
+    TransferBalanceDoesNotExistError: 404,
+    TransferInsufficientFundsError: 400,
+    TransferConflictError: 409,
+    TransferIdempotencyKeyConflictError: 409,
+    TransferInvalidCursorError: 400,
+    TransferArchiveError: 503,
+}
+
 
 def register_exceptions(app: FastAPI):
     app.add_exception_handler(Exception, partial_handler(500))
-    app.add_exception_handler(MerchantAlreadyExistError, partial_handler(409))
-    app.add_exception_handler(BalanceAlreadyExistError, partial_handler(409))
-    app.add_exception_handler(BalanceMerchantDoesNotExistError, partial_handler(404))
-    app.add_exception_handler(MerchantDoesNotExistError, partial_handler(404))
-    app.add_exception_handler(TransferMerchantDoesNotExistError, partial_handler(404))
-    app.add_exception_handler(TransferBalanceDoesNotExistError, partial_handler(404))
-    app.add_exception_handler(TransferInsufficientFundsError, partial_handler(400))
+    for exc_class, status_code in EXCEPTION_STATUS_CODES.items():
+        app.add_exception_handler(exc_class, partial_handler(status_code))
     app.add_exception_handler(RequestValidationError, pydantic_handler)
 
 
+def exception_to_response(exc: Exception) -> ErrorResponse:
+    status_code = EXCEPTION_STATUS_CODES.get(type(exc), 500)
+    return ErrorResponse(status=status_code, error=str(exc))
+
+
 def partial_handler(status_code: int) -> Callable[..., Awaitable[ORJSONResponse]]:
     return partial(exception_handler, status_code=status_code)
 
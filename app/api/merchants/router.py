@@ -1,12 +1,37 @@
-from fastapi import APIRouter
+from typing import Annotated
 
-from app.api.merchants.schemas import CreateBalanceRequest, CreateMerchantRequest
-from app.api.schemas import OkResponse
+from fastapi import APIRouter, Query, Request
+
+from app.api.exceptions import exception_to_response
+from app.api.merchants.schemas import (
+    CreateBalanceRequest,
+    CreateBalancesBulkRequest,
+    CreateMerchantRequest,
+    CreateMerchantsBulkRequest,
+)
+from app.api.responses import DomainJSONResponse, make_etag, not_modified
+from app.api.schemas import ErrorResponse, OkResponse
+from app.domain.balances import Balance
+from app.domain.merchants import Merchant
 from app.logic.factories import balance_service_factory, merchant_service_factory
 
 router = APIRouter(prefix="/merchants", tags=["Merchants"])
 
 
+def to_item_response(item) -> OkResponse | ErrorResponse:
+    return exception_to_response(item) if isinstance(item, Exception) else OkResponse(result=item)
+
+
+def balances_version(balances: list[Balance]) -> list[tuple]:
+    # summed shard versions grow with every write to the currency
+    return sorted((balance.currency, balance.version) for balance in balances)
+
+
+def merchants_version(merchants: list[Merchant]) -> tuple:
+    # an insert or update moves the last update forward, archiving lowers the count
+    return len(merchants), max((merchant.updated for merchant in merchants), default=None)
+
+
 @router.post("/")
 async def create_merchant(payload: CreateMerchantRequest) -> OkResponse:
     merchant_service = merchant_service_factory()
@@ -14,25 +39,67 @@ async def create_merchant(payload: CreateMerchantRequest) -> OkResponse:
     return OkResponse(result=res)
 
 
-@router.get("/")
-async def get_merchants() -> OkResponse:
+@router.post("/bulk")
+async def create_merchants_bulk(payload: CreateMerchantsBulkRequest) -> OkResponse:
     merchant_service = merchant_service_factory()
+    res = await merchant_service.create_merchants(
+        [merchant.model_dump() for merchant in payload.merchants]
+    )
+    return OkResponse(result=[to_item_response(item) for item in res])
+
+
+@router.get("/", response_class=DomainJSONResponse)
+async def get_merchants(request: Request) -> DomainJSONResponse:
+    merchant_service = merchant_service_factory()
+    # the current version answers revalidation without loading the list, a full response
+    # is tagged from its own rows as it may come from a shared or cached read
+    if response := not_modified(
+        request, make_etag(*await merchant_service.get_merchants_version())
+    ):
+        return response
+
     res = await merchant_service.get_merchants()
-    return OkResponse(result=res)
+    return DomainJSONResponse(
+        OkResponse(result=res), headers={"ETag": make_etag(*merchants_version(res))}
+    )
+
+
+@router.get("/balances", response_class=DomainJSONResponse)
+async def get_many_merchants_with_balances(
+    names: Annotated[str, Query(min_length=1, description="Comma-separated merchant names")],
+) -> DomainJSONResponse:
+    merchant_service = merchant_service_factory()
+    merchant_names = list(dict.fromkeys(name.strip() for name in names.split(",") if name.strip()))
+    res = await merchant_service.get_many_merchants_with_balances(merchant_names=merchant_names)
+    return DomainJSONResponse(OkResponse(result=res))
 
 
-@router.get("/{merchant_name}")
-async def get_merchants_with_balances(merchant_name: str) -> OkResponse:
+@router.get("/{merchant_name}", response_class=DomainJSONResponse)
+async def get_merchants_with_balances(merchant_name: str, request: Request) -> DomainJSONResponse:
     merchant_service = merchant_service_factory()
+    # like the list, revalidation is answered from the version query alone
+    version = await merchant_service.get_merchant_version(merchant_name)
+    if version and (response := not_modified(request, make_etag(*version))):
+        return response
+
     res = await merchant_service.get_merchants_with_balances(merchant_name=merchant_name)
-    return OkResponse(result=res)
+    return DomainJSONResponse(
+        OkResponse(result=res),
+        headers={"ETag": make_etag(res.id, res.updated, balances_version(res.balances))},
+    )
 
 
-@router.get("/{merchant_name}/balance")
-async def get_merchant_balances(merchant_name: str) -> OkResponse:
+@router.get("/{merchant_name}/balance", response_class=DomainJSONResponse)
+async def get_merchant_balances(merchant_name: str, request: Request) -> DomainJSONResponse:
     balance_service = balance_service_factory()
+    version = await balance_service.get_balances_version(merchant_name)
+    if version is not None and (response := not_modified(request, make_etag(version))):
+        return response
+
     res = await balance_service.get_balances(merchant_name=merchant_name)
-    return OkResponse(result=res)
+    return DomainJSONResponse(
+        OkResponse(result=res), headers={"ETag": make_etag(balances_version(res))}
+    )
 
 
 @router.post("/balance")
@@ -40,3 +107,12 @@ async def create_balance(payload: CreateBalanceRequest) -> OkResponse:
     balance_service = balance_service_factory()
     res = await balance_service.create_balance(payload.model_dump())
     return OkResponse(result=res)
+
+
+@router.post("/balance/bulk")
+async def create_balances_bulk(payload: CreateBalancesBulkRequest) -> OkResponse:
+    balance_service = balance_service_factory()
+    res = await balance_service.create_balances(
+        [balance.model_dump() for balance in payload.balances]
+    )
+    return OkResponse(result=[to_item_response(item) for item in res])
@@ -3,13 +3,28 @@ from uuid import UUID
 
 from pydantic import BaseModel, Field
 
+from app.infra.config import settings
+
 
 class CreateMerchantRequest(BaseModel):
     name: str
     percent_fee: Decimal = Field(gt=0, le=100)
+    balance_shards: int = Field(default=1, ge=1, le=settings.balance_max_shards)
 
 
 class CreateBalanceRequest(BaseModel):
     merchant_id: UUID
     currency: str
     amount: Decimal = Field(alias="initial_amount", ge=0)
+
+
+class CreateMerchantsBulkRequest(BaseModel):
+    merchants: list[CreateMerchantRequest] = Field(
+        min_length=1, max_length=settings.merchants_bulk_create_max_size
+    )
+
+
+class CreateBalancesBulkRequest(BaseModel):
+    balances: list[CreateBalanceRequest] = Field(
+        min_length=1, max_length=settings.merchants_bulk_create_max_size
+    )
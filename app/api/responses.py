@@ -0,0 +1,44 @@
+import hashlib
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def default(obj: Any) -> str:
+    if isinstance(obj, Decimal):
+        return f"{obj:.8f}"
+    raise TypeError
+
+
+class DomainJSONResponse(Response):
+    """Renders domain dataclasses straight to JSON bytes.
+
+    orjson handles dataclasses, UUID and datetime natively, Decimal is written with
+    8 places like ``normalize_decimal`` does. UTC datetimes end in Z, as pydantic
+    renders them.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=default, option=orjson.OPT_UTC_Z)
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from the parts that change whenever the resource does."""
+    return f'"{hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()}"'
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """304 response when the client already has the version tagged etag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    # If-None-Match uses the weak comparison
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in tags or etag in tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
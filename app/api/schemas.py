@@ -15,3 +15,8 @@ class OkResponse(Generic[TResult]):
 class ErrorResponse(Generic[TError]):
     status: int = 500
     error: TError = None
+
+
+@dataclass
+class PageResponse(OkResponse[TResult]):
+    next_cursor: str | None = None
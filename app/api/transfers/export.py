@@ -0,0 +1,39 @@
+import csv
+import dataclasses
+import io
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+import orjson
+
+from app.api.responses import default
+from app.domain.transfers import TransferWithMerchant
+from app.logic.utils import normalize_decimal
+
+CSV_FIELDS = [field.name for field in dataclasses.fields(TransferWithMerchant)]
+
+
+def csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return normalize_decimal(value)
+
+
+async def to_ndjson(chunks: AsyncIterator[list[TransferWithMerchant]]) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        yield b"".join(orjson.dumps(transfer, default=default) + b"\n" for transfer in chunk)
+
+
+async def to_csv(chunks: AsyncIterator[list[TransferWithMerchant]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    async for chunk in chunks:
+        for transfer in chunk:
+            writer.writerow([csv_value(getattr(transfer, field)) for field in CSV_FIELDS])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
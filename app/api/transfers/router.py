@@ -1,9 +1,15 @@
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, Literal
 
 from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
 
-from app.api.schemas import OkResponse
-from app.api.transfers.schemas import CreateTransferRequest
+from app.api.exceptions import exception_to_response
+from app.api.responses import DomainJSONResponse
+from app.api.schemas import OkResponse, PageResponse
+from app.api.transfers.export import to_csv, to_ndjson
+from app.api.transfers.schemas import CreateTransferBatchRequest, CreateTransferRequest
+from app.infra.config import settings
 from app.logic.factories import transfer_service_factory
 
 router = APIRouter(prefix="/transfers", tags=["Transfers"])
@@ -21,16 +27,74 @@ async def create_transfer(
     return OkResponse(result=res)
 
 
-@router.get("/")
+@router.post("/batch")
+async def create_transfers_batch(payload: CreateTransferBatchRequest) -> OkResponse:
+    transfer_service = transfer_service_factory()
+    res = await transfer_service.create_transfers_batch(
+        items=[item.model_dump() for item in payload.transfers]
+    )
+    return OkResponse(
+        result=[
+            exception_to_response(item) if isinstance(item, Exception) else OkResponse(result=item)
+            for item in res
+        ]
+    )
+
+
+@router.get("/", response_class=DomainJSONResponse)
 async def get_transfers(
     from_merchant: Annotated[str | None, Query(alias="from")] = None,
     to_merchant: Annotated[str | None, Query(alias="to")] = None,
     currency: str | None = None,
-) -> OkResponse:
+    limit: Annotated[int, Query(ge=1, le=settings.transfers_page_max_size)] = (
+        settings.transfers_page_size
+    ),
+    cursor: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    include_archived: bool = False,
+) -> DomainJSONResponse:
     transfer_service = transfer_service_factory()
-    res = await transfer_service.get_transfers(
+    res, next_cursor = await transfer_service.get_transfers(
+        limit=limit,
+        cursor=cursor,
         from_merchant=from_merchant,
         to_merchant=to_merchant,
         currency=currency,
+        created_from=created_from,
+        created_to=created_to,
+        include_archived=include_archived,
+    )
+    return DomainJSONResponse(PageResponse(result=res, next_cursor=next_cursor))
+
+
+EXPORT_FORMATS = {
+    "ndjson": (to_ndjson, "application/x-ndjson"),
+    "csv": (to_csv, "text/csv"),
+}
+
+
+@router.get("/export")
+async def export_transfers(
+    from_merchant: Annotated[str | None, Query(alias="from")] = None,
+    to_merchant: Annotated[str | None, Query(alias="to")] = None,
+    currency: str | None = None,
+    export_format: Annotated[Literal["ndjson", "csv"], Query(alias="format")] = "ndjson",
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> StreamingResponse:
+    transfer_service = transfer_service_factory()
+    chunks = transfer_service.stream_transfers(
+        chunk_size=settings.transfers_export_chunk_size,
+        from_merchant=from_merchant,
+        to_merchant=to_merchant,
+        currency=currency,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    encode, media_type = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        encode(chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transfers.{export_format}"'},
     )
-    return OkResponse(result=res)
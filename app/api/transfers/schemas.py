@@ -1,7 +1,10 @@
+from datetime import datetime
 from decimal import Decimal
 
 from pydantic import BaseModel, Field, model_validator
 
+from app.infra.config import settings
+
 
 class CreateTransferRequest(BaseModel):
     from_merchant: str
@@ -14,3 +17,19 @@ class CreateTransferRequest(BaseModel):
         if self.from_merchant == self.to_merchant:
             raise ValueError("Cannot transfer to the same merchant")
         return self
+
+
+class CreateTransferBatchItem(CreateTransferRequest):
+    idempotency_key: str = Field(min_length=1)
+
+
+class CreateTransferBatchRequest(BaseModel):
+    transfers: list[CreateTransferBatchItem] = Field(
+        min_length=1, max_length=settings.transfer_batch_max_size
+    )
+
+
+class ImportTransferRow(CreateTransferBatchItem):
+    created: datetime | None = None
+    # fee of the historical transfer, the sender's current fee when missing
+    percent_fee: Decimal | None = Field(default=None, ge=0, le=100)
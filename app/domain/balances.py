@@ -5,8 +5,10 @@ from uuid import UUID
 from app.domain.base import BaseEntity
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Balance(BaseEntity):
     merchant_id: UUID
     currency: str
     amount: Decimal
+    shard: int
+    version: int
@@ -3,7 +3,7 @@ import datetime
 from uuid import UUID
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class BaseEntity:
     id: UUID
     created: datetime
@@ -1,10 +1,17 @@
 import dataclasses
 from decimal import Decimal
 
+from app.domain.balances import Balance
 from app.domain.base import BaseEntity
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Merchant(BaseEntity):
     name: str
     percent_fee: Decimal
+    balance_shards: int
+
+
+@dataclasses.dataclass(slots=True)
+class MerchantWithBalances(Merchant):
+    balances: list[Balance]
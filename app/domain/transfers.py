@@ -5,7 +5,7 @@ from uuid import UUID
 from app.domain.base import BaseEntity
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Transfer(BaseEntity):
     from_merchant_id: UUID
     to_merchant_id: UUID
@@ -13,3 +13,13 @@ class Transfer(BaseEntity):
     currency: str
     percent_fee: Decimal
     idempotency_key: str
+
+
+@dataclasses.dataclass(slots=True)
+class TransferWithMerchant(BaseEntity):
+    from_merchant: str
+    to_merchant: str
+    amount: Decimal
+    percent_fee: Decimal
+    currency: str
+    idempotency_key: str
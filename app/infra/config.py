@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import Field, computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -20,6 +22,73 @@ class Settings(BaseSettings):
     redis_port: int = Field(default=6379, alias="REDIS_PORT")
     redis_db: int = Field(default=0, alias="REDIS_DB")
 
+    transfer_mode: Literal["locking", "conditional", "optimistic"] = Field(
+        default="locking", alias="TRANSFER_MODE"
+    )
+    transfer_optimistic_max_retries: int = Field(default=5, alias="TRANSFER_OPTIMISTIC_MAX_RETRIES")
+    transfer_optimistic_backoff_ms: float = Field(
+        default=5.0, alias="TRANSFER_OPTIMISTIC_BACKOFF_MS"
+    )
+    lock_backend: Literal["redis", "postgres", "local"] = Field(
+        default="redis", alias="LOCK_BACKEND"
+    )
+    lock_coalescing_enabled: bool = Field(default=True, alias="LOCK_COALESCING_ENABLED")
+    db_fast_path: bool = Field(default=False, alias="DB_FAST_PATH")
+    balance_max_shards: int = Field(default=64, alias="BALANCE_MAX_SHARDS")
+    transfers_page_size: int = Field(default=100, alias="TRANSFERS_PAGE_SIZE")
+    transfers_page_max_size: int = Field(default=1000, alias="TRANSFERS_PAGE_MAX_SIZE")
+    merchants_bulk_max_names: int = Field(default=1000, alias="MERCHANTS_BULK_MAX_NAMES")
+    merchants_bulk_create_max_size: int = Field(
+        default=10000, alias="MERCHANTS_BULK_CREATE_MAX_SIZE"
+    )
+    transfers_export_chunk_size: int = Field(default=1000, alias="TRANSFERS_EXPORT_CHUNK_SIZE")
+    transfers_import_chunk_size: int = Field(default=10000, alias="TRANSFERS_IMPORT_CHUNK_SIZE")
+    transfers_partition_maintenance_enabled: bool = Field(
+        default=True, alias="TRANSFERS_PARTITION_MAINTENANCE_ENABLED"
+    )
+    transfers_partitions_ahead_months: int = Field(
+        default=3, alias="TRANSFERS_PARTITIONS_AHEAD_MONTHS"
+    )
+    transfers_partition_check_interval_seconds: float = Field(
+        default=3600, alias="TRANSFERS_PARTITION_CHECK_INTERVAL_SECONDS"
+    )
+    transfers_archive_enabled: bool = Field(default=False, alias="TRANSFERS_ARCHIVE_ENABLED")
+    transfers_archive_dir: str = Field(default="archive/transfers", alias="TRANSFERS_ARCHIVE_DIR")
+    transfers_archive_retention_days: int = Field(
+        default=365, alias="TRANSFERS_ARCHIVE_RETENTION_DAYS"
+    )
+    transfers_archive_batch_size: int = Field(default=50000, alias="TRANSFERS_ARCHIVE_BATCH_SIZE")
+    transfers_archive_interval_seconds: float = Field(
+        default=86400, alias="TRANSFERS_ARCHIVE_INTERVAL_SECONDS"
+    )
+    transfer_batch_max_size: int = Field(default=1000, alias="TRANSFER_BATCH_MAX_SIZE")
+    transfer_group_commit_enabled: bool = Field(
+        default=False, alias="TRANSFER_GROUP_COMMIT_ENABLED"
+    )
+    transfer_group_commit_window_ms: float = Field(
+        default=2.0, alias="TRANSFER_GROUP_COMMIT_WINDOW_MS"
+    )
+    transfer_group_commit_max_items: int = Field(
+        default=64, alias="TRANSFER_GROUP_COMMIT_MAX_ITEMS"
+    )
+
+    idempotency_cache_enabled: bool = Field(default=True, alias="IDEMPOTENCY_CACHE_ENABLED")
+    idempotency_cache_ttl_seconds: int = Field(default=86400, alias="IDEMPOTENCY_CACHE_TTL_SECONDS")
+    idempotency_local_cache_size: int = Field(default=10000, alias="IDEMPOTENCY_LOCAL_CACHE_SIZE")
+
+    merchant_cache_enabled: bool = Field(default=True, alias="MERCHANT_CACHE_ENABLED")
+    merchant_cache_size: int = Field(default=10000, alias="MERCHANT_CACHE_SIZE")
+    merchant_cache_ttl_seconds: int = Field(default=60, alias="MERCHANT_CACHE_TTL_SECONDS")
+    balance_snapshot_cache_enabled: bool = Field(
+        default=True, alias="BALANCE_SNAPSHOT_CACHE_ENABLED"
+    )
+    balance_snapshot_ttl_seconds: int = Field(default=30, alias="BALANCE_SNAPSHOT_TTL_SECONDS")
+    redis_client_cache_size: int = Field(default=10000, alias="REDIS_CLIENT_CACHE_SIZE")
+    redis_client_cache_ttl_seconds: int = Field(default=60, alias="REDIS_CLIENT_CACHE_TTL_SECONDS")
+    single_flight_enabled: bool = Field(default=True, alias="SINGLE_FLIGHT_ENABLED")
+    single_flight_result_ttl_ms: int = Field(default=0, alias="SINGLE_FLIGHT_RESULT_TTL_MS")
+    single_flight_max_size: int = Field(default=1000, alias="SINGLE_FLIGHT_MAX_SIZE")
+
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     json_logs: bool = Field(default=False, alias="JSON_LOGS")
 
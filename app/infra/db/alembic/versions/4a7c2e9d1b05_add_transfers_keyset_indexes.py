@@ -0,0 +1,46 @@
+"""add transfers keyset indexes
+
+Revision ID: 4a7c2e9d1b05
+Revises: d51a3c8e0b7f
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4a7c2e9d1b05"
+down_revision: Union[str, Sequence[str], None] = "d51a3c8e0b7f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("transfers_created_id_idx", "transfers", ["created", "id"])
+    op.create_index(
+        "transfers_from_merchant_id_created_id_idx",
+        "transfers",
+        ["from_merchant_id", "created", "id"],
+    )
+    op.create_index(
+        "transfers_to_merchant_id_created_id_idx",
+        "transfers",
+        ["to_merchant_id", "created", "id"],
+    )
+    op.create_index("transfers_currency_created_id_idx", "transfers", ["currency", "created", "id"])
+    # the composite indexes cover lookups by merchant id
+    op.drop_index("transfers_from_merchant_id_idx", table_name="transfers")
+    op.drop_index("transfers_to_merchant_id_idx", table_name="transfers")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("transfers_from_merchant_id_idx", "transfers", ["from_merchant_id"])
+    op.create_index("transfers_to_merchant_id_idx", "transfers", ["to_merchant_id"])
+    op.drop_index("transfers_currency_created_id_idx", table_name="transfers")
+    op.drop_index("transfers_to_merchant_id_created_id_idx", table_name="transfers")
+    op.drop_index("transfers_from_merchant_id_created_id_idx", table_name="transfers")
+    op.drop_index("transfers_created_id_idx", table_name="transfers")
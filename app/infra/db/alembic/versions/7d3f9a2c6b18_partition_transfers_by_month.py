@@ -0,0 +1,152 @@
+"""partition transfers by month
+
+Revision ID: 7d3f9a2c6b18
+Revises: 4a7c2e9d1b05
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from datetime import UTC, date, datetime
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7d3f9a2c6b18"
+down_revision: Union[str, Sequence[str], None] = "4a7c2e9d1b05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD = 3
+
+COLUMNS = (
+    "id, created, updated, archived, from_merchant_id, to_merchant_id, amount, percent_fee, "
+    "currency, idempotency_key"
+)
+
+
+def create_transfers_table(name: str, partitioned: bool) -> None:
+    op.create_table(
+        name,
+        sa.Column("id", sa.UUID(), server_default=sa.text("uuid_generate_v4()"), nullable=False),
+        sa.Column(
+            "created",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("(now() at time zone 'utc')"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("(now() at time zone 'utc')"),
+            nullable=False,
+        ),
+        sa.Column("archived", sa.Boolean(), server_default="false", nullable=False),
+        sa.Column("from_merchant_id", sa.UUID(), nullable=False),
+        sa.Column("to_merchant_id", sa.UUID(), nullable=False),
+        sa.Column("amount", sa.NUMERIC(precision=12, scale=8), nullable=False),
+        sa.Column("percent_fee", sa.NUMERIC(precision=12, scale=2), nullable=False),
+        sa.Column("currency", sa.String(), nullable=False),
+        sa.Column("idempotency_key", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["from_merchant_id"], ["merchants.id"], name="transfers_from_merchants_id_fk"
+        ),
+        sa.ForeignKeyConstraint(
+            ["to_merchant_id"], ["merchants.id"], name="transfers_to_merchants_id_fk"
+        ),
+        sa.PrimaryKeyConstraint(
+            *(("id", "created") if partitioned else ("id",)), name="transfers_pkey"
+        ),
+        postgresql_partition_by="RANGE (created)" if partitioned else None,
+    )
+
+
+def create_transfers_indexes(partitioned: bool) -> None:
+    op.create_index("transfers_created_id_idx", "transfers", ["created", "id"])
+    op.create_index(
+        "transfers_from_merchant_id_created_id_idx",
+        "transfers",
+        ["from_merchant_id", "created", "id"],
+    )
+    op.create_index(
+        "transfers_to_merchant_id_created_id_idx",
+        "transfers",
+        ["to_merchant_id", "created", "id"],
+    )
+    op.create_index("transfers_currency_created_id_idx", "transfers", ["currency", "created", "id"])
+    if partitioned:
+        op.create_index("transfers_idempotency_key_idx", "transfers", ["idempotency_key"])
+    else:
+        op.create_index(
+            "transfers_idempotency_key_uq_idx", "transfers", ["idempotency_key"], unique=True
+        )
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.rename_table("transfers", "transfers_old")
+    op.execute("ALTER INDEX transfers_pkey RENAME TO transfers_old_pkey")
+
+    create_transfers_table("transfers", partitioned=True)
+    first_created = (
+        op.get_bind().execute(sa.text("SELECT min(created) FROM transfers_old")).scalar()
+    )
+    now = datetime.now(UTC)
+    month = (first_created.astimezone(UTC) if first_created else now).date().replace(day=1)
+    last_month = now.date().replace(day=1)
+    for _ in range(PARTITIONS_AHEAD):
+        last_month = next_month(last_month)
+    while month <= last_month:
+        op.execute(
+            f"CREATE TABLE transfers_p{month:%Y%m} PARTITION OF transfers "
+            f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{next_month(month)} 00:00:00+00')"
+        )
+        month = next_month(month)
+    op.execute("CREATE TABLE transfers_default PARTITION OF transfers DEFAULT")
+
+    op.create_table(
+        "transfer_idempotency_keys",
+        sa.Column("idempotency_key", sa.String(), nullable=False),
+        sa.Column("transfer_id", sa.UUID(), nullable=False),
+        sa.Column("created", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("idempotency_key"),
+    )
+    op.execute(
+        "INSERT INTO transfer_idempotency_keys (idempotency_key, transfer_id, created) "
+        "SELECT idempotency_key, id, created FROM transfers_old"
+    )
+    op.execute(f"INSERT INTO transfers ({COLUMNS}) SELECT {COLUMNS} FROM transfers_old")
+    op.drop_table("transfers_old")
+    create_transfers_indexes(partitioned=True)
+
+    op.execute(
+        "CREATE OR REPLACE FUNCTION insert_transfer_idempotency_keys() RETURNS trigger AS $$ "
+        "BEGIN "
+        "INSERT INTO transfer_idempotency_keys (idempotency_key, transfer_id, created) "
+        "SELECT idempotency_key, id, created FROM new_transfers; "
+        "RETURN NULL; "
+        "END $$ LANGUAGE plpgsql"
+    )
+    op.execute(
+        "CREATE TRIGGER transfers_idempotency_keys_trg AFTER INSERT ON transfers "
+        "REFERENCING NEW TABLE AS new_transfers "
+        "FOR EACH STATEMENT EXECUTE FUNCTION insert_transfer_idempotency_keys()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # rows of detached partitions are not brought back
+    op.rename_table("transfers", "transfers_partitioned")
+    op.execute("ALTER INDEX transfers_pkey RENAME TO transfers_partitioned_pkey")
+    create_transfers_table("transfers", partitioned=False)
+    op.execute(f"INSERT INTO transfers ({COLUMNS}) SELECT {COLUMNS} FROM transfers_partitioned")
+    op.drop_table("transfers_partitioned")
+    op.execute("DROP FUNCTION insert_transfer_idempotency_keys()")
+    op.drop_table("transfer_idempotency_keys")
+    create_transfers_indexes(partitioned=False)
@@ -0,0 +1,59 @@
+"""add balance shards
+
+Revision ID: 9b4e1f2a7c31
+Revises: 6f12baf6b566
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9b4e1f2a7c31"
+down_revision: Union[str, Sequence[str], None] = "6f12baf6b566"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "merchants",
+        sa.Column("balance_shards", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.add_column("balances", sa.Column("shard", sa.Integer(), server_default="0", nullable=False))
+    op.drop_index("balances_merchant_id_uq_idx", table_name="balances")
+    op.create_index(
+        "balances_merchant_id_uq_idx",
+        "balances",
+        ["merchant_id", "currency", "shard"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        """
+        WITH totals AS (
+            SELECT merchant_id, currency, min(shard) AS shard, sum(amount) AS amount
+            FROM balances GROUP BY merchant_id, currency
+        ),
+        merged AS (
+            UPDATE balances b SET amount = t.amount
+            FROM totals t
+            WHERE b.merchant_id = t.merchant_id AND b.currency = t.currency AND b.shard = t.shard
+        )
+        DELETE FROM balances b USING totals t
+        WHERE b.merchant_id = t.merchant_id AND b.currency = t.currency AND b.shard <> t.shard
+        """
+    )
+    op.drop_index("balances_merchant_id_uq_idx", table_name="balances")
+    op.create_index(
+        "balances_merchant_id_uq_idx", "balances", ["merchant_id", "currency"], unique=True
+    )
+    op.drop_column("balances", "shard")
+    op.drop_column("merchants", "balance_shards")
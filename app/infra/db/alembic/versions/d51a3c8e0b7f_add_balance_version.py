@@ -0,0 +1,30 @@
+"""add balance version
+
+Revision ID: d51a3c8e0b7f
+Revises: 9b4e1f2a7c31
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d51a3c8e0b7f"
+down_revision: Union[str, Sequence[str], None] = "9b4e1f2a7c31"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "balances", sa.Column("version", sa.Integer(), server_default="0", nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("balances", "version")
@@ -1,3 +1,3 @@
 from .balances import balances
 from .merchants import merchants
-from .transfers import transfers
+from .transfers import transfer_idempotency_keys, transfers
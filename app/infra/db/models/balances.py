@@ -1,4 +1,4 @@
-from sqlalchemy import NUMERIC, Column, ForeignKey, Index, String, Table
+from sqlalchemy import NUMERIC, Column, ForeignKey, Index, Integer, String, Table
 
 from app.infra.db.utils import get_base_fields, metadata
 
@@ -9,5 +9,7 @@ balances = Table(
     Column("merchant_id", ForeignKey("merchants.id", name="merchants_id_fk"), nullable=False),
     Column("currency", String, nullable=False),
     Column("amount", NUMERIC(precision=12, scale=8), nullable=False, server_default="0"),
-    Index("balances_merchant_id_uq_idx", "merchant_id", "currency", unique=True),
+    Column("shard", Integer, nullable=False, server_default="0"),
+    Column("version", Integer, nullable=False, server_default="0"),
+    Index("balances_merchant_id_uq_idx", "merchant_id", "currency", "shard", unique=True),
 )
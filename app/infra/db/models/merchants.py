@@ -1,4 +1,4 @@
-from sqlalchemy import NUMERIC, Column, Index, String, Table
+from sqlalchemy import NUMERIC, Column, Index, Integer, String, Table
 
 from app.infra.db.utils import get_base_fields, metadata
 
@@ -8,5 +8,6 @@ merchants = Table(
     *get_base_fields(),
     Column("name", String, nullable=False),
     Column("percent_fee", NUMERIC(precision=12, scale=2), nullable=False),
+    Column("balance_shards", Integer, nullable=False, server_default="1"),
     Index("merchants_name_idx", "name", unique=True),
 )
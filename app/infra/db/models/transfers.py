@@ -1,11 +1,24 @@
-from sqlalchemy import NUMERIC, Column, ForeignKey, Index, String, Table
+from sqlalchemy import (
+    DDL,
+    NUMERIC,
+    TIMESTAMP,
+    UUID,
+    Column,
+    ForeignKey,
+    Index,
+    String,
+    Table,
+    event,
+)
 
 from app.infra.db.utils import get_base_fields, metadata
 
+# monthly range partitions on created, named transfers_pYYYYMM, are created ahead of time by
+# the partition maintenance task; rows outside of them land in the default partition
 transfers = Table(
     "transfers",
     metadata,
-    *get_base_fields(),
+    *get_base_fields(partitioned_by_created=True),
     Column(
         "from_merchant_id",
         ForeignKey("merchants.id", name="transfers_from_merchants_id_fk"),
@@ -20,7 +33,41 @@ transfers = Table(
     Column("percent_fee", NUMERIC(precision=12, scale=2), nullable=False),
     Column("currency", String, nullable=False),
     Column("idempotency_key", String, nullable=False),
-    Index("transfers_from_merchant_id_idx", "from_merchant_id"),
-    Index("transfers_to_merchant_id_idx", "to_merchant_id"),
-    Index("transfers_idempotency_key_uq_idx", "idempotency_key", unique=True),
+    Index("transfers_created_id_idx", "created", "id"),
+    Index("transfers_from_merchant_id_created_id_idx", "from_merchant_id", "created", "id"),
+    Index("transfers_to_merchant_id_created_id_idx", "to_merchant_id", "created", "id"),
+    Index("transfers_currency_created_id_idx", "currency", "created", "id"),
+    Index("transfers_idempotency_key_idx", "idempotency_key"),
+    postgresql_partition_by="RANGE (created)",
 )
+
+# a unique index on a partitioned table has to include the partition key, so idempotency keys
+# are kept unique across all partitions here, filled by a trigger on transfers
+transfer_idempotency_keys = Table(
+    "transfer_idempotency_keys",
+    metadata,
+    Column("idempotency_key", String, primary_key=True),
+    Column("transfer_id", UUID, nullable=False),
+    Column("created", TIMESTAMP(timezone=True), nullable=False),
+)
+
+CREATE_TRANSFERS_DEFAULT_PARTITION = DDL(
+    "CREATE TABLE transfers_default PARTITION OF transfers DEFAULT"
+)
+CREATE_TRANSFER_IDEMPOTENCY_KEYS_FUNCTION = DDL(
+    "CREATE OR REPLACE FUNCTION insert_transfer_idempotency_keys() RETURNS trigger AS $$ "
+    "BEGIN "
+    "INSERT INTO transfer_idempotency_keys (idempotency_key, transfer_id, created) "
+    "SELECT idempotency_key, id, created FROM new_transfers; "
+    "RETURN NULL; "
+    "END $$ LANGUAGE plpgsql"
+)
+CREATE_TRANSFER_IDEMPOTENCY_KEYS_TRIGGER = DDL(
+    "CREATE TRIGGER transfers_idempotency_keys_trg AFTER INSERT ON transfers "
+    "REFERENCING NEW TABLE AS new_transfers "
+    "FOR EACH STATEMENT EXECUTE FUNCTION insert_transfer_idempotency_keys()"
+)
+
+event.listen(transfers, "after_create", CREATE_TRANSFERS_DEFAULT_PARTITION)
+event.listen(transfers, "after_create", CREATE_TRANSFER_IDEMPOTENCY_KEYS_FUNCTION)
+event.listen(transfers, "after_create", CREATE_TRANSFER_IDEMPOTENCY_KEYS_TRIGGER)
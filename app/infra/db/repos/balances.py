@@ -1,8 +1,245 @@
+import dataclasses
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import bindparam, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
 from app.domain.balances import Balance
-from app.infra.db.models import balances
+from app.infra.config import settings
+from app.infra.db.models import balances, merchants
 from app.infra.db.repos.base import EntityRepo
+from app.infra.db.repos.bulk import (
+    APPLY_BALANCE_DELTAS,
+    BALANCE_DELTAS_STAGING,
+    BALANCE_DELTAS_STAGING_COLUMNS,
+    BALANCES_STAGING,
+    BALANCES_STAGING_COLUMNS,
+    BALANCES_STAGING_MISSING_MERCHANTS,
+    CREATE_BALANCE_DELTAS_STAGING,
+    CREATE_BALANCES_STAGING,
+    LOCK_BALANCE_DELTAS,
+    MERGE_BALANCES,
+)
+from app.infra.db.repos.exceptions import (
+    EntityAlreadyExistsError,
+    ForeignKeyViolationError,
+    handle_db_errors,
+)
+from app.infra.db.repos.fast_path import BALANCES_BY_MERCHANTS, UPDATE_BALANCE_AMOUNT
 
 
 class BalancesRepo(EntityRepo):
     db_entity = balances
     domain_entity = Balance
+
+    async def search_by_merchants(self, merchant_ids: list[UUID], currency: str) -> list[Balance]:
+        if settings.db_fast_path:
+            return await self._search_by_merchants_fast(merchant_ids, currency)
+        return await self.search(merchant_id_in=merchant_ids, currency=currency, archived=False)
+
+    @handle_db_errors
+    async def _search_by_merchants_fast(
+        self, merchant_ids: list[UUID], currency: str
+    ) -> list[Balance]:
+        return [
+            Balance(*r) for r in await self.fetch_raw(BALANCES_BY_MERCHANTS, merchant_ids, currency)
+        ]
+
+    @handle_db_errors
+    async def search_for_update(
+        self, merchant_ids: list[UUID], currencies: list[str]
+    ) -> list[Balance]:
+        """Lock the balances in id order, so writers locking several rows do not deadlock."""
+        query = (
+            select(balances)
+            .where(
+                balances.c.merchant_id.in_(merchant_ids),
+                balances.c.currency.in_(currencies),
+                balances.c.archived.is_(False),
+            )
+            .order_by(balances.c.id)
+            .with_for_update()
+        )
+        return [Balance(**r) for r in await self.fetch(query)]
+
+    @handle_db_errors
+    async def lock_shards(self, currency: str, shards: list[tuple[UUID, int]]) -> list[Balance]:
+        """Lock the (merchant_id, shard) balances in id order and read them."""
+        query = (
+            select(balances)
+            .where(
+                balances.c.currency == currency,
+                tuple_(balances.c.merchant_id, balances.c.shard).in_(shards),
+                balances.c.archived.is_(False),
+            )
+            .order_by(balances.c.id)
+            .with_for_update()
+        )
+        return [Balance(**r) for r in await self.fetch(query)]
+
+    @handle_db_errors
+    async def add_amount(
+        self, merchant_id: UUID, currency: str, shard: int, amount: Decimal
+    ) -> None:
+        """Add to a balance shard, creating it. The write is relative, so changes made since
+        the shard was read, e.g. by an import, are kept."""
+        query = insert(balances).values(
+            merchant_id=merchant_id, currency=currency, shard=shard, amount=amount
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[balances.c.merchant_id, balances.c.currency, balances.c.shard],
+            set_={
+                "amount": balances.c.amount + query.excluded.amount,
+                "version": balances.c.version + 1,
+                "updated": func.now(),
+            },
+        )
+        await self.execute(query)
+
+    @handle_db_errors
+    async def lock_by_merchant_names(self, names: list[str], currencies: list[str]) -> None:
+        """Lock every shard of the merchants' balances in id order."""
+        query = (
+            select(balances.c.id)
+            .select_from(balances.join(merchants, balances.c.merchant_id == merchants.c.id))
+            .where(
+                merchants.c.name.in_(names),
+                balances.c.currency.in_(currencies),
+                balances.c.archived.is_(False),
+            )
+            .order_by(balances.c.id)
+            .with_for_update(of=balances)
+        )
+        await self.fetch(query)
+
+    @handle_db_errors
+    async def bulk_insert(
+        self, payloads: list[dict]
+    ) -> list[Balance | EntityAlreadyExistsError | ForeignKeyViolationError]:
+        """Insert shard 0 balances with COPY, reporting a balance or an error per payload.
+
+        A merchant and currency repeated in payloads conflicts with its first occurrence.
+        """
+        unique_payloads = {}
+        for payload in payloads:
+            unique_payloads.setdefault((payload["merchant_id"], payload["currency"]), payload)
+
+        rows, missing_rows = await self.copy_and_fetch(
+            CREATE_BALANCES_STAGING,
+            BALANCES_STAGING,
+            BALANCES_STAGING_COLUMNS,
+            [
+                tuple(payload[column] for column in BALANCES_STAGING_COLUMNS)
+                for payload in unique_payloads.values()
+            ],
+            MERGE_BALANCES,
+            BALANCES_STAGING_MISSING_MERCHANTS,
+        )
+        inserted = {
+            (balance.merchant_id, balance.currency): balance
+            for balance in (Balance(*r) for r in rows)
+        }
+        missing_merchants = {r["merchant_id"] for r in missing_rows}
+
+        res = []
+        for payload in payloads:
+            key = (payload["merchant_id"], payload["currency"])
+            if payload["merchant_id"] in missing_merchants:
+                res.append(ForeignKeyViolationError("Balance", "merchants"))
+            elif key in inserted and unique_payloads[key] is payload:
+                res.append(inserted[key])
+            else:
+                res.append(
+                    EntityAlreadyExistsError(
+                        "Balance", "merchant_id, currency", f"{key[0]}, {key[1]}"
+                    )
+                )
+        return res
+
+    @handle_db_errors
+    async def apply_deltas(self, deltas: dict[tuple[UUID, str], Decimal]) -> list[Balance]:
+        """Add amounts to (merchant_id, currency) balances in one statement, creating missing
+        ones. Returns the changed shard 0 balances."""
+        _, rows = await self.copy_and_fetch(
+            CREATE_BALANCE_DELTAS_STAGING,
+            BALANCE_DELTAS_STAGING,
+            BALANCE_DELTAS_STAGING_COLUMNS,
+            [(merchant_id, currency, amount) for (merchant_id, currency), amount in deltas.items()],
+            LOCK_BALANCE_DELTAS,
+            APPLY_BALANCE_DELTAS,
+        )
+        return [Balance(*r) for r in rows]
+
+    @handle_db_errors
+    async def update_by_id(
+        self, entity_id: UUID, expected_version: int | None = None, **payload
+    ) -> dict | None:
+        """Update a balance and bump its version.
+
+        With expected_version the update is a compare-and-swap: None is returned when the
+        row was changed since it was read.
+        """
+        if settings.db_fast_path and payload.keys() == {"amount"}:
+            res = await self.fetchrow_raw(
+                UPDATE_BALANCE_AMOUNT, entity_id, payload["amount"], expected_version
+            )
+            return dict(res) if res else None
+
+        query = (
+            balances.update()
+            .values(updated=datetime.utcnow(), version=balances.c.version + 1, **payload)
+            .returning(balances)
+            .where(balances.c.id == entity_id)
+        )
+        if expected_version is not None:
+            query = query.where(balances.c.version == expected_version)
+        return await self.fetchrow(query)
+
+    @handle_db_errors
+    async def update_amounts(self, amounts: dict[UUID, Decimal]) -> None:
+        if not amounts:
+            return
+        query = (
+            balances.update()
+            .where(balances.c.id == bindparam("balance_id"))
+            .values(
+                amount=bindparam("new_amount"),
+                version=balances.c.version + 1,
+                updated=datetime.utcnow(),
+            )
+        )
+        await self.execute(
+            query,
+            [
+                {"balance_id": balance_id, "new_amount": amount}
+                for balance_id, amount in amounts.items()
+            ],
+        )
+
+    @handle_db_errors
+    async def consolidate_shards(self, merchant_id: UUID, currency: str) -> Balance | None:
+        """Move the funds of all shards into the lowest one, locking the shard rows."""
+        query = (
+            select(balances)
+            .where(
+                balances.c.merchant_id == merchant_id,
+                balances.c.currency == currency,
+                balances.c.archived.is_(False),
+            )
+            .order_by(balances.c.shard)
+            .with_for_update()
+        )
+        shards = [Balance(**r) for r in await self.fetch(query)]
+        if len(shards) <= 1:
+            return shards[0] if shards else None
+
+        total = sum((shard.amount for shard in shards), Decimal("0"))
+        await self.update_amounts(
+            {
+                shards[0].id: total,
+                **{shard.id: Decimal("0") for shard in shards[1:] if shard.amount},
+            }
+        )
+        return dataclasses.replace(shards[0], amount=total, version=shards[0].version + 1)
@@ -1,27 +1,80 @@
 import abc
+from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import column, select
+from sqlalchemy import bindparam, column, select
 
-from app.infra.db.connection import get_async_engine
 from app.infra.db.repos.exceptions import handle_db_errors
+from app.infra.db.session import get_driver_connection, unit_of_work
+from app.infra.metrics import metrics
+
+EXPANDING_FILTER_SIGNS = {"in", "notin"}
+LITERAL_FILTER_SIGNS = {"is", "isnot"}
+
+# query shape -> select with bound parameters, shared by all repo instances
+_search_query_cache: dict[tuple, object] = {}
 
 
 class BaseRepo(abc.ABC):
     @asynccontextmanager
     async def transaction(self):
-        engine = get_async_engine()
-        async with engine.begin() as conn:
+        async with unit_of_work() as conn:
             yield conn
 
-    async def fetch(self, query) -> list:
+    async def fetch(self, query, params: dict | None = None) -> list:
         async with self.transaction() as conn:
-            result = await conn.execute(query)
+            result = await conn.execute(query, params)
             result = result.fetchall()
             return [dict(r._mapping) for r in result]
 
+    async def fetch_tuples(self, query, params: dict | None = None) -> list:
+        async with self.transaction() as conn:
+            result = await conn.execute(query, params)
+            return result.all()
+
+    async def stream(self, query, chunk_size: int) -> AsyncIterator[list]:
+        """Rows in chunks of chunk_size, fetched from a server-side cursor."""
+        async with self.transaction() as conn:
+            result = await conn.stream(query.execution_options(yield_per=chunk_size))
+            async for rows in result.partitions():
+                yield rows
+
+    async def execute(self, query, params: list[dict] | dict | None = None) -> None:
+        async with self.transaction() as conn:
+            await conn.execute(query, params)
+
+    async def fetch_raw(self, query: str, *args) -> list:
+        async with self.transaction() as conn:
+            driver_connection = await get_driver_connection(conn)
+            return await driver_connection.fetch(query, *args)
+
+    async def execute_raw(self, query: str, *args) -> None:
+        async with self.transaction() as conn:
+            driver_connection = await get_driver_connection(conn)
+            await driver_connection.execute(query, *args)
+
+    async def fetchrow_raw(self, query: str, *args):
+        async with self.transaction() as conn:
+            driver_connection = await get_driver_connection(conn)
+            return await driver_connection.fetchrow(query, *args)
+
+    async def copy_records(self, table: str, columns: list[str], records: list[tuple]) -> None:
+        async with self.transaction() as conn:
+            driver_connection = await get_driver_connection(conn)
+            await driver_connection.copy_records_to_table(table, records=records, columns=columns)
+
+    async def copy_and_fetch(
+        self, staging_ddl: str, staging: str, columns: list[str], records: list[tuple], *queries
+    ) -> list[list]:
+        """COPY records into a staging table created by staging_ddl and run queries over it."""
+        async with self.transaction() as conn:
+            driver_connection = await get_driver_connection(conn)
+            await driver_connection.execute(staging_ddl)
+            await driver_connection.copy_records_to_table(staging, records=records, columns=columns)
+            return [await driver_connection.fetch(query) for query in queries]
+
     async def fetchrow(self, query) -> dict | None:
         async with self.transaction() as conn:
             result = await conn.execute(query)
@@ -65,10 +118,51 @@ class EntityRepo(BaseRepo):
 
         return query
 
+    def _is_literal_filter(self, filter_name: str, filter_value) -> bool:
+        # these values change the rendered SQL (IS NULL, IS true), so they are part of the shape
+        if filter_value is None:
+            return True
+        return (
+            filter_name not in self.db_entity.c
+            and filter_name.rsplit("_", 1)[-1] in LITERAL_FILTER_SIGNS
+        )
+
+    def _get_search_query(self, **filters) -> tuple:
+        literal_filters = {
+            name: value for name, value in filters.items() if self._is_literal_filter(name, value)
+        }
+        params = {name: value for name, value in filters.items() if name not in literal_filters}
+        shape = (
+            self.db_entity.name,
+            tuple(sorted(params)),
+            tuple(sorted(literal_filters.items(), key=lambda item: item[0])),
+        )
+
+        query = _search_query_cache.get(shape)
+        if query is not None:
+            metrics.counter("repo_query_cache_hits", table=self.db_entity.name).inc()
+            return query, params
+
+        metrics.counter("repo_query_cache_misses", table=self.db_entity.name).inc()
+        query = select(self.db_entity)
+        for filter_name in params:
+            expanding = (
+                filter_name not in self.db_entity.c
+                and filter_name.rsplit("_", 1)[-1] in EXPANDING_FILTER_SIGNS
+            )
+            query = query.where(
+                self._get_filter_bool_expression(
+                    filter_name, bindparam(filter_name, expanding=expanding), query
+                )
+            )
+        query = self._apply_filters(query, **literal_filters)
+        _search_query_cache[shape] = query
+        return query, params
+
     @handle_db_errors
     async def search(self, **filters) -> list[domain_entity]:
-        query = self._apply_filters(select(self.db_entity), **filters)
-        res = await self.fetch(query)
+        query, params = self._get_search_query(**filters)
+        res = await self.fetch(query, params)
         return [self.domain_entity(**r) for r in res]
 
     @handle_db_errors
@@ -82,6 +176,14 @@ class EntityRepo(BaseRepo):
         res = await self.fetchrow(query)
         return self.domain_entity(**res)
 
+    @handle_db_errors
+    async def insert_many(self, payloads: list[dict]) -> list[domain_entity]:
+        if not payloads:
+            return []
+        query = self.db_entity.insert().values(payloads).returning(self.db_entity)
+        res = await self.fetch(query)
+        return [self.domain_entity(**r) for r in res]
+
     @handle_db_errors
     async def update_by_id(self, entity_id: UUID, **payload) -> dict:
         update_query = (
@@ -0,0 +1,84 @@
+"""Bulk loads: rows are copied into a temporary staging table with COPY and merged into
+the real table with a single INSERT ... SELECT ... ON CONFLICT.
+
+Staging tables are dropped on commit, rows that did not make it into the merge are reported
+by the repos per payload. Imported transfers have their keys checked up front and are copied
+into transfers directly.
+"""
+
+from app.domain.balances import Balance
+from app.domain.merchants import Merchant
+from app.infra.db.repos.fast_path import get_columns
+
+MERCHANTS_STAGING = "merchants_staging"
+MERCHANTS_STAGING_COLUMNS = ["name", "percent_fee", "balance_shards"]
+CREATE_MERCHANTS_STAGING = (
+    # a bulk load earlier in the same transaction leaves its staging table behind
+    f"DROP TABLE IF EXISTS pg_temp.{MERCHANTS_STAGING}; CREATE TEMP TABLE {MERCHANTS_STAGING} "
+    "(name varchar NOT NULL, percent_fee numeric(12, 2) NOT NULL, balance_shards integer NOT NULL) "
+    "ON COMMIT DROP"
+)
+MERGE_MERCHANTS = (
+    f"INSERT INTO merchants ({', '.join(MERCHANTS_STAGING_COLUMNS)}) "
+    f"SELECT {', '.join(MERCHANTS_STAGING_COLUMNS)} FROM {MERCHANTS_STAGING} "
+    f"ON CONFLICT (name) DO NOTHING RETURNING {get_columns(Merchant)}"
+)
+
+BALANCES_STAGING = "balances_staging"
+BALANCES_STAGING_COLUMNS = ["merchant_id", "currency", "amount"]
+CREATE_BALANCES_STAGING = (
+    # a bulk load earlier in the same transaction leaves its staging table behind
+    f"DROP TABLE IF EXISTS pg_temp.{BALANCES_STAGING}; CREATE TEMP TABLE {BALANCES_STAGING} "
+    "(merchant_id uuid NOT NULL, currency varchar NOT NULL, amount numeric(12, 8) NOT NULL) "
+    "ON COMMIT DROP"
+)
+MERGE_BALANCES = (
+    f"INSERT INTO balances ({', '.join(BALANCES_STAGING_COLUMNS)}) "
+    f"SELECT s.merchant_id, s.currency, s.amount FROM {BALANCES_STAGING} s "
+    "JOIN merchants m ON m.id = s.merchant_id "
+    "ON CONFLICT (merchant_id, currency, shard) DO NOTHING "
+    f"RETURNING {get_columns(Balance)}"
+)
+BALANCES_STAGING_MISSING_MERCHANTS = (
+    f"SELECT DISTINCT s.merchant_id FROM {BALANCES_STAGING} s "
+    "LEFT JOIN merchants m ON m.id = s.merchant_id WHERE m.id IS NULL"
+)
+
+BALANCE_DELTAS_STAGING = "balance_deltas_staging"
+BALANCE_DELTAS_STAGING_COLUMNS = ["merchant_id", "currency", "amount"]
+CREATE_BALANCE_DELTAS_STAGING = (
+    f"DROP TABLE IF EXISTS pg_temp.{BALANCE_DELTAS_STAGING}; "
+    f"CREATE TEMP TABLE {BALANCE_DELTAS_STAGING} "
+    "(merchant_id uuid NOT NULL, currency varchar NOT NULL, amount numeric NOT NULL) "
+    "ON COMMIT DROP"
+)
+# the rows are locked in id order first, like transfers lock them, so an import cannot
+# deadlock with the transfers running next to it
+LOCK_BALANCE_DELTAS = (
+    f"SELECT b.id FROM balances b JOIN {BALANCE_DELTAS_STAGING} s "
+    "ON b.merchant_id = s.merchant_id AND b.currency = s.currency AND b.shard = 0 "
+    "ORDER BY b.id FOR UPDATE OF b"
+)
+# deltas land on shard 0, the balance is the sum over shards
+APPLY_BALANCE_DELTAS = (
+    f"INSERT INTO balances ({', '.join(BALANCE_DELTAS_STAGING_COLUMNS)}) "
+    f"SELECT {', '.join(BALANCE_DELTAS_STAGING_COLUMNS)} FROM {BALANCE_DELTAS_STAGING} "
+    "ON CONFLICT (merchant_id, currency, shard) DO UPDATE SET "
+    "amount = balances.amount + EXCLUDED.amount, version = balances.version + 1, updated = now() "
+    f"RETURNING {get_columns(Balance)}"
+)
+
+TRANSFERS_COPY_COLUMNS = [
+    "from_merchant_id",
+    "to_merchant_id",
+    "amount",
+    "percent_fee",
+    "currency",
+    "idempotency_key",
+    "created",
+    "updated",
+]
+EXISTING_IDEMPOTENCY_KEYS = (
+    "SELECT idempotency_key FROM transfer_idempotency_keys "
+    "WHERE idempotency_key = ANY($1::varchar[])"
+)
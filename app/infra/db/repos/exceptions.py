@@ -1,6 +1,7 @@
 import re
 from functools import wraps
 
+import asyncpg
 from sqlalchemy.exc import (
     DBAPIError,
     IntegrityError,
@@ -48,29 +49,37 @@ class ValidationError(Exception):
 logger = get_logger(__name__)
 
 
+def map_integrity_error(message: str, entity_name: str) -> Exception:
+    error_msg = message.lower()
+
+    if "unique constraint" in error_msg or "duplicate key" in error_msg:
+        match = re.search(r"Key \((\w+)\)=\((.+?)\)", message)
+        if match:
+            field = match.group(1)
+            value = match.group(2)
+            return EntityAlreadyExistsError(entity_name, field, value)
+        return EntityAlreadyExistsError(entity_name, "field", "value")
+
+    if "foreign key constraint" in error_msg or "violates foreign key" in error_msg:
+        match = re.search(r'table "(\w+)"', message)
+        referenced = match.group(1) if match else "related entity"
+        return ForeignKeyViolationError(entity_name, referenced)
+
+    if "not null constraint" in error_msg or "null value" in error_msg:
+        match = re.search(r'column "(\w+)"', message)
+        field = match.group(1) if match else "field"
+        return DatabaseError(f"Required field '{field}' cannot be null")
+
+    return DatabaseError(f"Data integrity violation: {message}")
+
+
 def map_db_error(error: Exception, entity_name: str) -> Exception:
     if isinstance(error, IntegrityError):
-        error_msg = str(error.orig).lower()
-
-        if "unique constraint" in error_msg or "duplicate key" in error_msg:
-            match = re.search(r"Key \((\w+)\)=\((.+?)\)", str(error.orig))
-            if match:
-                field = match.group(1)
-                value = match.group(2)
-                return EntityAlreadyExistsError(entity_name, field, value)
-            return EntityAlreadyExistsError(entity_name, "field", "value")
-
-        if "foreign key constraint" in error_msg or "violates foreign key" in error_msg:
-            match = re.search(r'table "(\w+)"', str(error.orig))
-            referenced = match.group(1) if match else "related entity"
-            return ForeignKeyViolationError(entity_name, referenced)
-
-        if "not null constraint" in error_msg or "null value" in error_msg:
-            match = re.search(r'column "(\w+)"', str(error.orig))
-            field = match.group(1) if match else "field"
-            return DatabaseError(f"Required field '{field}' cannot be null")
-
-        return DatabaseError(f"Data integrity violation: {error.orig}")
+        return map_integrity_error(str(error.orig), entity_name)
+
+    # raised by the raw asyncpg fast path, bypassing SQLAlchemy's exception wrapping
+    if isinstance(error, asyncpg.IntegrityConstraintViolationError):
+        return map_integrity_error(f"{error}\nDETAIL:  {error.detail}", entity_name)
 
     if isinstance(error, NoResultFound):
         return EntityNotFoundError(entity_name, "unknown")
@@ -0,0 +1,38 @@
+"""Hot statements executed on asyncpg directly, bypassing SQLAlchemy.
+
+Columns are selected in the order of the domain dataclass fields, so records map to
+domain objects positionally. asyncpg prepares and caches each statement per connection.
+"""
+
+import dataclasses
+
+from app.domain.balances import Balance
+from app.domain.merchants import Merchant
+from app.domain.transfers import Transfer
+
+
+def get_columns(domain_entity) -> str:
+    return ", ".join(field.name for field in dataclasses.fields(domain_entity))
+
+
+MERCHANTS_BY_NAMES = (
+    f"SELECT {get_columns(Merchant)} FROM merchants "
+    "WHERE name = ANY($1::varchar[]) AND archived IS false"
+)
+
+BALANCES_BY_MERCHANTS = (
+    f"SELECT {get_columns(Balance)} FROM balances "
+    "WHERE merchant_id = ANY($1::uuid[]) AND currency = $2 AND archived IS false"
+)
+
+UPDATE_BALANCE_AMOUNT = (
+    "UPDATE balances SET amount = $2, version = version + 1, updated = now() "
+    "WHERE id = $1 AND ($3::integer IS NULL OR version = $3) "
+    f"RETURNING {get_columns(Balance)}"
+)
+
+INSERT_TRANSFER = (
+    "INSERT INTO transfers "
+    "(from_merchant_id, to_merchant_id, amount, percent_fee, currency, idempotency_key) "
+    f"VALUES ($1, $2, $3, $4, $5, $6) RETURNING {get_columns(Transfer)}"
+)
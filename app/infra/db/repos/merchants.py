@@ -1,8 +1,128 @@
-from app.domain.merchants import Merchant
-from app.infra.db.models import merchants
+import dataclasses
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import and_, func, select
+
+from app.domain.balances import Balance
+from app.domain.merchants import Merchant, MerchantWithBalances
+from app.infra.config import settings
+from app.infra.db.models import balances, merchants
 from app.infra.db.repos.base import EntityRepo
+from app.infra.db.repos.bulk import (
+    CREATE_MERCHANTS_STAGING,
+    MERCHANTS_STAGING,
+    MERCHANTS_STAGING_COLUMNS,
+    MERGE_MERCHANTS,
+)
+from app.infra.db.repos.exceptions import EntityAlreadyExistsError, handle_db_errors
+from app.infra.db.repos.fast_path import MERCHANTS_BY_NAMES
+
+MERCHANT_COLUMNS = [merchants.c[field.name] for field in dataclasses.fields(Merchant)]
+BALANCE_COLUMNS = [balances.c[field.name] for field in dataclasses.fields(Balance)]
 
 
 class MerchantsRepo(EntityRepo):
     db_entity = merchants
     domain_entity = Merchant
+
+    async def search_by_names(self, names: list[str]) -> list[Merchant]:
+        if settings.db_fast_path:
+            return await self._search_by_names_fast(names)
+        return await self.search(name_in=names, archived=False)
+
+    @handle_db_errors
+    async def _search_by_names_fast(self, names: list[str]) -> list[Merchant]:
+        return [Merchant(*r) for r in await self.fetch_raw(MERCHANTS_BY_NAMES, names)]
+
+    @handle_db_errors
+    async def search_with_balances(self, names: list[str]) -> list[MerchantWithBalances]:
+        """Merchants with all their balance shards, in one joined query."""
+        query = (
+            select(*MERCHANT_COLUMNS, *BALANCE_COLUMNS)
+            .select_from(
+                merchants.outerjoin(
+                    balances,
+                    and_(balances.c.merchant_id == merchants.c.id, balances.c.archived.is_(False)),
+                )
+            )
+            .where(merchants.c.name.in_(names), merchants.c.archived.is_(False))
+            .order_by(merchants.c.name, balances.c.currency, balances.c.shard)
+        )
+
+        res = {}
+        split = len(MERCHANT_COLUMNS)
+        for r in await self.fetch_tuples(query):
+            merchant = res.get(r[0])
+            if merchant is None:
+                merchant = res[r[0]] = MerchantWithBalances(*r[:split], balances=[])
+            # left join: merchants without balances come with a row of nulls
+            if r[split] is not None:
+                merchant.balances.append(Balance(*r[split:]))
+        return list(res.values())
+
+    @handle_db_errors
+    async def get_version_with_balances(
+        self, name: str
+    ) -> tuple[UUID, datetime, list[tuple[str, int]]] | None:
+        """Id and last update of the merchant with the summed version of each of its balances,
+        see balances_version. None when there is no such merchant."""
+        query = (
+            select(
+                merchants.c.id,
+                merchants.c.updated,
+                balances.c.currency,
+                # the same sum as sum_balance_shards
+                func.sum(balances.c.version) + func.count(balances.c.id) - 1,
+            )
+            .select_from(
+                merchants.outerjoin(
+                    balances,
+                    and_(balances.c.merchant_id == merchants.c.id, balances.c.archived.is_(False)),
+                )
+            )
+            .where(merchants.c.name == name, merchants.c.archived.is_(False))
+            .group_by(merchants.c.id, merchants.c.updated, balances.c.currency)
+            .order_by(balances.c.currency)
+        )
+        rows = await self.fetch_tuples(query)
+        if not rows:
+            return None
+        merchant_id, updated = rows[0][:2]
+        return merchant_id, updated, [(r[2], r[3]) for r in rows if r[2] is not None]
+
+    @handle_db_errors
+    async def get_version(self) -> tuple[int, datetime | None]:
+        """Count and last update of the listed merchants, see merchants_version."""
+        query = select(func.count(), func.max(merchants.c.updated)).where(
+            merchants.c.archived.is_(False)
+        )
+        return tuple((await self.fetch_tuples(query))[0])
+
+    @handle_db_errors
+    async def bulk_insert(self, payloads: list[dict]) -> list[Merchant | EntityAlreadyExistsError]:
+        """Insert merchants with COPY, reporting a merchant or a conflict per payload.
+
+        A name repeated in payloads conflicts with its first occurrence.
+        """
+        unique_payloads = {}
+        for payload in payloads:
+            unique_payloads.setdefault(payload["name"], payload)
+
+        [rows] = await self.copy_and_fetch(
+            CREATE_MERCHANTS_STAGING,
+            MERCHANTS_STAGING,
+            MERCHANTS_STAGING_COLUMNS,
+            [
+                tuple(payload[column] for column in MERCHANTS_STAGING_COLUMNS)
+                for payload in unique_payloads.values()
+            ],
+            MERGE_MERCHANTS,
+        )
+        inserted = {merchant.name: merchant for merchant in (Merchant(*r) for r in rows)}
+        return [
+            inserted[payload["name"]]
+            if payload["name"] in inserted and unique_payloads[payload["name"]] is payload
+            else EntityAlreadyExistsError("Merchant", "name", payload["name"])
+            for payload in payloads
+        ]
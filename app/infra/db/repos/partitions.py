@@ -0,0 +1,43 @@
+"""Monthly range partitions of transfers and moving old transfers out of the table.
+
+Partitions are named transfers_pYYYYMM and cover [first day of the month, first day of the
+next month) in UTC. Rows outside of every monthly partition land in transfers_default.
+"""
+
+from datetime import date
+
+TRANSFERS_DEFAULT_PARTITION = "transfers_default"
+
+# partition DDL takes an exclusive lock on transfers, one worker at a time does it
+LOCK_TRANSFERS_PARTITIONS = "SELECT pg_advisory_xact_lock(hashtext('transfers_partitions'))"
+# archival batches from several workers would write the same rows twice
+TRY_LOCK_TRANSFERS_ARCHIVE = "SELECT pg_try_advisory_xact_lock(hashtext('transfers_archive'))"
+TRANSFERS_PARTITIONS = (
+    "SELECT c.relname AS name FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+    "WHERE i.inhparent = 'transfers'::regclass ORDER BY c.relname"
+)
+# with a default partition Postgres refuses CONCURRENTLY, so the detach blocks writes briefly
+DETACH_TRANSFERS_PARTITION = "ALTER TABLE transfers DETACH PARTITION {name}"
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def get_partition_name(month: date) -> str:
+    return f"transfers_p{month:%Y%m}"
+
+
+def get_partition_month(name: str) -> date | None:
+    """Month covered by a monthly partition, None for any other table."""
+    suffix = name.removeprefix("transfers_p")
+    if suffix == name or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def create_partition_query(month: date) -> str:
+    return (
+        f"CREATE TABLE {get_partition_name(month)} PARTITION OF transfers "
+        f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{next_month(month)} 00:00:00+00')"
+    )
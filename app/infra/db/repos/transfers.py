@@ -1,34 +1,349 @@
-import dataclasses
+from collections.abc import AsyncIterator
+from datetime import date, datetime
 from decimal import Decimal
+from uuid import UUID
 
-from sqlalchemy import and_, select
+from sqlalchemy import (
+    NUMERIC,
+    Integer,
+    String,
+    and_,
+    cast,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert
 
-from app.domain.base import BaseEntity
-from app.domain.transfers import Transfer
-from app.infra.db.models import merchants, transfers
+from app.domain.transfers import Transfer, TransferWithMerchant
+from app.infra.config import settings
+from app.infra.db.models import balances, merchants, transfer_idempotency_keys, transfers
 from app.infra.db.repos.base import EntityRepo
-
-
-@dataclasses.dataclass
-class TransferWithMerchant(BaseEntity):
-    from_merchant: str
-    to_merchant: str
-    amount: Decimal
-    percent_fee: Decimal
-    currency: str
-    idempotency_key: str
+from app.infra.db.repos.bulk import EXISTING_IDEMPOTENCY_KEYS, TRANSFERS_COPY_COLUMNS
+from app.infra.db.repos.exceptions import handle_db_errors
+from app.infra.db.repos.fast_path import INSERT_TRANSFER
+from app.infra.db.repos.partitions import (
+    DETACH_TRANSFERS_PARTITION,
+    LOCK_TRANSFERS_PARTITIONS,
+    TRANSFERS_PARTITIONS,
+    TRY_LOCK_TRANSFERS_ARCHIVE,
+    create_partition_query,
+    get_partition_name,
+)
 
 
 class TransfersRepo(EntityRepo):
     db_entity = transfers
     domain_entity = Transfer
 
+    async def insert(self, payload: dict) -> Transfer:
+        if settings.db_fast_path:
+            return await self._insert_fast(payload)
+        return await super().insert(payload)
+
+    @handle_db_errors
+    async def _insert_fast(self, payload: dict) -> Transfer:
+        res = await self.fetchrow_raw(
+            INSERT_TRANSFER,
+            payload["from_merchant_id"],
+            payload["to_merchant_id"],
+            payload["amount"],
+            payload["percent_fee"],
+            payload["currency"],
+            payload["idempotency_key"],
+        )
+        return Transfer(*res)
+
+    @handle_db_errors
+    async def copy_many(self, records: list[tuple]) -> None:
+        """COPY rows of TRANSFERS_COPY_COLUMNS values into transfers."""
+        await self.copy_records(transfers.name, TRANSFERS_COPY_COLUMNS, records)
+
+    @handle_db_errors
+    async def search_idempotency_keys(self, keys: list[str]) -> set[str]:
+        """Keys already taken, in one lookup on the transfer_idempotency_keys primary key."""
+        return {r["idempotency_key"] for r in await self.fetch_raw(EXISTING_IDEMPOTENCY_KEYS, keys)}
+
+    @handle_db_errors
+    async def get_idempotency_keys(self, keys: list[str]) -> dict[str, tuple[UUID, datetime]]:
+        """(id, created) of the transfers that took the keys. The keys stay here after their
+        transfers are archived or their partition is detached."""
+        if not keys:
+            return {}
+        query = select(transfer_idempotency_keys).where(
+            transfer_idempotency_keys.c.idempotency_key.in_(keys)
+        )
+        return {
+            row["idempotency_key"]: (row["transfer_id"], row["created"])
+            for row in await self.fetch(query)
+        }
+
+    @handle_db_errors
+    async def get_by_keys(self, keys: list[tuple[UUID, datetime]]) -> list[Transfer]:
+        """Transfers by (id, created). The bound on created lets the planner prune the
+        partitions, transfers_idempotency_key_idx is not unique and is probed in every one."""
+        if not keys:
+            return []
+        query = select(transfers).where(
+            transfers.c.id.in_([transfer_id for transfer_id, _ in keys]),
+            transfers.c.created.in_([created for _, created in keys]),
+            transfers.c.archived.is_(False),
+        )
+        return [Transfer(**row) for row in await self.fetch(query)]
+
+    @handle_db_errors
+    async def get_partitions(self) -> list[str]:
+        return [r["name"] for r in await self.fetch_raw(TRANSFERS_PARTITIONS)]
+
+    @handle_db_errors
+    async def create_partitions(self, months: list[date]) -> list[str]:
+        """Create the missing monthly partitions, returns the names of the new ones."""
+        created = []
+        async with self.transaction():
+            await self.fetch_raw(LOCK_TRANSFERS_PARTITIONS)
+            existing = {r["name"] for r in await self.fetch_raw(TRANSFERS_PARTITIONS)}
+            for month in months:
+                if get_partition_name(month) in existing:
+                    continue
+                await self.execute_raw(create_partition_query(month))
+                created.append(get_partition_name(month))
+        return created
+
+    @handle_db_errors
+    async def detach_partition(self, name: str) -> None:
+        """The detached table keeps its rows and can be archived or dropped separately."""
+        async with self.transaction():
+            await self.fetch_raw(LOCK_TRANSFERS_PARTITIONS)
+            await self.execute_raw(DETACH_TRANSFERS_PARTITION.format(name=name))
+
+    @handle_db_errors
+    async def try_lock_archive(self) -> bool:
+        """Held until the end of the current transaction."""
+        return (await self.fetchrow_raw(TRY_LOCK_TRANSFERS_ARCHIVE))[0]
+
+    @handle_db_errors
+    async def get_transfers_to_archive(self, before: datetime, limit: int) -> list[dict]:
+        """Oldest transfers created before ``before`` with ids and names of both merchants,
+        archived merchants included."""
+        from_m = merchants.alias("from_merchant")
+        to_m = merchants.alias("to_merchant")
+        query = (
+            select(
+                transfers,
+                from_m.c.name.label("from_merchant"),
+                to_m.c.name.label("to_merchant"),
+            )
+            .select_from(
+                transfers.join(from_m, transfers.c.from_merchant_id == from_m.c.id).join(
+                    to_m, transfers.c.to_merchant_id == to_m.c.id
+                )
+            )
+            .where(transfers.c.created < before)
+            .order_by(transfers.c.created, transfers.c.id)
+            .limit(limit)
+        )
+        return await self.fetch(query)
+
+    @handle_db_errors
+    async def delete_many(self, ids: list[UUID], before: datetime) -> int:
+        # the bound on created keeps the delete to the partitions being archived
+        query = (
+            transfers.delete()
+            .where(transfers.c.id.in_(ids), transfers.c.created < before)
+            .returning(transfers.c.id)
+        )
+        return len(await self.fetch(query))
+
+    @handle_db_errors
+    async def apply_transfer(
+        self,
+        from_merchant: str,
+        to_merchant: str,
+        amount: Decimal,
+        currency: str,
+        idempotency_key: str,
+    ) -> Transfer | None:
+        """Debit, credit and record a transfer in one statement.
+
+        The debit goes to a random sender shard holding enough funds and the credit to
+        a random receiver shard. Both rows are locked in id order before either is written,
+        so transfers in opposite directions do not deadlock. Returns None without touching
+        any row when a merchant or the sender balance is missing, no single shard has
+        enough funds or the idempotency key is already used.
+        """
+        amount_param = literal(amount, NUMERIC)
+        currency_param = literal(currency, String)
+
+        from_m = (
+            select(merchants.c.id, merchants.c.percent_fee)
+            .where(merchants.c.name == from_merchant, merchants.c.archived.is_(False))
+            .cte("from_m")
+        )
+        to_m = (
+            select(merchants.c.id, merchants.c.balance_shards)
+            .where(merchants.c.name == to_merchant, merchants.c.archived.is_(False))
+            .cte("to_m")
+        )
+        final_amount = amount_param + amount_param / 100 * from_m.c.percent_fee
+
+        debit_shard = (
+            select(balances.c.id)
+            .where(
+                balances.c.merchant_id == from_m.c.id,
+                balances.c.currency == currency_param,
+                balances.c.archived.is_(False),
+                balances.c.amount >= final_amount,
+            )
+            .order_by(func.random())
+            .limit(1)
+            .cte("debit_shard")
+        )
+        credit_shard = select(
+            to_m.c.id.label("merchant_id"),
+            cast(func.floor(func.random() * to_m.c.balance_shards), Integer).label("shard"),
+        ).cte("credit_shard")
+        locked = (
+            select(balances.c.id)
+            .where(
+                or_(
+                    balances.c.id == select(debit_shard.c.id).scalar_subquery(),
+                    and_(
+                        balances.c.merchant_id == credit_shard.c.merchant_id,
+                        balances.c.currency == currency_param,
+                        balances.c.shard == credit_shard.c.shard,
+                    ),
+                )
+            )
+            .order_by(balances.c.id)
+            .with_for_update(of=balances)
+            .cte("locked")
+        )
+        debit = (
+            balances.update()
+            .where(
+                balances.c.id == debit_shard.c.id,
+                balances.c.amount >= final_amount,
+                # runs before the update locks the debit row
+                exists(select(locked.c.id)),
+                ~exists(
+                    select(transfer_idempotency_keys.c.idempotency_key).where(
+                        transfer_idempotency_keys.c.idempotency_key == idempotency_key
+                    )
+                ),
+            )
+            .values(
+                amount=balances.c.amount - final_amount,
+                version=balances.c.version + 1,
+                updated=func.now(),
+            )
+            .returning(balances.c.id, from_m.c.id.label("merchant_id"), from_m.c.percent_fee)
+            .cte("debit")
+        )
+
+        credit_insert = insert(balances).from_select(
+            ["merchant_id", "currency", "amount", "shard"],
+            select(
+                credit_shard.c.merchant_id, currency_param, amount_param, credit_shard.c.shard
+            ).select_from(credit_shard.join(debit, true())),
+        )
+        credit = (
+            credit_insert.on_conflict_do_update(
+                index_elements=[balances.c.merchant_id, balances.c.currency, balances.c.shard],
+                set_={
+                    "amount": balances.c.amount + credit_insert.excluded.amount,
+                    "version": balances.c.version + 1,
+                    "updated": func.now(),
+                },
+            )
+            .returning(balances.c.id)
+            .cte("credit")
+        )
+
+        query = (
+            insert(transfers)
+            .from_select(
+                [
+                    "from_merchant_id",
+                    "to_merchant_id",
+                    "amount",
+                    "percent_fee",
+                    "currency",
+                    "idempotency_key",
+                ],
+                select(
+                    debit.c.merchant_id,
+                    to_m.c.id,
+                    amount_param,
+                    debit.c.percent_fee,
+                    currency_param,
+                    literal(idempotency_key, String),
+                ).select_from(debit.join(to_m, true()).join(credit, true())),
+            )
+            .returning(transfers)
+        )
+
+        res = await self.fetchrow(query)
+        return Transfer(**res) if res else None
+
     async def get_transfers_with_merchant_names(
         self,
         from_merchant: str | None = None,
         to_merchant: str | None = None,
         currency: str | None = None,
+        limit: int | None = None,
+        after: tuple[datetime, UUID] | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
     ) -> list[TransferWithMerchant]:
+        """Newest first, ordered by (created, id). ``after`` is the key of the last row of
+        the previous page."""
+        query = self._get_transfers_with_merchant_names_query(
+            from_merchant, to_merchant, currency, created_from, created_to
+        )
+        query = query.order_by(transfers.c.created.desc(), transfers.c.id.desc())
+        if after is not None:
+            # the plain bound on created lets the planner skip newer partitions
+            query = query.where(
+                tuple_(transfers.c.created, transfers.c.id) < tuple_(*after),
+                transfers.c.created <= after[0],
+            )
+        if limit is not None:
+            query = query.limit(limit)
+
+        # the selected columns follow the field order of TransferWithMerchant
+        res = await self.fetch_tuples(query)
+        return [TransferWithMerchant(*r) for r in res]
+
+    async def stream_transfers_with_merchant_names(
+        self,
+        from_merchant: str | None = None,
+        to_merchant: str | None = None,
+        currency: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[list[TransferWithMerchant]]:
+        """Whole history, oldest first, in chunks read from a server-side cursor."""
+        query = self._get_transfers_with_merchant_names_query(
+            from_merchant, to_merchant, currency, created_from, created_to
+        )
+        query = query.order_by(transfers.c.created, transfers.c.id)
+
+        async for rows in self.stream(query, chunk_size):
+            yield [TransferWithMerchant(*r) for r in rows]
+
+    def _get_transfers_with_merchant_names_query(
+        self,
+        from_merchant: str | None,
+        to_merchant: str | None,
+        currency: str | None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ):
         from_m = merchants.alias("from_merchant")
         to_m = merchants.alias("to_merchant")
 
@@ -60,9 +375,12 @@ class TransfersRepo(EntityRepo):
         query = self._apply_transfer_filters(
             query, from_m, to_m, from_merchant, to_merchant, currency
         )
-
-        res = await self.fetch(query)
-        return [TransferWithMerchant(**r) for r in res]
+        # bounds on the partition key prune the monthly partitions outside the range
+        if created_from is not None:
+            query = query.where(transfers.c.created >= created_from)
+        if created_to is not None:
+            query = query.where(transfers.c.created < created_to)
+        return query
 
     def _apply_transfer_filters(
         self,
@@ -0,0 +1,41 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.infra.db.connection import get_async_engine
+
+_current_connection: ContextVar[AsyncConnection | None] = ContextVar(
+    "current_db_connection", default=None
+)
+
+
+def get_current_connection() -> AsyncConnection | None:
+    return _current_connection.get()
+
+
+@asynccontextmanager
+async def unit_of_work():
+    conn = _current_connection.get()
+    if conn is not None:
+        yield conn
+        return
+
+    engine = get_async_engine()
+    async with engine.begin() as conn:
+        token = _current_connection.set(conn)
+        try:
+            yield conn
+        finally:
+            _current_connection.reset(token)
+
+
+async def get_driver_connection(conn: AsyncConnection) -> asyncpg.Connection:
+    """asyncpg connection behind conn, inside the transaction conn has begun."""
+    raw_connection = await conn.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    # SQLAlchemy starts the driver transaction lazily on the first statement it runs
+    if not driver_connection.is_in_transaction():
+        await conn.exec_driver_sql("SELECT 1")
+    return driver_connection
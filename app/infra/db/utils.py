@@ -5,10 +5,17 @@ create_uuid = text("uuid_generate_v4()")
 metadata = MetaData()
 
 
-def get_base_fields() -> tuple:
+def get_base_fields(partitioned_by_created: bool = False) -> tuple:
+    # the primary key of a partitioned table has to include the partition key
     return (
         Column("id", UUID, primary_key=True, server_default=create_uuid),
-        Column("created", TIMESTAMP(timezone=True), server_default=now_at_utc, nullable=False),
+        Column(
+            "created",
+            TIMESTAMP(timezone=True),
+            server_default=now_at_utc,
+            nullable=False,
+            primary_key=partitioned_by_created,
+        ),
         Column("updated", TIMESTAMP(timezone=True), server_default=now_at_utc, nullable=False),
         Column("archived", Boolean, server_default="false", nullable=False),
     )
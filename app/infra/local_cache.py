@@ -0,0 +1,38 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class TTLCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key) -> Any | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            return None
+
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key, value) -> None:
+        self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def delete(self, key) -> None:
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -0,0 +1,25 @@
+import abc
+import time
+from contextlib import AbstractAsyncContextManager
+
+from app.infra.metrics import metrics
+
+
+class LockTimeoutError(Exception): ...
+
+
+class LockBackend(abc.ABC):
+    name: str = None
+
+    @abc.abstractmethod
+    def acquire_many(
+        self, keys: list[str], timeout: int = None, blocking_timeout: float = None
+    ) -> AbstractAsyncContextManager: ...
+
+    def acquire(self, key: str, timeout: int = None) -> AbstractAsyncContextManager:
+        return self.acquire_many([key], timeout=timeout)
+
+    def observe_wait(self, started: float) -> None:
+        metrics.summary("lock_wait_seconds", backend=self.name).observe(
+            time.perf_counter() - started
+        )
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from app.infra.locks.base import LockBackend, LockTimeoutError
+from app.infra.metrics import metrics
+
+
+class LocalLocks(LockBackend):
+    name = "local"
+
+    def __init__(self):
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._users: Counter[str] = Counter()
+
+    @asynccontextmanager
+    async def acquire_many(
+        self, keys: list[str], timeout: int = None, blocking_timeout: float = None
+    ):
+        keys = sorted(set(keys))
+        started = time.perf_counter()
+        for key in keys:
+            self._users[key] += 1
+            self._locks.setdefault(key, asyncio.Lock())
+
+        acquired = []
+        try:
+            for key in keys:
+                lock = self._locks[key]
+                if blocking_timeout is None:
+                    await lock.acquire()
+                else:
+                    remaining = blocking_timeout - (time.perf_counter() - started)
+                    try:
+                        await asyncio.wait_for(lock.acquire(), timeout=max(remaining, 0))
+                    except TimeoutError as e:
+                        metrics.counter("lock_timeouts", backend=self.name).inc()
+                        raise LockTimeoutError(f"Unable to acquire locks {keys}") from e
+                acquired.append(lock)
+
+            self.observe_wait(started)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+            for key in keys:
+                self._users[key] -= 1
+                if not self._users[key]:
+                    del self._users[key]
+                    del self._locks[key]
+
+
+_local_locks = LocalLocks()
+
+
+def get_local_locks() -> LocalLocks:
+    return _local_locks
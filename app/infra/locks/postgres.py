@@ -0,0 +1,50 @@
+import hashlib
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.infra.db.session import unit_of_work
+from app.infra.locks.base import LockBackend, LockTimeoutError
+from app.infra.metrics import metrics
+
+ADVISORY_LOCK_QUERY = text(
+    "SELECT pg_advisory_xact_lock(lock_id) FROM unnest(CAST(:lock_ids AS bigint[])) AS lock_id"
+)
+LOCK_TIMEOUT_QUERY = text("SELECT set_config('lock_timeout', :lock_timeout, true)")
+RESET_LOCK_TIMEOUT_QUERY = text("RESET lock_timeout")
+LOCK_NOT_AVAILABLE_SQLSTATE = "55P03"
+
+
+class PostgresAdvisoryLocks(LockBackend):
+    name = "postgres"
+
+    @staticmethod
+    def get_lock_id(key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    @asynccontextmanager
+    async def acquire_many(
+        self, keys: list[str], timeout: int = None, blocking_timeout: float = None
+    ):
+        lock_ids = sorted({self.get_lock_id(key) for key in keys})
+        started = time.perf_counter()
+        async with unit_of_work() as conn:
+            if blocking_timeout is not None:
+                await conn.execute(
+                    LOCK_TIMEOUT_QUERY, {"lock_timeout": f"{int(blocking_timeout * 1000)}ms"}
+                )
+            try:
+                await conn.execute(ADVISORY_LOCK_QUERY, {"lock_ids": lock_ids})
+            except DBAPIError as e:
+                if getattr(e.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE_SQLSTATE:
+                    raise
+                metrics.counter("lock_timeouts", backend=self.name).inc()
+                raise LockTimeoutError(f"Unable to acquire locks {sorted(keys)}") from e
+            if blocking_timeout is not None:
+                await conn.execute(RESET_LOCK_TIMEOUT_QUERY)
+
+            self.observe_wait(started)
+            yield
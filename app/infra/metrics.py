@@ -0,0 +1,60 @@
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Summary:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._counters: dict[str, Counter] = {}
+        self._summaries: dict[str, Summary] = {}
+
+    @staticmethod
+    def _get_key(name: str, labels: dict) -> str:
+        if not labels:
+            return name
+        labels_str = ",".join(f"{key}={value}" for key, value in sorted(labels.items()))
+        return f"{name}{{{labels_str}}}"
+
+    def counter(self, name: str, **labels) -> Counter:
+        key = self._get_key(name, labels)
+        if key not in self._counters:
+            self._counters[key] = Counter()
+        return self._counters[key]
+
+    def summary(self, name: str, **labels) -> Summary:
+        key = self._get_key(name, labels)
+        if key not in self._summaries:
+            self._summaries[key] = Summary()
+        return self._summaries[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": {key: counter.value for key, counter in self._counters.items()},
+            "summaries": {key: summary.snapshot() for key, summary in self._summaries.items()},
+        }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,123 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+import orjson
+
+from app.domain.balances import Balance
+from app.infra.config import settings
+from app.infra.local_cache import TTLCache
+from app.infra.metrics import metrics
+from app.infra.redis.client_cache import ClientSideCache
+
+COMPLETE_FIELD = "_complete"
+
+# KEYS[1] snapshot hash; ARGV: ttl seconds, '1' for a full load, then currency/version/balance
+# triples. A currency is only replaced by a higher version.
+WRITE_SCRIPT = """
+local written = 0
+for i = 3, #ARGV, 3 do
+    local current = redis.call('hget', KEYS[1], 'v:' .. ARGV[i])
+    if not current or tonumber(current) < tonumber(ARGV[i + 1]) then
+        redis.call('hset', KEYS[1], 'v:' .. ARGV[i], ARGV[i + 1], 'b:' .. ARGV[i], ARGV[i + 2])
+        written = written + 1
+    end
+end
+if ARGV[2] == '1' then
+    redis.call('hset', KEYS[1], '_complete', '1')
+end
+if redis.call('ttl', KEYS[1]) < 0 then
+    redis.call('expire', KEYS[1], ARGV[1])
+end
+return written
+"""
+
+
+def encode_balance(balance: Balance) -> str:
+    return orjson.dumps(balance, default=str).decode()
+
+
+def decode_balance(raw: str) -> Balance:
+    data = orjson.loads(raw)
+    data["id"] = UUID(data["id"])
+    data["created"] = datetime.fromisoformat(data["created"])
+    data["updated"] = datetime.fromisoformat(data["updated"])
+    data["merchant_id"] = UUID(data["merchant_id"])
+    data["amount"] = Decimal(data["amount"])
+    return Balance(**data)
+
+
+class BalanceSnapshotCache:
+    """Balances of a merchant with shards summed, one Redis hash per merchant id mirrored in
+    every worker. Writers push the new balances after commit, each currency carries the sum
+    of its shard versions so an older write never replaces a newer one."""
+
+    def __init__(self, client_cache: ClientSideCache, ttl_seconds: int):
+        self.client_cache = client_cache
+        self.ttl_seconds = ttl_seconds
+
+    async def get_many(self, merchant_ids: list[UUID]) -> dict[UUID, list[Balance]]:
+        snapshots = await self.client_cache.get_many(
+            [str(merchant_id) for merchant_id in merchant_ids]
+        )
+        return {
+            merchant_id: sorted(
+                (decode_balance(raw) for field, raw in snapshot.items() if field.startswith("b:")),
+                key=lambda balance: balance.currency,
+            )
+            for merchant_id in merchant_ids
+            # only written through so far, currencies may be missing
+            if COMPLETE_FIELD in (snapshot := snapshots.get(str(merchant_id), {}))
+        }
+
+    async def fill(self, merchant_id: UUID, balances: list[Balance]) -> None:
+        """Store every balance of the merchant, as loaded from the database."""
+        await self._write(merchant_id, balances, complete=True)
+
+    async def write_through(self, balances: list[Balance]) -> None:
+        """Store committed balances, shards already summed."""
+        by_merchant = defaultdict(list)
+        for balance in balances:
+            by_merchant[balance.merchant_id].append(balance)
+        for merchant_id, merchant_balances in by_merchant.items():
+            await self._write(merchant_id, merchant_balances, complete=False)
+
+    async def _write(self, merchant_id: UUID, balances: list[Balance], complete: bool) -> None:
+        args = [self.ttl_seconds, "1" if complete else "0"]
+        for balance in balances:
+            args += [balance.currency, balance.version, encode_balance(balance)]
+
+        written = await self.client_cache.write(str(merchant_id), WRITE_SCRIPT, args)
+        if written is not None and written < len(balances):
+            metrics.counter("balance_snapshot_stale_writes").inc(len(balances) - written)
+
+
+_balance_snapshot_cache: BalanceSnapshotCache | None = None
+
+
+def get_balance_snapshot_cache() -> BalanceSnapshotCache:
+    global _balance_snapshot_cache
+
+    if _balance_snapshot_cache is None:
+        _balance_snapshot_cache = BalanceSnapshotCache(
+            client_cache=ClientSideCache(
+                name="balances",
+                key_prefix="balance_snapshot:",
+                local_cache=TTLCache(
+                    max_size=settings.redis_client_cache_size,
+                    ttl_seconds=settings.redis_client_cache_ttl_seconds,
+                ),
+            ),
+            ttl_seconds=settings.balance_snapshot_ttl_seconds,
+        )
+
+    return _balance_snapshot_cache
+
+
+async def close_balance_snapshot_cache() -> None:
+    global _balance_snapshot_cache
+
+    if _balance_snapshot_cache is not None:
+        await _balance_snapshot_cache.client_cache.close()
+        _balance_snapshot_cache = None
@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+
+from app.infra.local_cache import TTLCache
+from app.infra.logging import get_logger
+from app.infra.metrics import metrics
+from app.infra.redis.connection import (
+    create_tracking_connections,
+    get_redis_client,
+    get_redis_script,
+)
+
+logger = get_logger(__name__)
+
+
+class TrackingLostError(Exception): ...
+
+
+class ClientSideCache:
+    """Worker-local mirror of the Redis hashes under key_prefix.
+
+    Redis pushes an invalidation for every write to the prefix (CLIENT TRACKING BCAST), so
+    local copies are served without a round trip and dropped as soon as any worker changes
+    the key. Local copies are only used while tracking is known to be active.
+    """
+
+    health_check_interval = 5.0
+    retry_interval = 1.0
+
+    def __init__(self, name: str, key_prefix: str, local_cache: TTLCache):
+        self.name = name
+        self.key_prefix = key_prefix
+        self.local_cache = local_cache
+        # key -> when its last invalidation arrived, for reads racing with writes
+        self._invalidated_at = TTLCache(max_size=local_cache.max_size, ttl_seconds=60)
+        self._ready = False
+        self._retry_at = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+
+    async def ensure_tracking(self) -> bool:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._ready = False
+            self._task = None
+        if self._ready:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+
+        async with self._lock:
+            if self._ready:
+                return True
+            try:
+                pubsub, tracking_conn, tracking_id = await create_tracking_connections(
+                    [self.key_prefix]
+                )
+            except RedisError as e:
+                logger.warning("Client tracking setup failed", cache=self.name, error=str(e))
+                self._retry_at = time.monotonic() + self.retry_interval
+                return False
+
+            # a reconnected pub/sub connection has a new id the tracking does not redirect to
+            pubsub.connection.register_connect_callback(self._on_reconnect)
+            self.local_cache.clear()
+            self._ready = True
+            self._task = loop.create_task(self._listen(pubsub, tracking_conn, tracking_id))
+        return True
+
+    def _on_reconnect(self, connection) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ready = False
+        self.local_cache.clear()
+
+    async def _listen(self, pubsub: PubSub, tracking_conn: Redis, tracking_id: int) -> None:
+        next_check = time.monotonic() + self.health_check_interval
+        try:
+            while self._ready:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    self._on_invalidated(message["data"])
+
+                if time.monotonic() >= next_check:
+                    if await tracking_conn.client_id() != tracking_id:
+                        raise TrackingLostError("Tracking connection reconnected")
+                    next_check = time.monotonic() + self.health_check_interval
+        except (RedisError, TrackingLostError) as e:
+            logger.warning("Client tracking lost", cache=self.name, error=str(e))
+        finally:
+            self._reset()
+            if pubsub.connection is not None:
+                pubsub.connection.deregister_connect_callback(self._on_reconnect)
+            await asyncio.gather(pubsub.aclose(), tracking_conn.aclose(), return_exceptions=True)
+
+    def _on_invalidated(self, keys: list[str] | None) -> None:
+        if keys is None:
+            # FLUSHDB / FLUSHALL
+            self.local_cache.clear()
+            return
+
+        now = time.monotonic()
+        for key in keys:
+            key = key.removeprefix(self.key_prefix)
+            self.local_cache.delete(key)
+            self._invalidated_at.set(key, now)
+        metrics.counter("client_cache_invalidations", cache=self.name).inc(len(keys))
+
+    async def get_many(self, keys: list[str]) -> dict[str, dict]:
+        values = {}
+        missing = []
+        tracking = await self.ensure_tracking()
+        for key in keys:
+            value = self.local_cache.get(key) if tracking else None
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+        metrics.counter("client_cache_hits", cache=self.name, layer="local").inc(len(values))
+
+        if not missing:
+            return values
+
+        started = time.monotonic()
+        try:
+            redis_conn = await get_redis_client()
+            async with redis_conn.pipeline(transaction=False) as pipe:
+                for key in missing:
+                    pipe.hgetall(self.key_prefix + key)
+                raw_values = await pipe.execute()
+        except RedisError as e:
+            logger.warning("Client cache lookup failed", cache=self.name, error=str(e))
+            return values
+
+        for key, value in zip(missing, raw_values, strict=True):
+            if not value:
+                metrics.counter("client_cache_misses", cache=self.name).inc()
+                continue
+
+            metrics.counter("client_cache_hits", cache=self.name, layer="redis").inc()
+            invalidated_at = self._invalidated_at.get(key)
+            if self._ready and (invalidated_at is None or invalidated_at < started):
+                self.local_cache.set(key, value)
+            values[key] = value
+        return values
+
+    async def write(self, key: str, script: str, args: list) -> int | None:
+        """Run a write script on the hash. The local copy is dropped right away, other
+        workers get the pushed invalidation."""
+        self.local_cache.delete(key)
+        self._invalidated_at.set(key, time.monotonic())
+
+        try:
+            write_script = await get_redis_script(script)
+            return await write_script(keys=[self.key_prefix + key], args=args)
+        except RedisError as e:
+            logger.warning("Client cache update failed", cache=self.name, error=str(e))
+            return None
+
+    async def close(self) -> None:
+        self._ready = False
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -1,12 +1,18 @@
 import redis.asyncio as redis
 from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+from redis.commands.core import AsyncScript
 
 from app.infra.config import settings
 from app.infra.logging import get_logger
 
 logger = get_logger(__name__)
 
+TRACKING_INVALIDATE_CHANNEL = "__redis__:invalidate"
+
 _redis_client: Redis | None = None
+# script source -> script registered on _redis_client
+_scripts: dict[str, AsyncScript] = {}
 
 
 async def get_redis_client() -> Redis:
@@ -32,4 +38,39 @@ async def close_redis() -> None:
         logger.info("Closing Redis connection")
         await _redis_client.close()
         _redis_client = None
+        _scripts.clear()
         logger.info("Redis connection closed")
+
+
+async def get_redis_script(source: str) -> AsyncScript:
+    """Script registered once per client. Calls go by EVALSHA, loading it on NOSCRIPT."""
+    redis_conn = await get_redis_client()
+    script = _scripts.get(source)
+    if script is None or script.registered_client is not redis_conn:
+        script = _scripts[source] = redis_conn.register_script(source)
+    return script
+
+
+async def create_tracking_connections(prefixes: list[str]) -> tuple[PubSub, Redis, int]:
+    """Connections for server-assisted client-side caching of keys under prefixes.
+
+    The asyncio client has no RESP3 push handling, so tracking runs in RESP2 redirect mode:
+    a pub/sub connection subscribed to __redis__:invalidate receives the invalidations and a
+    dedicated connection holds CLIENT TRACKING BCAST redirected to it. Tracking lives as long
+    as both connections do, the returned id of the tracking connection tells if it reconnected.
+    """
+    redis_conn = await get_redis_client()
+    pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+    await pubsub.connect()
+    await pubsub.connection.send_command("CLIENT", "ID")
+    redirect_id = await pubsub.connection.read_response()
+    await pubsub.subscribe(TRACKING_INVALIDATE_CHANNEL)
+
+    tracking_conn = await redis.from_url(
+        settings.redis_url,
+        encoding="utf-8",
+        decode_responses=True,
+        single_connection_client=True,
+    )
+    await tracking_conn.client_tracking_on(clientid=redirect_id, prefix=prefixes, bcast=True)
+    return pubsub, tracking_conn, await tracking_conn.client_id()
@@ -0,0 +1,95 @@
+import orjson
+from redis.exceptions import RedisError
+
+from app.infra.config import settings
+from app.infra.local_cache import TTLCache
+from app.infra.logging import get_logger
+from app.infra.metrics import metrics
+from app.infra.redis.connection import get_redis_client
+
+logger = get_logger(__name__)
+
+
+class IdempotencyCache:
+    key_prefix = "transfer_idempotency_"
+
+    def __init__(self, local_cache: TTLCache, ttl_seconds: int):
+        self.local_cache = local_cache
+        self.ttl_seconds = ttl_seconds
+
+    async def get_many(self, idempotency_keys: list[str]) -> dict[str, dict]:
+        results = {}
+        missing = []
+        for idempotency_key in idempotency_keys:
+            result = self.local_cache.get(idempotency_key)
+            if result is None:
+                missing.append(idempotency_key)
+            else:
+                results[idempotency_key] = result
+        metrics.counter("idempotency_cache_hits", layer="local").inc(len(results))
+
+        if not missing:
+            return results
+
+        try:
+            redis_conn = await get_redis_client()
+            raw_results = await redis_conn.mget([self.key_prefix + key for key in missing])
+        except RedisError as e:
+            logger.warning("Idempotency cache lookup failed", error=str(e))
+            raw_results = [None] * len(missing)
+
+        for idempotency_key, raw_result in zip(missing, raw_results, strict=True):
+            if raw_result is None:
+                metrics.counter("idempotency_cache_misses").inc()
+                continue
+            metrics.counter("idempotency_cache_hits", layer="redis").inc()
+            result = orjson.loads(raw_result)
+            self.local_cache.set(idempotency_key, result)
+            results[idempotency_key] = result
+
+        return results
+
+    async def get(self, idempotency_key: str) -> dict | None:
+        results = await self.get_many([idempotency_key])
+        return results.get(idempotency_key)
+
+    async def set_many(self, results: dict[str, dict]) -> None:
+        if not results:
+            return
+
+        serialized = {}
+        for idempotency_key, result in results.items():
+            serialized_result = orjson.dumps(result)
+            result = orjson.loads(serialized_result)
+            self.local_cache.set(idempotency_key, result)
+            serialized[self.key_prefix + idempotency_key] = serialized_result
+
+        try:
+            redis_conn = await get_redis_client()
+            async with redis_conn.pipeline(transaction=False) as pipe:
+                for key, serialized_result in serialized.items():
+                    pipe.set(key, serialized_result, ex=self.ttl_seconds)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Idempotency cache update failed", error=str(e))
+
+    async def set(self, idempotency_key: str, result: dict) -> None:
+        await self.set_many({idempotency_key: result})
+
+
+_idempotency_cache: IdempotencyCache | None = None
+
+
+def get_idempotency_cache() -> IdempotencyCache:
+    global _idempotency_cache
+
+    if _idempotency_cache is None:
+        _idempotency_cache = IdempotencyCache(
+            local_cache=TTLCache(
+                max_size=settings.idempotency_local_cache_size,
+                ttl_seconds=settings.idempotency_cache_ttl_seconds,
+            ),
+            ttl_seconds=settings.idempotency_cache_ttl_seconds,
+        )
+
+    return _idempotency_cache
@@ -1,14 +1,253 @@
+import asyncio
+import dataclasses
+import math
+import time
+import uuid
+from collections import defaultdict
 from contextlib import asynccontextmanager
 
+from app.infra.locks.base import LockBackend, LockTimeoutError
 from app.infra.logging import get_logger
-from app.infra.redis.connection import get_redis_client
+from app.infra.metrics import metrics
+from app.infra.redis.connection import get_redis_script
+from app.infra.redis.pubsub import get_redis_subscriber
 
 logger = get_logger(__name__)
 
+LOCK_RELEASED_CHANNEL_PREFIX = "lock_released:"
+
+ACQUIRE_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    local owner = redis.call('get', key)
+    if owner and owner ~= ARGV[1] then
+        return 0
+    end
+end
+for _, key in ipairs(KEYS) do
+    if tonumber(ARGV[2]) > 0 then
+        redis.call('set', key, ARGV[1], 'px', ARGV[2])
+    else
+        redis.call('set', key, ARGV[1])
+    end
+end
+return 1
+"""
+
+RELEASE_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('get', key) == ARGV[1] then
+        redis.call('del', key)
+        redis.call('publish', ARGV[2] .. key, 1)
+        released = released + 1
+    end
+end
+return released
+"""
+
+
+class LockReleaseNotifier:
+    def __init__(self):
+        self._waiters: dict[str, set[asyncio.Event]] = defaultdict(set)
+        self._subscribed_loop: asyncio.AbstractEventLoop | None = None
+
+    async def ensure_subscribed(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._subscribed_loop is loop:
+            return
+        self._subscribed_loop = loop
+        await get_redis_subscriber().subscribe(f"{LOCK_RELEASED_CHANNEL_PREFIX}*", self._notify)
+
+    def _notify(self, channel: str, data: str) -> None:
+        key = channel.removeprefix(LOCK_RELEASED_CHANNEL_PREFIX)
+        for event in self._waiters.get(key, ()):
+            event.set()
+
+    def register(self, keys: list[str], event: asyncio.Event) -> None:
+        for key in keys:
+            self._waiters[key].add(event)
+
+    def unregister(self, keys: list[str], event: asyncio.Event) -> None:
+        for key in keys:
+            waiters = self._waiters.get(key)
+            if waiters is None:
+                continue
+            waiters.discard(event)
+            if not waiters:
+                del self._waiters[key]
+
+
+_release_notifier = LockReleaseNotifier()
+
+
+class RedisLocks(LockBackend):
+    name = "redis"
+    retry_interval = 0.1
 
-class RedisLocks:
     @asynccontextmanager
-    async def acquire(self, key, timeout: int = None):
-        redis_conn = await get_redis_client()
-        async with redis_conn.lock(key, timeout=timeout):
+    async def acquire_many(
+        self, keys: list[str], timeout: int = None, blocking_timeout: float = None
+    ):
+        keys = sorted(set(keys))
+        token = uuid.uuid4().hex
+        started = time.perf_counter()
+        await self.wait_and_acquire(keys, token, timeout, blocking_timeout)
+        self.observe_wait(started)
+        try:
             yield
+        finally:
+            await self.release(keys, token)
+
+    async def try_acquire(self, keys: list[str], token: str, timeout: int = None) -> bool:
+        script = await get_redis_script(ACQUIRE_SCRIPT)
+        ttl_ms = int(timeout * 1000) if timeout else 0
+        return bool(await script(keys=keys, args=[token, ttl_ms]))
+
+    async def wait_and_acquire(
+        self, keys: list[str], token: str, timeout: int = None, blocking_timeout: float = None
+    ) -> None:
+        started = time.perf_counter()
+        if await self.try_acquire(keys, token, timeout):
+            return
+
+        await _release_notifier.ensure_subscribed()
+        released = asyncio.Event()
+        _release_notifier.register(keys, released)
+        try:
+            while True:
+                released.clear()
+                if await self.try_acquire(keys, token, timeout):
+                    return
+
+                elapsed = time.perf_counter() - started
+                if blocking_timeout is not None and elapsed >= blocking_timeout:
+                    metrics.counter("lock_timeouts", backend=self.name).inc()
+                    raise LockTimeoutError(f"Unable to acquire locks {keys}")
+
+                try:
+                    await asyncio.wait_for(released.wait(), timeout=self.retry_interval)
+                except TimeoutError:
+                    pass
+        finally:
+            _release_notifier.unregister(keys, released)
+
+    async def release(self, keys: list[str], token: str) -> None:
+        script = await get_redis_script(RELEASE_SCRIPT)
+        await script(keys=keys, args=[token, LOCK_RELEASED_CHANNEL_PREFIX])
+
+
+@dataclasses.dataclass
+class LocalKeyState:
+    lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)
+    users: int = 0
+    held: bool = False
+    expires_at: float = 0.0
+
+
+class CoalescingRedisLocks(RedisLocks):
+    """Two-level lock: waiters of one process queue on an asyncio.Lock per key and
+    only the head of the queue talks to Redis. On release the Redis lock is kept
+    and handed over to the next local waiter."""
+
+    def __init__(self):
+        self.token = uuid.uuid4().hex
+        self._states: dict[str, LocalKeyState] = {}
+
+    @asynccontextmanager
+    async def acquire_many(
+        self, keys: list[str], timeout: int = None, blocking_timeout: float = None
+    ):
+        keys = sorted(set(keys))
+        started = time.perf_counter()
+        states = []
+        for key in keys:
+            state = self._states.setdefault(key, LocalKeyState())
+            state.users += 1
+            states.append(state)
+
+        acquired = []
+        try:
+            for state in states:
+                if state.lock.locked():
+                    # never sit on Redis locks while queueing locally
+                    await self._release_held(keys[: len(acquired)], acquired)
+                await self._acquire_local(keys, state, started, blocking_timeout)
+                acquired.append(state)
+
+            await self._acquire_remote(keys, states, timeout, started, blocking_timeout)
+            self.observe_wait(started)
+            yield
+        finally:
+            await self._exit(keys, states, acquired)
+
+    async def _acquire_local(
+        self, keys: list[str], state: LocalKeyState, started: float, blocking_timeout: float
+    ) -> None:
+        if blocking_timeout is None:
+            await state.lock.acquire()
+            return
+
+        remaining = blocking_timeout - (time.perf_counter() - started)
+        try:
+            await asyncio.wait_for(state.lock.acquire(), timeout=max(remaining, 0))
+        except TimeoutError as e:
+            metrics.counter("lock_timeouts", backend=self.name).inc()
+            raise LockTimeoutError(f"Unable to acquire locks {keys}") from e
+
+    async def _acquire_remote(
+        self,
+        keys: list[str],
+        states: list[LocalKeyState],
+        timeout: int,
+        started: float,
+        blocking_timeout: float,
+    ) -> None:
+        now = time.monotonic()
+        if all(state.held for state in states) and (
+            not timeout or min(state.expires_at for state in states) - now >= timeout / 2
+        ):
+            metrics.counter("lock_handoffs", backend=self.name).inc()
+            return
+
+        if not await self.try_acquire(keys, self.token, timeout):
+            # all-or-nothing: drop partially held keys before waiting on the rest
+            await self._release_held(keys, states)
+            if blocking_timeout is not None:
+                blocking_timeout -= time.perf_counter() - started
+            await self.wait_and_acquire(keys, self.token, timeout, blocking_timeout)
+
+        expires_at = time.monotonic() + timeout if timeout else math.inf
+        for state in states:
+            state.held = True
+            state.expires_at = expires_at
+
+    async def _release_held(self, keys: list[str], states: list[LocalKeyState]) -> None:
+        held_keys = [key for key, state in zip(keys, states, strict=True) if state.held]
+        for key in held_keys:
+            self._states[key].held = False
+        if held_keys:
+            await self.release(held_keys, self.token)
+
+    async def _exit(
+        self, keys: list[str], states: list[LocalKeyState], acquired: list[LocalKeyState]
+    ) -> None:
+        for state in states:
+            state.users -= 1
+        try:
+            await self._release_held(
+                [key for key, state in zip(keys, states, strict=True) if not state.users],
+                [state for state in states if not state.users],
+            )
+        finally:
+            for state in acquired:
+                state.lock.release()
+            for key, state in zip(keys, states, strict=True):
+                if not state.users and self._states.get(key) is state:
+                    del self._states[key]
+
+
+_coalescing_redis_locks = CoalescingRedisLocks()
+
+
+def get_coalescing_redis_locks() -> CoalescingRedisLocks:
+    return _coalescing_redis_locks
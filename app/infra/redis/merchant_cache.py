@@ -0,0 +1,97 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from redis.exceptions import RedisError
+
+from app.domain.merchants import Merchant
+from app.infra.config import settings
+from app.infra.local_cache import TTLCache
+from app.infra.logging import get_logger
+from app.infra.metrics import metrics
+from app.infra.redis.connection import get_redis_client
+from app.infra.redis.pubsub import get_redis_subscriber
+
+logger = get_logger(__name__)
+
+MerchantsLoader = Callable[[list[str]], Awaitable[list[Merchant]]]
+
+
+class MerchantCache:
+    """Merchants by name, cached in the worker. Writers publish the changed names and every
+    worker drops them; the TTL bounds staleness if a message is lost."""
+
+    channel = "merchant_invalidated"
+
+    def __init__(self, local_cache: TTLCache):
+        self.local_cache = local_cache
+        self._subscribed_loop: asyncio.AbstractEventLoop | None = None
+
+    async def ensure_subscribed(self) -> bool:
+        loop = asyncio.get_running_loop()
+        if self._subscribed_loop is loop:
+            return True
+
+        try:
+            await get_redis_subscriber().subscribe(self.channel, self._on_invalidated)
+        except RedisError as e:
+            logger.warning("Merchant cache subscription failed", error=str(e))
+            return False
+        # anything cached before the subscription may have missed an invalidation
+        self.local_cache.clear()
+        self._subscribed_loop = loop
+        return True
+
+    def _on_invalidated(self, channel: str, data: str) -> None:
+        self.local_cache.delete(data)
+
+    async def get_many(self, names: list[str], loader: MerchantsLoader) -> list[Merchant]:
+        merchants = []
+        missing = []
+        for name in dict.fromkeys(names):
+            merchant = self.local_cache.get(name)
+            if merchant is None:
+                missing.append(name)
+            else:
+                merchants.append(merchant)
+        metrics.counter("merchant_cache_hits").inc(len(merchants))
+        metrics.counter("merchant_cache_misses").inc(len(missing))
+
+        if not missing:
+            return merchants
+
+        loaded = await loader(missing)
+        # cache only while invalidations are being received
+        if await self.ensure_subscribed():
+            for merchant in loaded:
+                self.local_cache.set(merchant.name, merchant)
+        return merchants + loaded
+
+    async def invalidate(self, names: list[str]) -> None:
+        for name in names:
+            self.local_cache.delete(name)
+
+        try:
+            redis_conn = await get_redis_client()
+            async with redis_conn.pipeline(transaction=False) as pipe:
+                for name in names:
+                    pipe.publish(self.channel, name)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Merchant cache invalidation failed", error=str(e))
+
+
+_merchant_cache: MerchantCache | None = None
+
+
+def get_merchant_cache() -> MerchantCache:
+    global _merchant_cache
+
+    if _merchant_cache is None:
+        _merchant_cache = MerchantCache(
+            local_cache=TTLCache(
+                max_size=settings.merchant_cache_size,
+                ttl_seconds=settings.merchant_cache_ttl_seconds,
+            )
+        )
+
+    return _merchant_cache
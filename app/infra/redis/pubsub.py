@@ -0,0 +1,102 @@
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable
+
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+
+from app.infra.logging import get_logger
+from app.infra.redis.connection import get_redis_client
+
+logger = get_logger(__name__)
+
+MessageHandler = Callable[[str, str], None]
+
+
+class RedisSubscriber:
+    def __init__(self):
+        self._handlers: dict[str, list[MessageHandler]] = defaultdict(list)
+        self._pubsub: PubSub | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+
+    @staticmethod
+    def _is_pattern(channel: str) -> bool:
+        return channel.endswith("*")
+
+    async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._pubsub = None
+            self._task = None
+
+        async with self._lock:
+            if self._pubsub is None:
+                redis_conn = await get_redis_client()
+                self._pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+                for subscribed_channel in self._handlers:
+                    await self._subscribe(subscribed_channel)
+
+            if channel not in self._handlers:
+                await self._subscribe(channel)
+            self._handlers[channel].append(handler)
+
+            if self._task is None or self._task.done():
+                self._task = loop.create_task(self._listen(self._pubsub))
+
+    async def _subscribe(self, channel: str) -> None:
+        if self._is_pattern(channel):
+            await self._pubsub.psubscribe(channel)
+        else:
+            await self._pubsub.subscribe(channel)
+
+    async def _listen(self, pubsub: PubSub) -> None:
+        while True:
+            try:
+                message = await pubsub.get_message(timeout=1.0)
+            except RedisError as e:
+                logger.warning("Redis subscriber connection error", error=str(e))
+                await asyncio.sleep(1)
+                continue
+
+            if message is None:
+                continue
+
+            channel = message.get("pattern") or message["channel"]
+            for handler in self._handlers.get(channel, []):
+                try:
+                    handler(message["channel"], message["data"])
+                except Exception as e:
+                    logger.error("Redis message handler failed", channel=channel, error=str(e))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+
+_subscriber: RedisSubscriber | None = None
+
+
+def get_redis_subscriber() -> RedisSubscriber:
+    global _subscriber
+
+    if _subscriber is None:
+        _subscriber = RedisSubscriber()
+
+    return _subscriber
+
+
+async def close_redis_subscriber() -> None:
+    global _subscriber
+
+    if _subscriber is not None:
+        await _subscriber.close()
+        _subscriber = None
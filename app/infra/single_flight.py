@@ -0,0 +1,60 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from functools import partial
+from typing import Any
+
+from app.infra.config import settings
+from app.infra.local_cache import TTLCache
+from app.infra.metrics import metrics
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution and its result.
+
+    The call runs in its own task, so a caller that goes away does not cancel it for
+    the others. With a result TTL, finished results are also reused for that long.
+    Keys are tuples starting with the kind of call.
+    """
+
+    def __init__(self, max_size: int, result_ttl_seconds: float = 0):
+        self._calls: dict[tuple, asyncio.Future] = {}
+        self._results = TTLCache(max_size, result_ttl_seconds) if result_ttl_seconds else None
+
+    async def do(self, key: tuple, func: Callable[[], Awaitable[Any]]) -> Any:
+        if self._results is not None:
+            res = self._results.get(key)
+            if res is not None:
+                metrics.counter("single_flight_calls", kind=key[0], result="cached").inc()
+                return res
+
+        call = self._calls.get(key)
+        if call is None:
+            metrics.counter("single_flight_calls", kind=key[0], result="executed").inc()
+            call = self._calls[key] = asyncio.ensure_future(func())
+            call.add_done_callback(partial(self._on_done, key))
+        else:
+            metrics.counter("single_flight_calls", kind=key[0], result="shared").inc()
+        return await asyncio.shield(call)
+
+    def _on_done(self, key: tuple, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # also marks the exception retrieved when every caller is gone
+        if call.cancelled() or call.exception() is not None:
+            return
+        if self._results is not None:
+            self._results.set(key, call.result())
+
+
+_single_flight: SingleFlight | None = None
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+
+    if _single_flight is None:
+        _single_flight = SingleFlight(
+            max_size=settings.single_flight_max_size,
+            result_ttl_seconds=settings.single_flight_result_ttl_ms / 1000,
+        )
+    return _single_flight
@@ -1,10 +1,18 @@
+from collections import defaultdict
 from dataclasses import asdict
 
+from app.domain.balances import Balance
 from app.infra.db.repos.balances import BalancesRepo
 from app.infra.db.repos.exceptions import EntityAlreadyExistsError, ForeignKeyViolationError
 from app.infra.db.repos.merchants import MerchantsRepo
+from app.infra.redis.balance_cache import BalanceSnapshotCache
+from app.infra.redis.merchant_cache import MerchantCache
 from app.logic.balances.exceptions import BalanceAlreadyExistError, BalanceMerchantDoesNotExistError
-from app.logic.utils import normalize_dict
+from app.logic.utils import (
+    get_merchants_with_balances,
+    normalize_dict,
+    sum_balance_shards,
+)
 
 
 class BalancesService:
@@ -12,9 +20,13 @@ class BalancesService:
         self,
         balances_repo: BalancesRepo,
         merchants_repo: MerchantsRepo,
+        merchant_cache: MerchantCache | None = None,
+        balance_cache: BalanceSnapshotCache | None = None,
     ):
         self.balances_repo = balances_repo
         self.merchants_repo = merchants_repo
+        self.merchant_cache = merchant_cache
+        self.balance_cache = balance_cache
 
     async def create_balance(self, balance: dict) -> dict:
         try:
@@ -24,11 +36,42 @@ class BalancesService:
         except ForeignKeyViolationError as e:
             raise BalanceMerchantDoesNotExistError("Merchant does not exist") from e
 
+        if self.balance_cache:
+            # transfers may have credited other shards of the currency already
+            shards = await self.balances_repo.search_by_merchants([res.merchant_id], res.currency)
+            await self.balance_cache.write_through(sum_balance_shards(shards))
         return normalize_dict(asdict(res))
 
-    async def get_balances(self, merchant_name: str) -> list:
-        merchant = await self.merchants_repo.search_first_row(name=merchant_name, archived=False)
-        if not merchant:
+    async def create_balances(self, balances: list[dict]) -> list[dict | Exception]:
+        res = await self.balances_repo.bulk_insert(balances)
+
+        if self.balance_cache:
+            created = defaultdict(list)
+            for balance in res:
+                if not isinstance(balance, Exception):
+                    created[balance.currency].append(balance.merchant_id)
+            for currency, merchant_ids in created.items():
+                shards = await self.balances_repo.search_by_merchants(merchant_ids, currency)
+                await self.balance_cache.write_through(sum_balance_shards(shards))
+
+        results = []
+        for balance in res:
+            if isinstance(balance, EntityAlreadyExistsError):
+                results.append(BalanceAlreadyExistError(str(balance)))
+            elif isinstance(balance, ForeignKeyViolationError):
+                results.append(BalanceMerchantDoesNotExistError("Merchant does not exist"))
+            else:
+                results.append(normalize_dict(asdict(balance)))
+        return results
+
+    async def get_balances_version(self, merchant_name: str) -> list[tuple[str, int]] | None:
+        version = await self.merchants_repo.get_version_with_balances(merchant_name)
+        return version[2] if version else None
+
+    async def get_balances(self, merchant_name: str) -> list[Balance]:
+        merchants = await get_merchants_with_balances(
+            self.merchants_repo, self.merchant_cache, self.balance_cache, [merchant_name]
+        )
+        if not merchants:
             raise BalanceMerchantDoesNotExistError("Merchant does not exist")
-        balances = await self.balances_repo.search(merchant_id=merchant.id, archived=False)
-        return [normalize_dict(asdict(balance)) for balance in balances]
+        return merchants[0].balances
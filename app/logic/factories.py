@@ -1,9 +1,20 @@
+from app.infra.config import settings
 from app.infra.db.repos.balances import BalancesRepo
 from app.infra.db.repos.merchants import MerchantsRepo
 from app.infra.db.repos.transfers import TransfersRepo
-from app.infra.redis.lock import RedisLocks
+from app.infra.locks.base import LockBackend
+from app.infra.locks.local import get_local_locks
+from app.infra.locks.postgres import PostgresAdvisoryLocks
+from app.infra.redis.balance_cache import BalanceSnapshotCache, get_balance_snapshot_cache
+from app.infra.redis.idempotency import get_idempotency_cache
+from app.infra.redis.lock import RedisLocks, get_coalescing_redis_locks
+from app.infra.redis.merchant_cache import MerchantCache, get_merchant_cache
+from app.infra.single_flight import SingleFlight, get_single_flight
 from app.logic.balances.service import BalancesService
 from app.logic.merchants.service import MerchantsService
+from app.logic.transfers.archive import TransferArchive
+from app.logic.transfers.group_commit import get_transfer_group_committer
+from app.logic.transfers.importer import TransferImporter
 from app.logic.transfers.service import TransferService
 
 
@@ -11,6 +22,9 @@ def merchant_service_factory():
     return MerchantsService(
         merchants_repo=MerchantsRepo(),
         balances_repo=BalancesRepo(),
+        merchant_cache=merchant_cache_factory(),
+        balance_cache=balance_cache_factory(),
+        single_flight=single_flight_factory(),
     )
 
 
@@ -18,13 +32,57 @@ def balance_service_factory():
     return BalancesService(
         balances_repo=BalancesRepo(),
         merchants_repo=MerchantsRepo(),
+        merchant_cache=merchant_cache_factory(),
+        balance_cache=balance_cache_factory(),
     )
 
 
+def merchant_cache_factory() -> MerchantCache | None:
+    return get_merchant_cache() if settings.merchant_cache_enabled else None
+
+
+def balance_cache_factory() -> BalanceSnapshotCache | None:
+    return get_balance_snapshot_cache() if settings.balance_snapshot_cache_enabled else None
+
+
+def single_flight_factory() -> SingleFlight | None:
+    return get_single_flight() if settings.single_flight_enabled else None
+
+
+def lock_backend_factory() -> LockBackend:
+    if settings.lock_backend == "postgres":
+        return PostgresAdvisoryLocks()
+    if settings.lock_backend == "local":
+        return get_local_locks()
+    if settings.lock_coalescing_enabled:
+        return get_coalescing_redis_locks()
+    return RedisLocks()
+
+
 def transfer_service_factory():
     return TransferService(
         balances_repo=BalancesRepo(),
         merchants_repo=MerchantsRepo(),
         transfers_repo=TransfersRepo(),
-        redis_locks=RedisLocks(),
+        locks=lock_backend_factory(),
+        mode=settings.transfer_mode,
+        group_committer=(
+            get_transfer_group_committer() if settings.transfer_group_commit_enabled else None
+        ),
+        idempotency_cache=get_idempotency_cache() if settings.idempotency_cache_enabled else None,
+        merchant_cache=merchant_cache_factory(),
+        balance_cache=balance_cache_factory(),
+        single_flight=single_flight_factory(),
+        archive=TransferArchive(settings.transfers_archive_dir),
+        optimistic_max_retries=settings.transfer_optimistic_max_retries,
+        optimistic_backoff_ms=settings.transfer_optimistic_backoff_ms,
+    )
+
+
+def transfer_importer_factory():
+    return TransferImporter(
+        merchants_repo=MerchantsRepo(),
+        balances_repo=BalancesRepo(),
+        transfers_repo=TransfersRepo(),
+        balance_cache=balance_cache_factory(),
     )
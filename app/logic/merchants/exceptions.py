@@ -2,3 +2,6 @@ class MerchantAlreadyExistError(Exception): ...
 
 
 class MerchantDoesNotExistError(Exception): ...
+
+
+class MerchantsBulkLimitError(Exception): ...
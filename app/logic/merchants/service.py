@@ -1,10 +1,22 @@
 from dataclasses import asdict
+from datetime import datetime
+from functools import partial
+from uuid import UUID
 
+from app.domain.merchants import Merchant, MerchantWithBalances
+from app.infra.config import settings
 from app.infra.db.repos.balances import BalancesRepo
 from app.infra.db.repos.exceptions import EntityAlreadyExistsError
 from app.infra.db.repos.merchants import MerchantsRepo
-from app.logic.merchants.exceptions import MerchantAlreadyExistError, MerchantDoesNotExistError
-from app.logic.utils import convert_dt_to_dict
+from app.infra.redis.balance_cache import BalanceSnapshotCache
+from app.infra.redis.merchant_cache import MerchantCache
+from app.infra.single_flight import SingleFlight
+from app.logic.merchants.exceptions import (
+    MerchantAlreadyExistError,
+    MerchantDoesNotExistError,
+    MerchantsBulkLimitError,
+)
+from app.logic.utils import get_merchants_with_balances, run_single_flight
 
 
 class MerchantsService:
@@ -12,9 +24,15 @@ class MerchantsService:
         self,
         merchants_repo: MerchantsRepo,
         balances_repo: BalancesRepo,
+        merchant_cache: MerchantCache | None = None,
+        balance_cache: BalanceSnapshotCache | None = None,
+        single_flight: SingleFlight | None = None,
     ):
         self.merchants_repo = merchants_repo
         self.balances_repo = balances_repo
+        self.merchant_cache = merchant_cache
+        self.balance_cache = balance_cache
+        self.single_flight = single_flight
 
     async def create_merchant(self, merchant: dict) -> dict:
         try:
@@ -22,15 +40,59 @@ class MerchantsService:
         except EntityAlreadyExistsError as e:
             raise MerchantAlreadyExistError(str(e)) from e
 
+        if self.merchant_cache:
+            await self.merchant_cache.invalidate([res.name])
         return asdict(res)
 
-    async def get_merchants_with_balances(self, merchant_name: str) -> dict:
-        merchant = await self.merchants_repo.search_first_row(name=merchant_name, archived=False)
-        if merchant is None:
+    async def create_merchants(self, merchants: list[dict]) -> list[dict | Exception]:
+        res = await self.merchants_repo.bulk_insert(merchants)
+
+        created = [merchant for merchant in res if not isinstance(merchant, Exception)]
+        if self.merchant_cache and created:
+            await self.merchant_cache.invalidate([merchant.name for merchant in created])
+        return [
+            MerchantAlreadyExistError(str(merchant))
+            if isinstance(merchant, EntityAlreadyExistsError)
+            else asdict(merchant)
+            for merchant in res
+        ]
+
+    async def get_merchants_with_balances(self, merchant_name: str) -> MerchantWithBalances:
+        merchants = await run_single_flight(
+            self.single_flight,
+            ("merchant_with_balances", merchant_name),
+            partial(
+                get_merchants_with_balances,
+                self.merchants_repo,
+                self.merchant_cache,
+                self.balance_cache,
+                [merchant_name],
+            ),
+        )
+        if not merchants:
             raise MerchantDoesNotExistError("Merchant not found")
-        balances = await self.balances_repo.search(merchant_id=merchant.id, archived=False)
-        return {**convert_dt_to_dict(merchant), "balances": convert_dt_to_dict(balances)}
+        return merchants[0]
+
+    async def get_many_merchants_with_balances(
+        self, merchant_names: list[str]
+    ) -> list[MerchantWithBalances]:
+        if len(merchant_names) > settings.merchants_bulk_max_names:
+            raise MerchantsBulkLimitError(
+                f"At most {settings.merchants_bulk_max_names} merchants per request"
+            )
+        return await get_merchants_with_balances(
+            self.merchants_repo, self.merchant_cache, self.balance_cache, merchant_names
+        )
+
+    async def get_merchant_version(
+        self, merchant_name: str
+    ) -> tuple[UUID, datetime, list[tuple[str, int]]] | None:
+        return await self.merchants_repo.get_version_with_balances(merchant_name)
+
+    async def get_merchants_version(self) -> tuple[int, datetime | None]:
+        return await self.merchants_repo.get_version()
 
-    async def get_merchants(self) -> list:
-        res = await self.merchants_repo.search(archived=False)
-        return convert_dt_to_dict(res)
+    async def get_merchants(self) -> list[Merchant]:
+        return await run_single_flight(
+            self.single_flight, ("merchants",), partial(self.merchants_repo.search, archived=False)
+        )
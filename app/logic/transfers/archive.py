@@ -0,0 +1,376 @@
+import asyncio
+import os
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from urllib.parse import quote
+from uuid import UUID
+
+from app.domain.transfers import Transfer, TransferWithMerchant
+from app.infra.config import settings
+from app.infra.db.repos.transfers import TransfersRepo
+from app.infra.logging import get_logger
+from app.infra.metrics import metrics
+from app.logic.transfers.exceptions import TransferArchiveError
+
+logger = get_logger(__name__)
+
+ROW_GROUP_SIZE = 10000
+
+
+def import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise TransferArchiveError(
+            "The transfer archive needs pyarrow: poetry install --extras archive"
+        ) from e
+    return pa, ds, pq
+
+
+def get_file_schema(pa):
+    # currency and month are not stored in the files, they come from the directory names
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("created", pa.timestamp("us", tz="UTC")),
+            ("updated", pa.timestamp("us", tz="UTC")),
+            ("archived", pa.bool_()),
+            ("from_merchant_id", pa.string()),
+            ("to_merchant_id", pa.string()),
+            ("from_merchant", pa.string()),
+            ("to_merchant", pa.string()),
+            ("amount", pa.decimal128(12, 8)),
+            ("percent_fee", pa.decimal128(12, 2)),
+            ("idempotency_key", pa.string()),
+        ]
+    )
+
+
+def get_partition_schema(pa):
+    # months are read one directory at a time, currency is the partition inside a month
+    return pa.schema([("currency", pa.string())])
+
+
+def fsync_directory(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+class TransferArchive:
+    """Transfers moved out of Postgres, as zstd-compressed Parquet files under
+    ``root/month=YYYY-MM/currency=XXX/``.
+
+    Rows in a file are sorted by sender, so row group statistics let reads filtered by
+    merchant skip most of a file, and filters on currency and time skip whole directories.
+    The methods block and are meant to run in a thread.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def write(self, rows: list[dict]) -> list[str]:
+        """Write rows of transfers, oldest first, returns the paths of the new files."""
+        pa, _, pq = import_pyarrow()
+        groups: dict[tuple[str, str], list[dict]] = defaultdict(list)
+        for row in rows:
+            groups[(f"{as_utc(row['created']):%Y-%m}", row["currency"])].append(row)
+
+        paths = []
+        for (month, currency), group in groups.items():
+            directory = os.path.join(
+                self.root, f"month={month}", f"currency={quote(currency, safe='')}"
+            )
+            os.makedirs(directory, exist_ok=True)
+            # named after the oldest row, so a batch archived again after a failed delete
+            # replaces its file instead of adding another one
+            path = os.path.join(directory, f"{group[0]['id']}.parquet")
+            group = sorted(group, key=lambda r: (r["from_merchant"], r["created"]))
+            table = pa.Table.from_pylist(
+                [self.to_record(row) for row in group], schema=get_file_schema(pa)
+            )
+            # files starting with a dot are skipped by readers until the rename
+            tmp_path = os.path.join(directory, f".{os.path.basename(path)}.tmp")
+            with open(tmp_path, "wb") as f:
+                pq.write_table(table, f, compression="zstd", row_group_size=ROW_GROUP_SIZE)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            # the rows are deleted from Postgres next, the rename and any new directories
+            # have to survive a crash first
+            for synced in (directory, os.path.dirname(directory), self.root):
+                fsync_directory(synced)
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def to_record(row: dict) -> dict:
+        return {
+            "id": str(row["id"]),
+            "created": as_utc(row["created"]),
+            "updated": as_utc(row["updated"]),
+            "archived": row["archived"],
+            "from_merchant_id": str(row["from_merchant_id"]),
+            "to_merchant_id": str(row["to_merchant_id"]),
+            "from_merchant": row["from_merchant"],
+            "to_merchant": row["to_merchant"],
+            "amount": row["amount"],
+            "percent_fee": row["percent_fee"],
+            "idempotency_key": row["idempotency_key"],
+        }
+
+    def search(
+        self,
+        from_merchant: str | None = None,
+        to_merchant: str | None = None,
+        currency: str | None = None,
+        limit: int | None = None,
+        after: tuple[datetime, UUID] | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ) -> list[TransferWithMerchant]:
+        """Same filters and order as TransfersRepo.get_transfers_with_merchant_names.
+
+        Months are read newest first, one directory at a time, until the limit is reached.
+        """
+        pa, ds, _ = import_pyarrow()
+        condition = self.get_condition(
+            pa, ds, from_merchant, to_merchant, currency, after, created_from, created_to
+        )
+        newest = min(
+            (as_utc(value) for value in (created_to, after and after[0]) if value is not None),
+            default=None,
+        )
+        transfers_list = []
+        seen = set()
+        for month in self.get_months(created_from, newest):
+            table = (
+                self.get_dataset(pa, ds, month)
+                .to_table(filter=condition)
+                .sort_by([("created", "descending"), ("id", "descending")])
+            )
+            for row in table.to_pylist():
+                # a batch whose delete failed may have been written twice
+                if row["id"] in seen:
+                    continue
+                seen.add(row["id"])
+                transfers_list.append(self.to_transfer(row))
+                if limit is not None and len(transfers_list) >= limit:
+                    return transfers_list
+        return transfers_list
+
+    def get_by_keys(self, keys: list[tuple[UUID, datetime]]) -> list[Transfer]:
+        """Transfers by (id, created), only the directories of their months are read."""
+        months = {f"{as_utc(created):%Y-%m}" for _, created in keys}
+        if not months:
+            return []
+
+        pa, ds, _ = import_pyarrow()
+        condition = ~ds.field("archived") & ds.field("id").isin(
+            [str(transfer_id) for transfer_id, _ in keys]
+        )
+        # a batch whose delete failed may have been written twice
+        rows = {
+            row["id"]: row
+            for month in self.get_months()
+            if month in months
+            for row in self.get_dataset(pa, ds, month).to_table(filter=condition).to_pylist()
+        }
+        return [
+            Transfer(
+                id=UUID(row["id"]),
+                created=row["created"],
+                updated=row["updated"],
+                archived=row["archived"],
+                from_merchant_id=UUID(row["from_merchant_id"]),
+                to_merchant_id=UUID(row["to_merchant_id"]),
+                amount=row["amount"],
+                currency=row["currency"],
+                percent_fee=row["percent_fee"],
+                idempotency_key=row["idempotency_key"],
+            )
+            for row in rows.values()
+        ]
+
+    def get_months(
+        self, oldest: datetime | None = None, newest: datetime | None = None
+    ) -> list[str]:
+        """Months present in the archive between the bounds, newest first."""
+        if not os.path.isdir(self.root):
+            return []
+        months = sorted(
+            (
+                name.removeprefix("month=")
+                for name in os.listdir(self.root)
+                if name.startswith("month=")
+            ),
+            reverse=True,
+        )
+        return [
+            month
+            for month in months
+            if (oldest is None or month >= f"{as_utc(oldest):%Y-%m}")
+            and (newest is None or month <= f"{as_utc(newest):%Y-%m}")
+        ]
+
+    def get_dataset(self, pa, ds, month: str):
+        partition_schema = get_partition_schema(pa)
+        return ds.dataset(
+            os.path.join(self.root, f"month={month}"),
+            schema=pa.schema([*get_file_schema(pa), *partition_schema]),
+            format="parquet",
+            partitioning=ds.partitioning(partition_schema, flavor="hive"),
+        )
+
+    @staticmethod
+    def get_condition(
+        pa,
+        ds,
+        from_merchant: str | None,
+        to_merchant: str | None,
+        currency: str | None,
+        after: tuple[datetime, UUID] | None,
+        created_from: datetime | None,
+        created_to: datetime | None,
+    ):
+        """Filter on the row group statistics of the files and on the currency directories,
+        months are picked by get_months."""
+
+        def timestamp(value: datetime):
+            return pa.scalar(as_utc(value), type=pa.timestamp("us", tz="UTC"))
+
+        condition = ~ds.field("archived")
+        if from_merchant:
+            condition &= ds.field("from_merchant") == from_merchant
+        if to_merchant:
+            condition &= ds.field("to_merchant") == to_merchant
+        if currency:
+            condition &= ds.field("currency") == currency
+        if created_from is not None:
+            condition &= ds.field("created") >= timestamp(created_from)
+        if created_to is not None:
+            condition &= ds.field("created") < timestamp(created_to)
+        if after is not None:
+            created, transfer_id = after
+            # uuids compare in Postgres like their lowercase hex strings
+            condition &= (ds.field("created") < timestamp(created)) | (
+                (ds.field("created") == timestamp(created)) & (ds.field("id") < str(transfer_id))
+            )
+        return condition
+
+    @staticmethod
+    def to_transfer(row: dict) -> TransferWithMerchant:
+        return TransferWithMerchant(
+            id=UUID(row["id"]),
+            created=row["created"],
+            updated=row["updated"],
+            archived=row["archived"],
+            from_merchant=row["from_merchant"],
+            to_merchant=row["to_merchant"],
+            amount=row["amount"],
+            percent_fee=row["percent_fee"],
+            currency=row["currency"],
+            idempotency_key=row["idempotency_key"],
+        )
+
+
+class TransferArchiver:
+    """Moves transfers older than the retention window from Postgres to the archive.
+
+    Each batch is one transaction: the oldest transfers are written to Parquet and deleted.
+    Their idempotency keys stay taken. One worker archives at a time, the others skip
+    the run.
+    """
+
+    def __init__(
+        self,
+        transfers_repo: TransfersRepo,
+        archive: TransferArchive,
+        retention_days: int,
+        batch_size: int,
+        interval_seconds: float,
+    ):
+        self.transfers_repo = transfers_repo
+        self.archive = archive
+        self.retention = timedelta(days=retention_days)
+        self.batch_size = batch_size
+        self.interval = interval_seconds
+        self._task: asyncio.Task | None = None
+
+    async def run(
+        self, before: datetime | None = None, on_progress: Callable[[int], None] | None = None
+    ) -> int:
+        before = before or datetime.now(UTC) - self.retention
+        archived = 0
+        while True:
+            async with self.transfers_repo.transaction():
+                if not await self.transfers_repo.try_lock_archive():
+                    logger.info("Transfer archival is already running")
+                    return archived
+                rows = await self.transfers_repo.get_transfers_to_archive(before, self.batch_size)
+                if not rows:
+                    return archived
+                await asyncio.to_thread(self.archive.write, rows)
+                await self.transfers_repo.delete_many([row["id"] for row in rows], before)
+
+            archived += len(rows)
+            metrics.counter("transfers_archived").inc(len(rows))
+            if on_progress:
+                on_progress(archived)
+            if len(rows) < self.batch_size:
+                return archived
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                archived = await self.run()
+                if archived:
+                    logger.info("Transfers archived", count=archived)
+            except Exception as e:
+                logger.error("Transfer archival failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+_archiver: TransferArchiver | None = None
+
+
+def get_transfer_archiver() -> TransferArchiver:
+    global _archiver
+
+    if _archiver is None:
+        _archiver = TransferArchiver(
+            transfers_repo=TransfersRepo(),
+            archive=TransferArchive(settings.transfers_archive_dir),
+            retention_days=settings.transfers_archive_retention_days,
+            batch_size=settings.transfers_archive_batch_size,
+            interval_seconds=settings.transfers_archive_interval_seconds,
+        )
+
+    return _archiver
+
+
+async def close_transfer_archiver() -> None:
+    global _archiver
+
+    if _archiver is not None:
+        await _archiver.close()
+        _archiver = None
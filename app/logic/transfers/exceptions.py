@@ -5,3 +5,18 @@ class TransferBalanceDoesNotExistError(Exception): ...
 
 
 class TransferInsufficientFundsError(Exception): ...
+
+
+class TransferConflictError(Exception): ...
+
+
+class TransferIdempotencyKeyConflictError(Exception): ...
+
+
+class TransferInvalidCursorError(Exception): ...
+
+
+class TransferImportError(Exception): ...
+
+
+class TransferArchiveError(Exception): ...
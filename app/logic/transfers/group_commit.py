@@ -0,0 +1,155 @@
+import asyncio
+import contextvars
+import dataclasses
+import time
+
+from app.domain.transfers import Transfer
+from app.infra.config import settings
+from app.infra.db.repos.balances import BalancesRepo
+from app.infra.db.repos.exceptions import DatabaseError, EntityAlreadyExistsError
+from app.infra.db.repos.transfers import TransfersRepo
+from app.infra.logging import get_logger
+from app.infra.metrics import metrics
+from app.logic.transfers.models import CreateTransferDict
+
+logger = get_logger(__name__)
+
+
+@dataclasses.dataclass
+class PendingTransfer:
+    payload: CreateTransferDict
+    idempotency_key: str
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class TransferGroupCommitter:
+    def __init__(
+        self,
+        transfers_repo: TransfersRepo,
+        balances_repo: BalancesRepo,
+        window_ms: float,
+        max_items: int,
+    ):
+        self.transfers_repo = transfers_repo
+        self.balances_repo = balances_repo
+        self.window = window_ms / 1000
+        self.max_items = max_items
+        self._pending: list[PendingTransfer] = []
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._commit_tasks: set[asyncio.Task] = set()
+
+    async def submit(self, payload: CreateTransferDict, idempotency_key: str) -> Transfer | None:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(
+            PendingTransfer(
+                payload=payload,
+                idempotency_key=idempotency_key,
+                future=future,
+                enqueued_at=time.perf_counter(),
+            )
+        )
+
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._commit(batch), context=contextvars.Context())
+        self._commit_tasks.add(task)
+        task.add_done_callback(self._commit_tasks.discard)
+
+    async def _commit(self, batch: list[PendingTransfer]) -> None:
+        started = time.perf_counter()
+        metrics.summary("transfer_group_commit_batch_size").observe(len(batch))
+        for item in batch:
+            metrics.summary("transfer_group_commit_queue_delay_seconds").observe(
+                started - item.enqueued_at
+            )
+
+        try:
+            async with self.transfers_repo.transaction() as conn:
+                # the items' row locks are held until the whole group commits, taking them
+                # up front in id order keeps groups with opposite transfers from deadlocking
+                await self.balances_repo.lock_by_merchant_names(
+                    list(
+                        {item.payload["from_merchant"] for item in batch}
+                        | {item.payload["to_merchant"] for item in batch}
+                    ),
+                    list({item.payload["currency"] for item in batch}),
+                )
+                results = [await self._apply(conn, item) for item in batch]
+        except Exception as e:
+            logger.error("Transfer group commit failed", batch_size=len(batch), error=str(e))
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        metrics.summary("transfer_group_commit_seconds").observe(time.perf_counter() - started)
+        for item, transfer in zip(batch, results, strict=True):
+            if item.future.done():
+                continue
+            if isinstance(transfer, DatabaseError):
+                item.future.set_exception(transfer)
+            else:
+                item.future.set_result(transfer)
+
+    async def _apply(self, conn, item: PendingTransfer) -> Transfer | DatabaseError | None:
+        try:
+            async with conn.begin_nested():
+                return await self.transfers_repo.apply_transfer(
+                    from_merchant=item.payload["from_merchant"],
+                    to_merchant=item.payload["to_merchant"],
+                    amount=item.payload["amount"],
+                    currency=item.payload["currency"],
+                    idempotency_key=item.idempotency_key,
+                )
+        except EntityAlreadyExistsError:
+            return None
+        except DatabaseError as e:
+            # the savepoint is rolled back, the rest of the group still commits
+            logger.error("Transfer group commit item failed", error=str(e))
+            return e
+
+    async def close(self) -> None:
+        self._flush()
+        if self._commit_tasks:
+            await asyncio.gather(*self._commit_tasks, return_exceptions=True)
+
+
+_group_committer: TransferGroupCommitter | None = None
+
+
+def get_transfer_group_committer() -> TransferGroupCommitter:
+    global _group_committer
+
+    if _group_committer is None:
+        _group_committer = TransferGroupCommitter(
+            transfers_repo=TransfersRepo(),
+            balances_repo=BalancesRepo(),
+            window_ms=settings.transfer_group_commit_window_ms,
+            max_items=settings.transfer_group_commit_max_items,
+        )
+
+    return _group_committer
+
+
+async def close_transfer_group_committer() -> None:
+    global _group_committer
+
+    if _group_committer is not None:
+        await _group_committer.close()
+        _group_committer = None
@@ -0,0 +1,172 @@
+import csv
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from datetime import UTC, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import islice
+from uuid import UUID
+
+from app.domain.merchants import Merchant
+from app.infra.db.repos.balances import BalancesRepo
+from app.infra.db.repos.merchants import MerchantsRepo
+from app.infra.db.repos.transfers import TransfersRepo
+from app.infra.redis.balance_cache import BalanceSnapshotCache
+from app.logic.transfers.exceptions import TransferImportError
+from app.logic.transfers.service import TransferService
+from app.logic.utils import sum_balance_shards
+
+# scales of transfers.amount and transfers.percent_fee, rounded like Postgres does
+AMOUNT_QUANTUM = Decimal("0.00000001")
+FEE_QUANTUM = Decimal("0.01")
+
+
+def read_csv_chunks(path: str, chunk_size: int) -> Iterator[list[dict]]:
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        while chunk := list(islice(reader, chunk_size)):
+            # CSV has no nulls, empty cells stand for missing values
+            yield [{key: value or None for key, value in row.items()} for row in chunk]
+
+
+def read_parquet_chunks(path: str, chunk_size: int) -> Iterator[list[dict]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise TransferImportError(
+            "Reading Parquet needs pyarrow: poetry install --extras archive"
+        ) from e
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+
+class TransferImporter:
+    """Replays historical transfers with COPY instead of going through create_transfer.
+
+    The import is one transaction. Each chunk has its idempotency keys checked with one
+    lookup and is copied into transfers, balance changes are summed in memory and applied
+    in one set-based statement at the end.
+    """
+
+    def __init__(
+        self,
+        merchants_repo: MerchantsRepo,
+        balances_repo: BalancesRepo,
+        transfers_repo: TransfersRepo,
+        balance_cache: BalanceSnapshotCache | None = None,
+    ):
+        self.merchants_repo = merchants_repo
+        self.balances_repo = balances_repo
+        self.transfers_repo = transfers_repo
+        self.balance_cache = balance_cache
+
+    async def run(
+        self, chunks: Iterable[list[dict]], on_progress: Callable[[int], None] | None = None
+    ) -> int:
+        merchants = {
+            merchant.name: merchant for merchant in await self.merchants_repo.search(archived=False)
+        }
+        deltas: dict[tuple[UUID, str], Decimal] = defaultdict(Decimal)
+        imported = 0
+
+        async with self.transfers_repo.transaction():
+            for chunk in chunks:
+                # earlier chunks are already in transfers, so the lookup covers them too
+                await self.check_idempotency_keys([row["idempotency_key"] for row in chunk])
+                await self.transfers_repo.copy_many(self.to_records(chunk, merchants, deltas))
+                imported += len(chunk)
+                if on_progress:
+                    on_progress(imported)
+
+            if not deltas:
+                return imported
+            await self.balances_repo.apply_deltas(deltas)
+            balances = sum_balance_shards(
+                await self.balances_repo.search(
+                    merchant_id_in=list({merchant_id for merchant_id, _ in deltas}),
+                    currency_in=list({currency for _, currency in deltas}),
+                    archived=False,
+                )
+            )
+            overdrawn = [balance for balance in balances if balance.amount < 0]
+            if overdrawn:
+                raise TransferImportError(
+                    "Import leaves negative balances: "
+                    + ", ".join(f"{b.merchant_id} {b.currency} {b.amount}" for b in overdrawn[:10])
+                )
+
+        if self.balance_cache:
+            await self.balance_cache.write_through(balances)
+        return imported
+
+    async def create_partitions(self, chunks: Iterable[list[dict]]) -> list[str]:
+        """Create the monthly partitions of the rows' months, in a transaction of its own.
+
+        Without them historical rows would all land in transfers_default. The DDL locks all
+        of transfers, so it runs before run() rather than inside the import transaction,
+        which would hold the lock until the whole import commits.
+        """
+        imported_at = datetime.now(UTC)
+        months = set()
+        for chunk in chunks:
+            for row in chunk:
+                created = row.get("created") or imported_at
+                if created.tzinfo is None:
+                    created = created.replace(tzinfo=UTC)
+                months.add(created.astimezone(UTC).date().replace(day=1))
+        return await self.transfers_repo.create_partitions(sorted(months))
+
+    async def check_idempotency_keys(self, keys: list[str]) -> None:
+        conflicts = sorted(key for key, count in Counter(keys).items() if count > 1)
+        if not conflicts:
+            conflicts = sorted(await self.transfers_repo.search_idempotency_keys(keys))
+        if conflicts:
+            raise TransferImportError(
+                f"Idempotency keys used more than once: {', '.join(conflicts[:10])}"
+            )
+
+    @staticmethod
+    def to_records(
+        chunk: list[dict],
+        merchants: dict[str, Merchant],
+        deltas: dict[tuple[UUID, str], Decimal],
+    ) -> list[tuple]:
+        imported_at = datetime.now(UTC)
+        records = []
+        for row in chunk:
+            from_merchant = merchants.get(row["from_merchant"])
+            to_merchant = merchants.get(row["to_merchant"])
+            if not from_merchant or not to_merchant:
+                raise TransferImportError(
+                    f"Transfer {row['idempotency_key']}: "
+                    "from merchant or to merchant does not exist"
+                )
+
+            amount = row["amount"].quantize(AMOUNT_QUANTUM, ROUND_HALF_UP)
+            percent_fee = (
+                from_merchant.percent_fee
+                if row.get("percent_fee") is None
+                else row["percent_fee"].quantize(FEE_QUANTUM, ROUND_HALF_UP)
+            )
+            final_amount = TransferService.calculate_final_amount(amount, percent_fee)
+            deltas[(from_merchant.id, row["currency"])] -= final_amount.quantize(
+                AMOUNT_QUANTUM, ROUND_HALF_UP
+            )
+            deltas[(to_merchant.id, row["currency"])] += amount
+
+            created = row.get("created") or imported_at
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=UTC)
+            records.append(
+                (
+                    from_merchant.id,
+                    to_merchant.id,
+                    amount,
+                    percent_fee,
+                    row["currency"],
+                    row["idempotency_key"],
+                    created,
+                    created,
+                )
+            )
+        return records
@@ -7,3 +7,7 @@ class CreateTransferDict(TypedDict):
     to_merchant: str
     amount: Decimal
     currency: str
+
+
+class CreateTransferBatchItemDict(CreateTransferDict):
+    idempotency_key: str
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import UTC, date, datetime
+
+from app.infra.config import settings
+from app.infra.db.repos.partitions import (
+    TRANSFERS_DEFAULT_PARTITION,
+    get_partition_month,
+    next_month,
+)
+from app.infra.db.repos.transfers import TransfersRepo
+from app.infra.logging import get_logger
+from app.infra.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class TransferPartitionMaintainer:
+    """Keeps monthly partitions of transfers created ahead of time.
+
+    Every worker runs the check, the repo serializes the DDL with an advisory lock, so
+    only the first one after a month boundary has anything to do.
+    """
+
+    def __init__(self, transfers_repo: TransfersRepo, months_ahead: int, interval_seconds: float):
+        self.transfers_repo = transfers_repo
+        self.months_ahead = months_ahead
+        self.interval = interval_seconds
+        self._task: asyncio.Task | None = None
+
+    async def ensure_partitions(self, today: date | None = None) -> list[str]:
+        month = (today or datetime.now(UTC).date()).replace(day=1)
+        months = [month]
+        for _ in range(self.months_ahead):
+            month = next_month(month)
+            months.append(month)
+
+        created = await self.transfers_repo.create_partitions(months)
+        if created:
+            logger.info("Transfer partitions created", partitions=created)
+            metrics.counter("transfer_partitions_created").inc(len(created))
+        return created
+
+    async def detach_partitions(self, before: date) -> list[str]:
+        """Detach the monthly partitions of months before ``before``. The default partition
+        is never detached."""
+        detached = []
+        for name in await self.transfers_repo.get_partitions():
+            if name == TRANSFERS_DEFAULT_PARTITION:
+                continue
+            month = get_partition_month(name)
+            if month is None or month >= before:
+                continue
+            await self.transfers_repo.detach_partition(name)
+            detached.append(name)
+
+        if detached:
+            logger.info("Transfer partitions detached", partitions=detached)
+        return detached
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.ensure_partitions()
+            except Exception as e:
+                logger.error("Transfer partition maintenance failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+_partition_maintainer: TransferPartitionMaintainer | None = None
+
+
+def get_transfer_partition_maintainer() -> TransferPartitionMaintainer:
+    global _partition_maintainer
+
+    if _partition_maintainer is None:
+        _partition_maintainer = TransferPartitionMaintainer(
+            transfers_repo=TransfersRepo(),
+            months_ahead=settings.transfers_partitions_ahead_months,
+            interval_seconds=settings.transfers_partition_check_interval_seconds,
+        )
+
+    return _partition_maintainer
+
+
+async def close_transfer_partition_maintainer() -> None:
+    global _partition_maintainer
+
+    if _partition_maintainer is not None:
+        await _partition_maintainer.close()
+        _partition_maintainer = None
@@ -1,17 +1,46 @@
-from dataclasses import asdict
+import asyncio
+import base64
+import random
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from datetime import datetime
 from decimal import Decimal
+from functools import partial
+from uuid import UUID
 
+from app.domain.balances import Balance
+from app.domain.merchants import Merchant
+from app.domain.transfers import TransferWithMerchant
 from app.infra.db.repos.balances import BalancesRepo
+from app.infra.db.repos.exceptions import DatabaseError, EntityAlreadyExistsError
 from app.infra.db.repos.merchants import MerchantsRepo
 from app.infra.db.repos.transfers import TransfersRepo
-from app.infra.redis.lock import RedisLocks
+from app.infra.locks.base import LockBackend
+from app.infra.logging import get_logger
+from app.infra.metrics import metrics
+from app.infra.redis.balance_cache import BalanceSnapshotCache
+from app.infra.redis.idempotency import IdempotencyCache
+from app.infra.redis.merchant_cache import MerchantCache
+from app.infra.single_flight import SingleFlight
+from app.logic.transfers.archive import TransferArchive
 from app.logic.transfers.exceptions import (
     TransferBalanceDoesNotExistError,
+    TransferConflictError,
+    TransferIdempotencyKeyConflictError,
     TransferInsufficientFundsError,
+    TransferInvalidCursorError,
     TransferMerchantDoesNotExistError,
 )
-from app.logic.transfers.models import CreateTransferDict
-from app.logic.utils import convert_dt_to_dict, normalize_dict
+from app.logic.transfers.group_commit import TransferGroupCommitter
+from app.logic.transfers.models import CreateTransferBatchItemDict, CreateTransferDict
+from app.logic.utils import (
+    convert_dt_to_dict,
+    get_merchants_by_names,
+    run_single_flight,
+    sum_balance_shards,
+)
+
+logger = get_logger(__name__)
 
 
 class TransferService:
@@ -20,74 +49,163 @@ class TransferService:
         merchants_repo: MerchantsRepo,
         balances_repo: BalancesRepo,
         transfers_repo: TransfersRepo,
-        redis_locks: RedisLocks,
+        locks: LockBackend,
+        mode: str = "locking",
+        group_committer: TransferGroupCommitter | None = None,
+        idempotency_cache: IdempotencyCache | None = None,
+        merchant_cache: MerchantCache | None = None,
+        balance_cache: BalanceSnapshotCache | None = None,
+        single_flight: SingleFlight | None = None,
+        archive: TransferArchive | None = None,
+        optimistic_max_retries: int = 5,
+        optimistic_backoff_ms: float = 5.0,
     ):
         self.merchants_repo = merchants_repo
         self.balances_repo = balances_repo
         self.transfers_repo = transfers_repo
-        self.redis_locks = redis_locks
+        self.locks = locks
+        self.mode = mode
+        self.group_committer = group_committer
+        self.idempotency_cache = idempotency_cache
+        self.merchant_cache = merchant_cache
+        self.balance_cache = balance_cache
+        self.single_flight = single_flight
+        self.archive = archive
+        self.optimistic_max_retries = optimistic_max_retries
+        self.optimistic_backoff = optimistic_backoff_ms / 1000
 
     async def create_transfer(self, payload: CreateTransferDict, idempotency_key: str) -> dict:
-        from_merchant_name = payload["from_merchant"]
-        to_merchant_name = payload["to_merchant"]
+        if self.idempotency_cache:
+            cached_transfer = await self.idempotency_cache.get(idempotency_key)
+            if cached_transfer is not None:
+                return cached_transfer
+
+        if self.mode == "conditional":
+            transfer = await self.create_transfer_conditional(payload, idempotency_key)
+        elif self.mode == "optimistic":
+            transfer = await self.create_transfer_optimistic(payload, idempotency_key)
+        else:
+            transfer = await self.create_transfer_with_locks(payload, idempotency_key)
+
+        await self.write_through_balances([transfer])
+        if self.idempotency_cache:
+            await self.idempotency_cache.set(idempotency_key, transfer)
+        return transfer
+
+    async def write_through_balances(self, transfers: list[dict]) -> None:
+        """Push the committed balances of the transfer parties to the balance cache."""
+        if not self.balance_cache or not transfers:
+            return
+
+        merchant_ids = {transfer["from_merchant_id"] for transfer in transfers} | {
+            transfer["to_merchant_id"] for transfer in transfers
+        }
+        try:
+            balances = await self.balances_repo.search(
+                merchant_id_in=list(merchant_ids),
+                currency_in=list({transfer["currency"] for transfer in transfers}),
+                archived=False,
+            )
+        except DatabaseError as e:
+            # the transfer is committed, the cache catches up on the next write or expiry
+            logger.warning("Balance cache write-through failed", error=str(e))
+            return
+        await self.balance_cache.write_through(sum_balance_shards(balances))
+
+    async def create_transfer_with_locks(
+        self, payload: CreateTransferDict, idempotency_key: str
+    ) -> dict:
         currency = payload["currency"]
         amount = payload["amount"]
-        lock_keys = sorted(
-            [
-                f"merchant_balance_{from_merchant_name}_{currency}_transfer_lock",
-                f"merchant_balance_{to_merchant_name}_{currency}_transfer_lock",
-            ]
+        from_merchant, to_merchant = await self.get_from_to_merchants(
+            payload["from_merchant"], payload["to_merchant"]
         )
-        async with self.redis_locks.acquire(lock_keys[0], timeout=60):
-            async with self.redis_locks.acquire(lock_keys[1], timeout=60):
-                exist_transfer = await self.transfers_repo.search_first_row(
-                    idempotency_key=idempotency_key,
-                    archived=False,
-                )
-                if exist_transfer:
-                    return convert_dt_to_dict(exist_transfer)
+        if not from_merchant or not to_merchant:
+            raise TransferMerchantDoesNotExistError("From merchant or to merchant does not exist")
 
-                from_merchant, to_merchant = await self.get_from_to_merchants(
-                    from_merchant_name, to_merchant_name
+        to_shard = random.randrange(to_merchant.balance_shards)
+        if from_merchant.balance_shards > 1:
+            from_shard = await self.pick_debit_shard(
+                from_merchant,
+                currency,
+                self.calculate_final_amount(amount, from_merchant.percent_fee),
+            )
+            if from_shard is not None:
+                transfer = await self._transfer_with_locks(
+                    from_merchant,
+                    to_merchant,
+                    amount,
+                    currency,
+                    idempotency_key,
+                    [from_shard],
+                    to_shard,
                 )
-                if not from_merchant or not to_merchant:
-                    raise TransferMerchantDoesNotExistError(
-                        "From merchant or to merchant does not exist"
-                    )
+                if transfer is not None:
+                    return transfer
 
-                (
-                    from_merchant_balance,
-                    to_merchant_balance,
-                ) = await self.get_from_to_merchant_balances(
-                    from_merchant.id, to_merchant.id, currency
-                )
+        # consolidating path: lock every sender shard and debit their sum
+        transfer = await self._transfer_with_locks(
+            from_merchant,
+            to_merchant,
+            amount,
+            currency,
+            idempotency_key,
+            list(range(from_merchant.balance_shards)),
+            to_shard,
+        )
+        if transfer is None:
+            raise TransferInsufficientFundsError("Insufficient funds")
+        return transfer
+
+    async def _transfer_with_locks(
+        self,
+        from_merchant: Merchant,
+        to_merchant: Merchant,
+        amount: Decimal,
+        currency: str,
+        idempotency_key: str,
+        from_shards: list[int],
+        to_shard: int,
+    ) -> dict | None:
+        lock_keys = [
+            self.get_balance_lock_key(from_merchant.name, currency, shard) for shard in from_shards
+        ]
+        lock_keys.append(self.get_balance_lock_key(to_merchant.name, currency, to_shard))
+        async with self.locks.acquire_many(lock_keys, timeout=60):
+            async with self.transfers_repo.transaction():
+                exist_transfer = await self.get_existing_transfer(idempotency_key)
+                if exist_transfer:
+                    return exist_transfer
 
-                if not from_merchant_balance:
+                # the Redis locks keep transfers apart, the row locks also keep out lock-free
+                # writers such as the importer until this transaction commits
+                balances = await self.balances_repo.lock_shards(
+                    currency,
+                    [(from_merchant.id, shard) for shard in from_shards]
+                    + [(to_merchant.id, to_shard)],
+                )
+                if not any(b.merchant_id == from_merchant.id for b in balances):
                     raise TransferBalanceDoesNotExistError(
                         f"From merchant balance with currency {currency} does not exist"
                     )
-                final_amount = amount + (amount / Decimal("100") * from_merchant.percent_fee)
 
-                if from_merchant_balance.amount < final_amount:
-                    raise TransferInsufficientFundsError("Insufficient funds")
-
-                async with self.transfers_repo.transaction():
-                    if not to_merchant_balance:
-                        to_merchant_balance = await self.balances_repo.insert(
-                            payload={
-                                "merchant_id": to_merchant.id,
-                                "currency": currency,
-                                "amount": 0,
-                            }
-                        )
-                    await self.balances_repo.update_by_id(
-                        entity_id=to_merchant_balance.id,
-                        amount=to_merchant_balance.amount + amount,
+                if len(from_shards) > 1:
+                    from_merchant_balance = await self.balances_repo.consolidate_shards(
+                        from_merchant.id, currency
                     )
-                    await self.balances_repo.update_by_id(
-                        entity_id=from_merchant_balance.id,
-                        amount=from_merchant_balance.amount - final_amount,
+                else:
+                    from_merchant_balance = self._find_shard(
+                        balances, from_merchant.id, from_shards[0]
                     )
+                final_amount = self.calculate_final_amount(amount, from_merchant.percent_fee)
+                if not from_merchant_balance or from_merchant_balance.amount < final_amount:
+                    return None
+
+                await self.balances_repo.add_amount(to_merchant.id, currency, to_shard, amount)
+                await self.balances_repo.add_amount(
+                    from_merchant.id, currency, from_merchant_balance.shard, -final_amount
+                )
+                try:
                     transfer = await self.transfers_repo.insert(
                         payload={
                             "from_merchant_id": from_merchant.id,
@@ -98,13 +216,387 @@ class TransferService:
                             "idempotency_key": idempotency_key,
                         }
                     )
+                except EntityAlreadyExistsError as e:
+                    # the same key was taken by a concurrent transfer between other merchants
+                    raise TransferIdempotencyKeyConflictError(str(e)) from e
 
-                return convert_dt_to_dict(transfer)
+            return convert_dt_to_dict(transfer)
 
-    async def get_from_to_merchants(self, from_merchant_name: str, to_merchant_name: str) -> tuple:
-        merchants = await self.merchants_repo.search(
-            name_in=[from_merchant_name, to_merchant_name], archived=False
+    async def get_existing_transfer(self, idempotency_key: str) -> dict | None:
+        transfer = (await self.get_existing_transfers([idempotency_key])).get(idempotency_key)
+        if isinstance(transfer, Exception):
+            raise transfer
+        return transfer
+
+    async def get_existing_transfers(
+        self, idempotency_keys: list[str]
+    ) -> dict[str, dict | TransferIdempotencyKeyConflictError]:
+        """Transfers that already took the keys. A key outlives its row in transfers once the
+        transfer is archived or its partition is detached: the transfer is then read from the
+        archive, and a key whose transfer is in neither is a conflict."""
+        taken = await self.transfers_repo.get_idempotency_keys(idempotency_keys)
+        if not taken:
+            return {}
+
+        transfers = {
+            transfer.idempotency_key: transfer
+            for transfer in await self.transfers_repo.get_by_keys(list(taken.values()))
+        }
+        missing = [
+            keys for idempotency_key, keys in taken.items() if idempotency_key not in transfers
+        ]
+        if missing and self.archive:
+            for transfer in await asyncio.to_thread(self.archive.get_by_keys, missing):
+                transfers[transfer.idempotency_key] = transfer
+
+        return {
+            idempotency_key: convert_dt_to_dict(transfers[idempotency_key])
+            if idempotency_key in transfers
+            else TransferIdempotencyKeyConflictError(
+                f"Idempotency key {idempotency_key} was used by a transfer that is no longer stored"
+            )
+            for idempotency_key in taken
+        }
+
+    async def pick_debit_shard(
+        self, merchant: Merchant, currency: str, final_amount: Decimal
+    ) -> int | None:
+        shards = await self.balances_repo.search_by_merchants([merchant.id], currency)
+        funded = [b.shard for b in shards if b.amount >= final_amount]
+        return random.choice(funded) if funded else None
+
+    @staticmethod
+    def _find_shard(balances: list[Balance], merchant_id: UUID, shard: int) -> Balance | None:
+        for balance in balances:
+            if balance.merchant_id == merchant_id and balance.shard == shard:
+                return balance
+        return None
+
+    async def create_transfer_optimistic(
+        self, payload: CreateTransferDict, idempotency_key: str
+    ) -> dict:
+        for attempt in range(self.optimistic_max_retries + 1):
+            try:
+                return await self._transfer_optimistic(payload, idempotency_key)
+            except TransferConflictError:
+                metrics.counter("balance_version_conflicts").inc()
+                if attempt == self.optimistic_max_retries:
+                    raise
+            metrics.counter("transfer_optimistic_retries").inc()
+            await asyncio.sleep(random.uniform(0, self.optimistic_backoff * 2**attempt))
+
+    async def _transfer_optimistic(self, payload: CreateTransferDict, idempotency_key: str) -> dict:
+        currency = payload["currency"]
+        amount = payload["amount"]
+        async with self.transfers_repo.transaction():
+            exist_transfer = await self.get_existing_transfer(idempotency_key)
+            if exist_transfer:
+                return exist_transfer
+
+            from_merchant, to_merchant = await self.get_from_to_merchants(
+                payload["from_merchant"], payload["to_merchant"]
+            )
+            if not from_merchant or not to_merchant:
+                raise TransferMerchantDoesNotExistError(
+                    "From merchant or to merchant does not exist"
+                )
+
+            balances = await self.balances_repo.search_by_merchants(
+                [from_merchant.id, to_merchant.id], currency
+            )
+            from_shards = [b for b in balances if b.merchant_id == from_merchant.id]
+            if not from_shards:
+                raise TransferBalanceDoesNotExistError(
+                    f"From merchant balance with currency {currency} does not exist"
+                )
+
+            final_amount = self.calculate_final_amount(amount, from_merchant.percent_fee)
+            funded = [b for b in from_shards if b.amount >= final_amount]
+            if funded:
+                from_merchant_balance = random.choice(funded)
+            elif sum(b.amount for b in from_shards) >= final_amount:
+                from_merchant_balance = await self.balances_repo.consolidate_shards(
+                    from_merchant.id, currency
+                )
+            else:
+                raise TransferInsufficientFundsError("Insufficient funds")
+
+            to_shard = random.randrange(to_merchant.balance_shards)
+            to_merchant_balance = self._find_shard(balances, to_merchant.id, to_shard)
+            try:
+                if not to_merchant_balance:
+                    to_merchant_balance = await self.balances_repo.insert(
+                        payload={
+                            "merchant_id": to_merchant.id,
+                            "currency": currency,
+                            "amount": 0,
+                            "shard": to_shard,
+                        }
+                    )
+                new_amounts = [
+                    (from_merchant_balance, from_merchant_balance.amount - final_amount),
+                    (to_merchant_balance, to_merchant_balance.amount + amount),
+                ]
+                # a fixed row order keeps opposite transfers from deadlocking on row locks
+                for balance, new_amount in sorted(new_amounts, key=lambda item: item[0].id):
+                    updated = await self.balances_repo.update_by_id(
+                        entity_id=balance.id,
+                        expected_version=balance.version,
+                        amount=new_amount,
+                    )
+                    if not updated:
+                        raise TransferConflictError("Balance was changed by a concurrent transfer")
+
+                transfer = await self.transfers_repo.insert(
+                    payload={
+                        "from_merchant_id": from_merchant.id,
+                        "to_merchant_id": to_merchant.id,
+                        "amount": amount,
+                        "percent_fee": from_merchant.percent_fee,
+                        "currency": currency,
+                        "idempotency_key": idempotency_key,
+                    }
+                )
+            except EntityAlreadyExistsError as e:
+                # a concurrent transfer created the same balance shard or idempotency key
+                raise TransferConflictError(str(e)) from e
+
+        return convert_dt_to_dict(transfer)
+
+    async def create_transfer_conditional(
+        self, payload: CreateTransferDict, idempotency_key: str
+    ) -> dict:
+        if self.group_committer:
+            transfer = await self.group_committer.submit(payload, idempotency_key)
+        else:
+            try:
+                transfer = await self.transfers_repo.apply_transfer(
+                    from_merchant=payload["from_merchant"],
+                    to_merchant=payload["to_merchant"],
+                    amount=payload["amount"],
+                    currency=payload["currency"],
+                    idempotency_key=idempotency_key,
+                )
+            except EntityAlreadyExistsError:
+                transfer = None
+
+        if transfer:
+            return convert_dt_to_dict(transfer)
+
+        async with self.transfers_repo.transaction():
+            exist_transfer = await self.get_existing_transfer(idempotency_key)
+            if exist_transfer:
+                return exist_transfer
+
+            from_merchant, *_ = await self.get_transfer_parties(
+                payload["from_merchant"], payload["to_merchant"], payload["currency"]
+            )
+            if from_merchant.balance_shards > 1:
+                # no single shard could cover the debit: merge the shards and retry once
+                await self.balances_repo.consolidate_shards(from_merchant.id, payload["currency"])
+                try:
+                    transfer = await self.transfers_repo.apply_transfer(
+                        from_merchant=payload["from_merchant"],
+                        to_merchant=payload["to_merchant"],
+                        amount=payload["amount"],
+                        currency=payload["currency"],
+                        idempotency_key=idempotency_key,
+                    )
+                except EntityAlreadyExistsError as e:
+                    raise TransferIdempotencyKeyConflictError(str(e)) from e
+                if transfer:
+                    return convert_dt_to_dict(transfer)
+        raise TransferInsufficientFundsError("Insufficient funds")
+
+    async def create_transfers_batch(self, items: list[CreateTransferBatchItemDict]) -> list:
+        cached_transfers = {}
+        if self.idempotency_cache:
+            cached_transfers = await self.idempotency_cache.get_many(
+                [item["idempotency_key"] for item in items]
+            )
+        pending_items = [item for item in items if item["idempotency_key"] not in cached_transfers]
+
+        results = []
+        if pending_items:
+            merchant_names = {item["from_merchant"] for item in pending_items} | {
+                item["to_merchant"] for item in pending_items
+            }
+            balance_shards = {
+                merchant.name: merchant.balance_shards
+                for merchant in await self.get_merchants_by_names(list(merchant_names))
+            }
+            lock_keys = [
+                self.get_balance_lock_key(merchant_name, item["currency"], shard)
+                for item in pending_items
+                for merchant_name in (item["from_merchant"], item["to_merchant"])
+                for shard in range(balance_shards.get(merchant_name, 1))
+            ]
+            async with self.locks.acquire_many(lock_keys, timeout=60):
+                async with self.transfers_repo.transaction():
+                    results = await self._apply_transfers_batch(pending_items)
+
+        await self.write_through_balances(
+            [result for result in results if not isinstance(result, Exception)]
+        )
+        if self.idempotency_cache:
+            await self.idempotency_cache.set_many(
+                {
+                    item["idempotency_key"]: result
+                    for item, result in zip(pending_items, results, strict=True)
+                    if not isinstance(result, Exception)
+                }
+            )
+
+        pending_results = iter(results)
+        return [
+            cached_transfers[item["idempotency_key"]]
+            if item["idempotency_key"] in cached_transfers
+            else next(pending_results)
+            for item in items
+        ]
+
+    async def _apply_transfers_batch(self, items: list[CreateTransferBatchItemDict]) -> list:
+        existing_transfers = await self.get_existing_transfers(
+            [item["idempotency_key"] for item in items]
         )
+        merchant_names = {item["from_merchant"] for item in items} | {
+            item["to_merchant"] for item in items
+        }
+        merchants = {
+            merchant.name: merchant
+            for merchant in await self.get_merchants_by_names(list(merchant_names))
+        }
+        balances = await self._get_batch_balances(merchants, items)
+        totals = {
+            key: sum((balance.amount for balance in shards), Decimal("0"))
+            for key, shards in balances.items()
+        }
+        amounts = dict(totals)
+        results = [None] * len(items)
+        transfer_payloads = {}
+        for index, item in enumerate(items):
+            idempotency_key = item["idempotency_key"]
+            currency = item["currency"]
+            amount = item["amount"]
+            if idempotency_key in existing_transfers:
+                results[index] = existing_transfers[idempotency_key]
+                continue
+            if idempotency_key in transfer_payloads:
+                continue
+
+            from_merchant = merchants.get(item["from_merchant"])
+            to_merchant = merchants.get(item["to_merchant"])
+            if not from_merchant or not to_merchant:
+                results[index] = TransferMerchantDoesNotExistError(
+                    "From merchant or to merchant does not exist"
+                )
+                continue
+
+            from_key = (from_merchant.id, currency)
+            to_key = (to_merchant.id, currency)
+            if from_key not in amounts:
+                results[index] = TransferBalanceDoesNotExistError(
+                    f"From merchant balance with currency {currency} does not exist"
+                )
+                continue
+
+            final_amount = self.calculate_final_amount(amount, from_merchant.percent_fee)
+            if amounts[from_key] < final_amount:
+                results[index] = TransferInsufficientFundsError("Insufficient funds")
+                continue
+
+            amounts[from_key] -= final_amount
+            amounts[to_key] = amounts.get(to_key, Decimal("0")) + amount
+            transfer_payloads[idempotency_key] = {
+                "from_merchant_id": from_merchant.id,
+                "to_merchant_id": to_merchant.id,
+                "amount": amount,
+                "percent_fee": from_merchant.percent_fee,
+                "currency": currency,
+                "idempotency_key": idempotency_key,
+            }
+
+        # a receiver balance created concurrently since the read is added to, not overwritten
+        new_balances = {key: amount for key, amount in amounts.items() if key not in balances}
+        if new_balances:
+            await self.balances_repo.apply_deltas(new_balances)
+        await self.balances_repo.update_amounts(
+            {
+                balance_id: amount
+                for key, shards in balances.items()
+                if amounts[key] != totals[key]
+                for balance_id, amount in self._spread_over_shards(shards, amounts[key]).items()
+            }
+        )
+        created_transfers = {
+            transfer.idempotency_key: transfer
+            for transfer in await self.transfers_repo.insert_many(list(transfer_payloads.values()))
+        }
+
+        for index, item in enumerate(items):
+            if results[index] is None:
+                results[index] = convert_dt_to_dict(created_transfers[item["idempotency_key"]])
+
+        return results
+
+    async def _get_batch_balances(
+        self, merchants: dict[str, Merchant], items: list[CreateTransferBatchItemDict]
+    ) -> dict[tuple, list[Balance]]:
+        # every shard of the batch's balances is locked, so they are handled as one sum and
+        # written as absolute amounts; the row locks keep lock-free writers out until commit
+        balances = defaultdict(list)
+        if not merchants:
+            return balances
+        for balance in await self.balances_repo.search_for_update(
+            [merchant.id for merchant in merchants.values()],
+            list({item["currency"] for item in items}),
+        ):
+            balances[(balance.merchant_id, balance.currency)].append(balance)
+        for shards in balances.values():
+            shards.sort(key=lambda balance: balance.shard)
+        return balances
+
+    @staticmethod
+    def _spread_over_shards(shards: list[Balance], amount: Decimal) -> dict:
+        return {
+            shards[0].id: amount,
+            **{shard.id: Decimal("0") for shard in shards[1:] if shard.amount},
+        }
+
+    @staticmethod
+    def get_balance_lock_key(merchant_name: str, currency: str, shard: int = 0) -> str:
+        if shard:
+            return f"merchant_balance_{merchant_name}_{currency}_{shard}_transfer_lock"
+        return f"merchant_balance_{merchant_name}_{currency}_transfer_lock"
+
+    @staticmethod
+    def calculate_final_amount(amount: Decimal, percent_fee: Decimal) -> Decimal:
+        return amount + (amount / Decimal("100") * percent_fee)
+
+    async def get_transfer_parties(
+        self, from_merchant_name: str, to_merchant_name: str, currency: str
+    ) -> tuple:
+        from_merchant, to_merchant = await self.get_from_to_merchants(
+            from_merchant_name, to_merchant_name
+        )
+        if not from_merchant or not to_merchant:
+            raise TransferMerchantDoesNotExistError("From merchant or to merchant does not exist")
+
+        from_merchant_balance, to_merchant_balance = await self.get_from_to_merchant_balances(
+            from_merchant.id, to_merchant.id, currency
+        )
+        if not from_merchant_balance:
+            raise TransferBalanceDoesNotExistError(
+                f"From merchant balance with currency {currency} does not exist"
+            )
+
+        return from_merchant, to_merchant, from_merchant_balance, to_merchant_balance
+
+    async def get_merchants_by_names(self, names: list[str]) -> list[Merchant]:
+        return await get_merchants_by_names(self.merchants_repo, self.merchant_cache, names)
+
+    async def get_from_to_merchants(self, from_merchant_name: str, to_merchant_name: str) -> tuple:
+        merchants = await self.get_merchants_by_names([from_merchant_name, to_merchant_name])
         from_merchant = [m for m in merchants if m.name == from_merchant_name]
         to_merchant = [m for m in merchants if m.name == to_merchant_name]
 
@@ -113,10 +605,8 @@ class TransferService:
     async def get_from_to_merchant_balances(
         self, from_merchant_id: str, to_merchant_id: str, currency: str
     ) -> tuple:
-        balances = await self.balances_repo.search(
-            merchant_id_in=[from_merchant_id, to_merchant_id],
-            currency=currency,
-            archived=False,
+        balances = await self.balances_repo.search_by_merchants(
+            [from_merchant_id, to_merchant_id], currency
         )
         from_balance = [b for b in balances if b.merchant_id == from_merchant_id]
 
@@ -124,11 +614,104 @@ class TransferService:
 
         return from_balance[0] if from_balance else None, to_balance[0] if to_balance else None
 
-    async def get_transfers(self, **filters) -> list[dict]:
-        transfers_list = await self.transfers_repo.get_transfers_with_merchant_names(
+    async def get_transfers(
+        self, limit: int, cursor: str | None = None, **filters
+    ) -> tuple[list[TransferWithMerchant], str | None]:
+        from_merchant = filters.get("from_merchant")
+        to_merchant = filters.get("to_merchant")
+        currency = filters.get("currency")
+        created_from = filters.get("created_from")
+        created_to = filters.get("created_to")
+        include_archived = filters.get("include_archived", False)
+        return await run_single_flight(
+            self.single_flight,
+            (
+                "transfers",
+                limit,
+                cursor,
+                from_merchant,
+                to_merchant,
+                currency,
+                created_from,
+                created_to,
+                include_archived,
+            ),
+            partial(
+                self._get_transfers,
+                limit,
+                cursor,
+                from_merchant,
+                to_merchant,
+                currency,
+                created_from,
+                created_to,
+                include_archived,
+            ),
+        )
+
+    async def _get_transfers(
+        self,
+        limit: int,
+        cursor: str | None,
+        from_merchant: str | None,
+        to_merchant: str | None,
+        currency: str | None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        include_archived: bool = False,
+    ) -> tuple[list[TransferWithMerchant], str | None]:
+        after = self.decode_cursor(cursor) if cursor else None
+        filters = {
+            "from_merchant": from_merchant,
+            "to_merchant": to_merchant,
+            "currency": currency,
+            "limit": limit + 1,  # one extra row tells whether there is a next page
+            "after": after,
+            "created_from": created_from,
+            "created_to": created_to,
+        }
+        if include_archived and self.archive:
+            # imported history and archive-transfers --before interleave the table and the
+            # archive in time, so both are read with the same bounds and merged
+            transfers_list, archived = await asyncio.gather(
+                self.transfers_repo.get_transfers_with_merchant_names(**filters),
+                asyncio.to_thread(self.archive.search, **filters),
+            )
+            # a batch whose commit failed after its files were written is in both
+            transfers_by_id = {t.id: t for t in archived} | {t.id: t for t in transfers_list}
+            transfers_list = sorted(
+                transfers_by_id.values(), key=lambda t: (t.created, t.id), reverse=True
+            )[: limit + 1]
+        else:
+            transfers_list = await self.transfers_repo.get_transfers_with_merchant_names(**filters)
+        if len(transfers_list) <= limit:
+            return transfers_list, None
+
+        transfers_list = transfers_list[:limit]
+        last = transfers_list[-1]
+        return transfers_list, self.encode_cursor(last.created, last.id)
+
+    def stream_transfers(
+        self, chunk_size: int, **filters
+    ) -> AsyncIterator[list[TransferWithMerchant]]:
+        return self.transfers_repo.stream_transfers_with_merchant_names(
             from_merchant=filters.get("from_merchant"),
             to_merchant=filters.get("to_merchant"),
             currency=filters.get("currency"),
+            created_from=filters.get("created_from"),
+            created_to=filters.get("created_to"),
+            chunk_size=chunk_size,
         )
 
-        return [normalize_dict(asdict(transfer)) for transfer in transfers_list]
+    @staticmethod
+    def encode_cursor(created: datetime, transfer_id: UUID) -> str:
+        raw = f"{created.isoformat()}|{transfer_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+        try:
+            created, transfer_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+            return datetime.fromisoformat(created), UUID(transfer_id)
+        except ValueError as e:
+            raise TransferInvalidCursorError("Invalid cursor") from e
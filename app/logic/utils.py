@@ -1,7 +1,16 @@
-from dataclasses import asdict, is_dataclass
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, is_dataclass, replace
 from decimal import Decimal
 from typing import Any
 
+from app.domain.balances import Balance
+from app.domain.merchants import Merchant, MerchantWithBalances
+from app.infra.db.repos.merchants import MerchantsRepo
+from app.infra.redis.balance_cache import BalanceSnapshotCache
+from app.infra.redis.merchant_cache import MerchantCache
+from app.infra.single_flight import SingleFlight
+
 
 def convert_dt_to_dict(dataclass: Any) -> list | dict:
     if isinstance(dataclass, list):
@@ -20,3 +29,68 @@ def normalize_decimal(value):
 
 def normalize_dict(data: dict) -> dict:
     return {key: normalize_decimal(value) for key, value in data.items()}
+
+
+def sum_balance_shards(balances: list[Balance]) -> list[Balance]:
+    merged = {}
+    for balance in sorted(balances, key=lambda b: b.shard):
+        key = (balance.merchant_id, balance.currency)
+        if key not in merged:
+            merged[key] = replace(balance, shard=0)
+            continue
+        # every write bumps some shard, so the sum only grows
+        merged[key] = replace(
+            merged[key],
+            amount=merged[key].amount + balance.amount,
+            updated=max(merged[key].updated, balance.updated),
+            version=merged[key].version + balance.version + 1,
+        )
+    return list(merged.values())
+
+
+async def run_single_flight(
+    single_flight: SingleFlight | None, key: tuple, func: Callable[[], Awaitable[Any]]
+) -> Any:
+    if single_flight is None:
+        return await func()
+    return await single_flight.do(key, func)
+
+
+async def get_merchants_by_names(
+    merchants_repo: MerchantsRepo, merchant_cache: MerchantCache | None, names: list[str]
+) -> list[Merchant]:
+    if merchant_cache is None:
+        return await merchants_repo.search_by_names(names)
+    return await merchant_cache.get_many(names, merchants_repo.search_by_names)
+
+
+async def get_merchants_with_balances(
+    merchants_repo: MerchantsRepo,
+    merchant_cache: MerchantCache | None,
+    balance_cache: BalanceSnapshotCache | None,
+    names: list[str],
+) -> list[MerchantWithBalances]:
+    if balance_cache is None:
+        return [
+            replace(merchant, balances=sum_balance_shards(merchant.balances))
+            for merchant in await merchants_repo.search_with_balances(names)
+        ]
+
+    merchants = await get_merchants_by_names(merchants_repo, merchant_cache, names)
+    snapshots = await balance_cache.get_many([merchant.id for merchant in merchants])
+    loaded = {}
+    missing = [merchant.name for merchant in merchants if merchant.id not in snapshots]
+    if missing:
+        for merchant in await merchants_repo.search_with_balances(missing):
+            loaded[merchant.id] = replace(merchant, balances=sum_balance_shards(merchant.balances))
+        await asyncio.gather(
+            *(balance_cache.fill(merchant.id, merchant.balances) for merchant in loaded.values())
+        )
+
+    res = []
+    for merchant in merchants:
+        if merchant.id in snapshots:
+            res.append(MerchantWithBalances(**asdict(merchant), balances=snapshots[merchant.id]))
+        elif merchant.id in loaded:
+            res.append(loaded[merchant.id])
+    return res
@@ -7,16 +7,34 @@ from app.api.exceptions import register_exceptions
 from app.infra.config import settings
 from app.infra.db.connection import close_db
 from app.infra.logging import get_logger, setup_logging
+from app.infra.metrics import metrics
+from app.infra.redis.balance_cache import close_balance_snapshot_cache
 from app.infra.redis.connection import close_redis
+from app.infra.redis.pubsub import close_redis_subscriber
+from app.logic.transfers.archive import close_transfer_archiver, get_transfer_archiver
+from app.logic.transfers.group_commit import close_transfer_group_committer
+from app.logic.transfers.partitions import (
+    close_transfer_partition_maintainer,
+    get_transfer_partition_maintainer,
+)
 
 logger = get_logger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if settings.transfers_partition_maintenance_enabled:
+        get_transfer_partition_maintainer().start()
+    if settings.transfers_archive_enabled:
+        get_transfer_archiver().start()
     logger.info("Application started")
     yield
+    await close_transfer_archiver()
+    await close_transfer_partition_maintainer()
+    await close_transfer_group_committer()
     await close_db()
+    await close_balance_snapshot_cache()
+    await close_redis_subscriber()
     await close_redis()
     logger.info("Application stopped")
 
@@ -43,4 +61,8 @@ def create_app() -> FastAPI:
             "status": "ok",
         }
 
+    @app.get("/metrics")
+    async def get_metrics():
+        return metrics.snapshot()
+
     return app
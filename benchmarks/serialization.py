@@ -0,0 +1,85 @@
+import datetime
+import time
+import tracemalloc
+import uuid
+from dataclasses import asdict
+from decimal import Decimal
+
+import click
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.responses import DomainJSONResponse
+from app.api.schemas import OkResponse
+from app.domain.transfers import TransferWithMerchant
+from app.logic.utils import normalize_dict
+
+FIELDS = [
+    "id",
+    "created",
+    "updated",
+    "archived",
+    "from_merchant",
+    "to_merchant",
+    "amount",
+    "percent_fee",
+    "currency",
+    "idempotency_key",
+]
+
+
+def make_rows(rows: int) -> list[tuple]:
+    now = datetime.datetime.utcnow()
+    return [
+        (
+            uuid.uuid4(),
+            now,
+            now,
+            False,
+            "alice",
+            "bob",
+            Decimal("10.5"),
+            Decimal("2"),
+            "USD",
+            str(i),
+        )
+        for i in range(rows)
+    ]
+
+
+def old_pipeline(rows: list[tuple]) -> bytes:
+    transfers = [TransferWithMerchant(**dict(zip(FIELDS, row, strict=True))) for row in rows]
+    result = [normalize_dict(asdict(transfer)) for transfer in transfers]
+    return JSONResponse(jsonable_encoder(OkResponse(result=result))).body
+
+
+def new_pipeline(rows: list[tuple]) -> bytes:
+    transfers = [TransferWithMerchant(*row) for row in rows]
+    return DomainJSONResponse(OkResponse(result=transfers)).body
+
+
+def measure(func, rows: list[tuple]) -> tuple[float, float]:
+    started = time.process_time()
+    func(rows)
+    cpu = time.process_time() - started
+
+    # a separate run, tracemalloc slows allocations down a lot
+    tracemalloc.start()
+    func(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak / 1024 / 1024
+
+
+@click.command()
+@click.option("--rows", default=100_000, show_default=True)
+def main(rows: int):
+    """Response building for GET /transfers, from fetched rows to JSON bytes."""
+    data = make_rows(rows)
+    for name, func in (("old", old_pipeline), ("new", new_pipeline)):
+        cpu, peak = measure(func, data)
+        click.echo(f"{name:<5} cpu={cpu:.2f}s peak_memory={peak:.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import asyncio
+import statistics
+import time
+import uuid
+from decimal import Decimal
+from itertools import product
+
+import click
+
+from app.infra.config import settings
+from app.infra.db.connection import close_db
+from app.infra.db.repos.balances import BalancesRepo
+from app.infra.redis.connection import close_redis
+from app.logic.factories import merchant_service_factory, transfer_service_factory
+from app.logic.transfers.exceptions import TransferConflictError, TransferInsufficientFundsError
+
+CURRENCY = "USD"
+
+
+async def create_hot_pair(run_id: str, initial_amount: Decimal, shards: int) -> tuple[str, str]:
+    merchant_service = merchant_service_factory()
+
+    names = []
+    for role in ("from", "to"):
+        merchant = await merchant_service.create_merchant(
+            {
+                "name": f"bench_{run_id}_{role}",
+                "percent_fee": Decimal("1"),
+                "balance_shards": shards,
+            }
+        )
+        # spread the initial funds so that debits do not start from a single hot shard
+        await BalancesRepo().insert_many(
+            [
+                {
+                    "merchant_id": merchant["id"],
+                    "currency": CURRENCY,
+                    "amount": initial_amount / shards,
+                    "shard": shard,
+                }
+                for shard in range(shards)
+            ]
+        )
+        names.append(merchant["name"])
+
+    return names[0], names[1]
+
+
+async def run_hot_pair(
+    mode: str, lock_backend: str, shards: int, db_path: str, transfers: int, concurrency: int
+) -> dict:
+    settings.transfer_mode = mode
+    settings.lock_backend = lock_backend
+    settings.db_fast_path = db_path == "asyncpg"
+    run_id = uuid.uuid4().hex[:8]
+    from_name, to_name = await create_hot_pair(run_id, Decimal(transfers * 2), shards)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failed = 0
+
+    async def make_transfer(index: int):
+        nonlocal failed
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await transfer_service_factory().create_transfer(
+                    payload={
+                        "from_merchant": from_name,
+                        "to_merchant": to_name,
+                        "amount": Decimal("1"),
+                        "currency": CURRENCY,
+                    },
+                    idempotency_key=f"bench-{run_id}-{index}",
+                )
+            except (TransferInsufficientFundsError, TransferConflictError):
+                failed += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*[make_transfer(i) for i in range(transfers)])
+    cpu_time = time.process_time() - cpu_started
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "mode": f"{mode}/{lock_backend}" if mode == "locking" else mode,
+        "shards": shards,
+        "db_path": db_path,
+        "transfers": transfers,
+        "failed": failed,
+        "elapsed_s": elapsed,
+        "throughput_rps": transfers / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "cpu_us_per_transfer": cpu_time / transfers * 1_000_000,
+    }
+
+
+async def run(
+    modes: tuple[str, ...],
+    lock_backends: tuple[str, ...],
+    shard_counts: tuple[int, ...],
+    db_paths: tuple[str, ...],
+    transfers: int,
+    concurrency: int,
+) -> list[dict]:
+    results = []
+    try:
+        for mode in modes:
+            # only the locking mode takes locks, so one run is enough for the others
+            backends = lock_backends if mode == "locking" else lock_backends[:1]
+            for lock_backend, shards, db_path in product(backends, shard_counts, db_paths):
+                results.append(
+                    await run_hot_pair(mode, lock_backend, shards, db_path, transfers, concurrency)
+                )
+        return results
+    finally:
+        await close_db()
+        await close_redis()
+
+
+@click.command()
+@click.option("--mode", "modes", multiple=True, default=("locking", "conditional", "optimistic"))
+@click.option(
+    "--lock-backend",
+    "lock_backends",
+    multiple=True,
+    default=("redis",),
+    type=click.Choice(["redis", "postgres", "local"]),
+)
+@click.option("--lock-coalescing/--no-lock-coalescing", default=True, show_default=True)
+@click.option("--shards", "shard_counts", multiple=True, default=(1,), type=int)
+@click.option(
+    "--db-path",
+    "db_paths",
+    multiple=True,
+    default=("sqlalchemy",),
+    type=click.Choice(["sqlalchemy", "asyncpg"]),
+)
+@click.option("--transfers", default=1000, show_default=True)
+@click.option("--concurrency", default=50, show_default=True)
+def main(
+    modes: tuple[str, ...],
+    lock_backends: tuple[str, ...],
+    lock_coalescing: bool,
+    shard_counts: tuple[int, ...],
+    db_paths: tuple[str, ...],
+    transfers: int,
+    concurrency: int,
+):
+    """Throughput of transfers between a single hot merchant pair."""
+    settings.lock_coalescing_enabled = lock_coalescing
+    results = asyncio.run(run(modes, lock_backends, shard_counts, db_paths, transfers, concurrency))
+    for result in results:
+        click.echo(
+            "{mode:<18} {db_path:<10} {shards:>3} shards, {transfers} transfers "
+            "({failed} failed) in {elapsed_s:.2f}s: {throughput_rps:.1f} rps, "
+            "p50 {p50_ms:.1f} ms, p99 {p99_ms:.1f} ms, "
+            "cpu {cpu_us_per_transfer:.0f} us/transfer".format(**result)
+        )
+
+
+if __name__ == "__main__":
+    main()
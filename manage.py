@@ -1,7 +1,25 @@
+import asyncio
+import csv
+import time
+from datetime import UTC
+
 import click
 import uvicorn
+from pydantic import BaseModel, ValidationError
 
-from app.main import create_app
+from app.api.merchants.schemas import CreateBalanceRequest, CreateMerchantRequest
+from app.api.transfers.schemas import ImportTransferRow
+from app.infra.config import settings
+from app.logic.factories import (
+    balance_service_factory,
+    merchant_service_factory,
+    transfer_importer_factory,
+)
+from app.logic.transfers.archive import get_transfer_archiver
+from app.logic.transfers.exceptions import TransferArchiveError, TransferImportError
+from app.logic.transfers.importer import read_csv_chunks, read_parquet_chunks
+from app.logic.transfers.partitions import get_transfer_partition_maintainer
+from app.main import create_app, lifespan
 
 
 @click.group()
@@ -14,5 +32,132 @@ def start_api():
     uvicorn.run(create_app(), host="0.0.0.0", port=8000, reload=False)
 
 
+def read_rows(path: str, schema: type[BaseModel]) -> list[dict]:
+    rows = []
+    with open(path, newline="") as f:
+        # line 1 is the header
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                rows.append(schema.model_validate(row).model_dump())
+            except ValidationError as e:
+                raise click.ClickException(f"{path}:{line}: {e}") from e
+    return rows
+
+
+async def bulk_create(create, rows: list[dict]) -> None:
+    created = 0
+    async with lifespan(None):
+        chunk_size = settings.merchants_bulk_create_max_size
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start : start + chunk_size]
+            for row, result in zip(chunk, await create(chunk), strict=True):
+                if isinstance(result, Exception):
+                    click.echo(f"{row}: {result}", err=True)
+                else:
+                    created += 1
+    click.echo(f"Created {created} of {len(rows)}")
+
+
+@cli.command(short_help="Bulk create merchants from CSV")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def create_merchants(path: str):
+    """CSV columns: name, percent_fee and optionally balance_shards."""
+    rows = read_rows(path, CreateMerchantRequest)
+    asyncio.run(bulk_create(merchant_service_factory().create_merchants, rows))
+
+
+@cli.command(short_help="Bulk create balances from CSV")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def create_balances(path: str):
+    """CSV columns: merchant_id, currency, initial_amount."""
+    rows = read_rows(path, CreateBalanceRequest)
+    asyncio.run(bulk_create(balance_service_factory().create_balances, rows))
+
+
+def read_transfers(path: str, chunk_size: int):
+    read_chunks = read_parquet_chunks if path.endswith(".parquet") else read_csv_chunks
+    row_number = 0
+    for chunk in read_chunks(path, chunk_size):
+        rows = []
+        for row in chunk:
+            row_number += 1
+            try:
+                rows.append(ImportTransferRow.model_validate(row).model_dump())
+            except ValidationError as e:
+                raise click.ClickException(f"{path}: row {row_number}: {e}") from e
+        yield rows
+
+
+@cli.command(short_help="Import historical transfers from CSV or Parquet")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", default=settings.transfers_import_chunk_size, show_default=True)
+def import_transfers(path: str, chunk_size: int):
+    """Columns: from_merchant, to_merchant, amount, currency, idempotency_key, optionally
+    created and percent_fee. Files ending in .parquet are read with pyarrow."""
+    started = time.perf_counter()
+
+    def report(imported: int) -> None:
+        elapsed = time.perf_counter() - started
+        click.echo(f"{imported} transfers, {imported / elapsed:.0f}/s", err=True)
+
+    async def run() -> int:
+        async with lifespan(None):
+            importer = transfer_importer_factory()
+            # a first pass over the file, the partitions are committed before the import starts
+            created = await importer.create_partitions(read_transfers(path, chunk_size))
+            if created:
+                click.echo(f"Created partitions: {', '.join(created)}", err=True)
+            return await importer.run(read_transfers(path, chunk_size), report)
+
+    try:
+        imported = asyncio.run(run())
+    except TransferImportError as e:
+        raise click.ClickException(f"{e}, nothing imported") from e
+    elapsed = time.perf_counter() - started
+    click.echo(f"Imported {imported} transfers in {elapsed:.1f}s ({imported / elapsed:.0f}/s)")
+
+
+@cli.command(short_help="Detach monthly transfer partitions older than a month")
+@click.option("--before", required=True, type=click.DateTime(formats=["%Y-%m"]))
+def detach_transfer_partitions(before):
+    """Partitions of months before --before are detached from transfers and kept as
+    standalone tables."""
+
+    async def run() -> list[str]:
+        async with lifespan(None):
+            return await get_transfer_partition_maintainer().detach_partitions(before.date())
+
+    for name in asyncio.run(run()):
+        click.echo(f"Detached {name}")
+
+
+@cli.command(short_help="Move old transfers to Parquet files")
+@click.option(
+    "--before",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Archive transfers created before this date, UTC. Defaults to the retention window.",
+)
+def archive_transfers(before):
+    """Files are written under TRANSFERS_ARCHIVE_DIR, the archived rows are deleted."""
+    started = time.perf_counter()
+
+    def report(archived: int) -> None:
+        click.echo(
+            f"{archived} transfers, {archived / (time.perf_counter() - started):.0f}/s", err=True
+        )
+
+    async def run() -> int:
+        async with lifespan(None):
+            return await get_transfer_archiver().run(
+                before.replace(tzinfo=UTC) if before else None, report
+            )
+
+    try:
+        archived = asyncio.run(run())
+    except TransferArchiveError as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(f"Archived {archived} transfers in {time.perf_counter() - started:.1f}s")
+
+
 if __name__ == "__main__":
     cli()
@@ -4,9 +4,13 @@ from typing import AsyncGenerator
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
 
+from app.infra.config import settings
 from app.infra.db.connection import get_async_engine
 from app.infra.db.utils import metadata
+from app.infra.redis.balance_cache import close_balance_snapshot_cache
 from app.infra.redis.connection import get_redis_client
+from app.infra.redis.idempotency import get_idempotency_cache
+from app.infra.redis.merchant_cache import get_merchant_cache
 from app.main import create_app
 
 
@@ -30,7 +34,10 @@ async def db_engine():
 async def redis_client():
     client = await get_redis_client()
     await client.flushdb()
+    get_idempotency_cache().local_cache.clear()
+    get_merchant_cache().local_cache.clear()
     yield client
+    await close_balance_snapshot_cache()
     await client.flushdb()
     await client.close()
 
@@ -47,6 +54,16 @@ async def client(db_engine, redis_client) -> AsyncGenerator[AsyncClient, None]:
         yield ac
 
 
+@pytest_asyncio.fixture
+async def conditional_mode(monkeypatch):
+    monkeypatch.setattr(settings, "transfer_mode", "conditional")
+
+
+@pytest_asyncio.fixture
+async def group_commit_mode(monkeypatch, conditional_mode):
+    monkeypatch.setattr(settings, "transfer_group_commit_enabled", True)
+
+
 @pytest_asyncio.fixture
 async def merchant_a(client):
     response = await client.post(
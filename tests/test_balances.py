@@ -1,5 +1,11 @@
+from decimal import Decimal
+
 import pytest
 
+from app.infra.db.repos.balances import BalancesRepo
+from app.infra.db.repos.merchants import MerchantsRepo
+from tests.conftest import create_transfer, get_balance
+
 
 @pytest.mark.asyncio
 async def test_create_balance(client, merchant_a):
@@ -47,6 +53,33 @@ async def test_create_balance_nonexistent_merchant(client):
     assert response.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_create_balances_bulk(client, merchant_a, merchant_b, a_merchant_btc_balance):
+    response = await client.post(
+        "/merchants/balance/bulk",
+        json={
+            "balances": [
+                {"merchant_id": merchant_a["id"], "currency": "ETH", "initial_amount": "2"},
+                {"merchant_id": merchant_a["id"], "currency": "BTC", "initial_amount": "1"},
+                {
+                    "merchant_id": "00000000-0000-0000-0000-000000000000",
+                    "currency": "BTC",
+                    "initial_amount": "1",
+                },
+                {"merchant_id": merchant_b["id"], "currency": "ETH", "initial_amount": "3"},
+                {"merchant_id": merchant_b["id"], "currency": "ETH", "initial_amount": "4"},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    data = response.json()["result"]
+    assert [item["status"] for item in data] == [200, 409, 404, 200, 409]
+    assert data[0]["result"]["amount"] == "2.00000000"
+
+    assert await get_balance(client, merchant_b["name"], "ETH") == Decimal("3")
+
+
 @pytest.mark.asyncio
 async def test_get_merchant_balances(
     client, merchant_a, a_merchant_btc_balance, a_merchant_usd_balance
@@ -65,3 +98,54 @@ async def test_get_merchant_balances(
 async def test_get_balances_merchant_not_found(client):
     response = await client.get("/merchants/123/balance")
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_repo_calls_share_transaction(client, merchant_a):
+    balances_repo = BalancesRepo()
+    merchants_repo = MerchantsRepo()
+
+    with pytest.raises(RuntimeError):
+        async with balances_repo.transaction() as conn:
+            async with merchants_repo.transaction() as nested_conn:
+                assert nested_conn is conn
+            await balances_repo.insert(
+                payload={"merchant_id": merchant_a["id"], "currency": "ETH", "amount": 1}
+            )
+            raise RuntimeError
+
+    response = await client.get(f"/merchants/{merchant_a['name']}/balance")
+    assert response.json()["result"] == []
+
+
+@pytest.mark.asyncio
+async def test_balance_snapshot_cache(
+    client, monkeypatch, merchant_a, merchant_b, a_merchant_btc_balance, b_merchant_btc_balance
+):
+    loads = []
+    search_with_balances = MerchantsRepo.search_with_balances
+
+    async def counting_search_with_balances(self, names):
+        loads.append(names)
+        return await search_with_balances(self, names)
+
+    monkeypatch.setattr(MerchantsRepo, "search_with_balances", counting_search_with_balances)
+
+    def balances_queries() -> int:
+        return len(loads)
+
+    assert await get_balance(client, merchant_a["name"], "BTC") == Decimal("1.0")
+    queries = balances_queries()
+    assert await get_balance(client, merchant_a["name"], "BTC") == Decimal("1.0")
+    assert balances_queries() == queries
+
+    response = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "snapshot-1"
+    )
+    assert response.status_code == 200
+
+    # written through by the transfer, no database read
+    queries = balances_queries()
+    assert await get_balance(client, merchant_a["name"], "BTC") == Decimal("0.898")
+    assert balances_queries() == queries
+    assert await get_balance(client, merchant_b["name"], "BTC") == Decimal("0.6")
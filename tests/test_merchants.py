@@ -1,5 +1,14 @@
+import asyncio
+import re
+
 import pytest
 
+from app.infra.db.repos.merchants import MerchantsRepo
+from app.infra.metrics import metrics
+from app.infra.redis.merchant_cache import get_merchant_cache
+from app.logic.balances.service import BalancesService
+from app.logic.merchants.service import MerchantsService
+
 
 @pytest.mark.asyncio
 async def test_create_merchant(client):
@@ -25,6 +34,30 @@ async def test_create_merchant_duplicate(client, merchant_a):
     assert response.status_code == 409
 
 
+@pytest.mark.asyncio
+async def test_create_merchants_bulk(client, merchant_a):
+    response = await client.post(
+        "/merchants/bulk",
+        json={
+            "merchants": [
+                {"name": "carol", "percent_fee": "1.5"},
+                {"name": merchant_a["name"], "percent_fee": "1.0"},
+                {"name": "dave", "percent_fee": "2.0", "balance_shards": 4},
+                {"name": "carol", "percent_fee": "3.0"},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    data = response.json()["result"]
+    assert [item["status"] for item in data] == [200, 409, 200, 409]
+    assert data[0]["result"]["percent_fee"] == "1.50"
+    assert data[2]["result"]["balance_shards"] == 4
+
+    response = await client.get("/merchants/carol")
+    assert response.json()["result"]["percent_fee"] == "1.50"
+
+
 @pytest.mark.asyncio
 async def test_get_merchant(client, merchant_a, a_merchant_btc_balance, a_merchant_usd_balance):
     response = await client.get(f"/merchants/{merchant_a['name']}")
@@ -40,6 +73,18 @@ async def test_get_merchant(client, merchant_a, a_merchant_btc_balance, a_mercha
     assert "USD" in currencies
 
 
+@pytest.mark.asyncio
+async def test_get_merchant_renders_like_create(client, merchant_a, a_merchant_btc_balance):
+    response = await client.get(f"/merchants/{merchant_a['name']}")
+
+    data = response.json()["result"]
+    assert data["created"] == merchant_a["created"]
+    [balance] = data["balances"]
+    assert balance["amount"] == a_merchant_btc_balance["amount"] == "1.00000000"
+    assert balance["created"] == a_merchant_btc_balance["created"]
+    assert re.fullmatch(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d{6})?Z", balance["created"])
+
+
 @pytest.mark.asyncio
 async def test_get_merchant_not_found(client):
     response = await client.get("/merchants/123")
@@ -47,6 +92,77 @@ async def test_get_merchant_not_found(client):
     assert response.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_get_many_merchants_with_balances(
+    client, merchant_a, merchant_b, a_merchant_btc_balance, a_merchant_usd_balance
+):
+    response = await client.get(
+        "/merchants/balances", params={"names": f"{merchant_a['name']},{merchant_b['name']},123"}
+    )
+
+    assert response.status_code == 200
+    data = {m["name"]: m for m in response.json()["result"]}
+    assert set(data) == {merchant_a["name"], merchant_b["name"]}
+    assert [b["currency"] for b in data[merchant_a["name"]]["balances"]] == ["BTC", "USD"]
+    assert data[merchant_b["name"]]["balances"] == []
+
+    repo_merchants = await MerchantsRepo().search_with_balances([merchant_a["name"]])
+    assert [(b.currency, b.shard) for b in repo_merchants[0].balances] == [("BTC", 0), ("USD", 0)]
+
+
+@pytest.mark.asyncio
+async def test_merchant_etags(client, merchant_a, a_merchant_btc_balance):
+    for url in (
+        "/merchants/",
+        f"/merchants/{merchant_a['name']}",
+        f"/merchants/{merchant_a['name']}/balance",
+    ):
+        response = await client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        response = await client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    etags = {
+        url: (await client.get(url)).headers["etag"]
+        for url in (f"/merchants/{merchant_a['name']}", f"/merchants/{merchant_a['name']}/balance")
+    }
+    response = await client.post(
+        "/merchants/balance",
+        json={"merchant_id": merchant_a["id"], "currency": "USD", "initial_amount": "1.0"},
+    )
+    assert response.status_code == 200
+    for url, etag in etags.items():
+        response = await client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    etag = (await client.get("/merchants/")).headers["etag"]
+    await client.post("/merchants/", json={"name": "carol", "percent_fee": "1.0"})
+    response = await client.get("/merchants/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_merchant_etags_skip_full_read(
+    monkeypatch, client, merchant_a, a_merchant_btc_balance
+):
+    urls = (f"/merchants/{merchant_a['name']}", f"/merchants/{merchant_a['name']}/balance")
+    etags = {url: (await client.get(url)).headers["etag"] for url in urls}
+
+    async def full_read(*args, **kwargs):
+        raise AssertionError("revalidation must not load the merchant")
+
+    monkeypatch.setattr(MerchantsService, "get_merchants_with_balances", full_read)
+    monkeypatch.setattr(BalancesService, "get_balances", full_read)
+    for url, etag in etags.items():
+        response = await client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+
 @pytest.mark.asyncio
 async def test_get_all_merchants(client, merchant_a, merchant_b):
     response = await client.get("/merchants/")
@@ -58,3 +174,57 @@ async def test_get_all_merchants(client, merchant_a, merchant_b):
     names = {m["name"] for m in data}
     assert merchant_a["name"] in names
     assert merchant_b["name"] in names
+
+
+@pytest.mark.asyncio
+async def test_get_merchants_single_flight(client, monkeypatch, merchant_a, merchant_b):
+    calls = []
+    search = MerchantsRepo.search
+
+    async def slow_search(self, **filters):
+        calls.append(filters)
+        await asyncio.sleep(0.05)
+        return await search(self, **filters)
+
+    monkeypatch.setattr(MerchantsRepo, "search", slow_search)
+
+    responses = await asyncio.gather(*(client.get("/merchants/") for _ in range(10)))
+
+    assert len(calls) == 1
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.content for r in responses}) == 1
+
+
+@pytest.mark.asyncio
+async def test_repo_search_query_cache(client, merchant_a, merchant_b):
+    hits = metrics.counter("repo_query_cache_hits", table="merchants")
+    repo = MerchantsRepo()
+
+    first = await repo.search(name_in=[merchant_a["name"]], archived=False)
+    hits_before = hits.value
+    second = await repo.search(name_in=[merchant_a["name"], merchant_b["name"]], archived=False)
+
+    assert [m.name for m in first] == [merchant_a["name"]]
+    assert {m.name for m in second} == {merchant_a["name"], merchant_b["name"]}
+    assert hits.value == hits_before + 1
+
+
+@pytest.mark.asyncio
+async def test_merchant_cache(client, merchant_a, redis_client):
+    cache = get_merchant_cache()
+    hits = metrics.counter("merchant_cache_hits")
+
+    response = await client.get(f"/merchants/{merchant_a['name']}/balance")
+    assert response.status_code == 200
+    hits_before = hits.value
+    response = await client.get(f"/merchants/{merchant_a['name']}")
+    assert response.status_code == 200
+    assert hits.value == hits_before + 1
+
+    # another worker changed the merchant
+    await redis_client.publish(cache.channel, merchant_a["name"])
+    for _ in range(50):
+        if cache.local_cache.get(merchant_a["name"]) is None:
+            break
+        await asyncio.sleep(0.02)
+    assert cache.local_cache.get(merchant_a["name"]) is None
@@ -1,8 +1,25 @@
 import asyncio
+import csv
+import io
+import json
+import re
+from datetime import UTC, date, datetime, timedelta
 from decimal import Decimal
 
 import pytest
 
+from app.api.transfers.schemas import ImportTransferRow
+from app.infra.config import settings
+from app.infra.db.repos.partitions import get_partition_name, next_month
+from app.infra.db.repos.transfers import TransfersRepo
+from app.infra.metrics import metrics
+from app.infra.redis.lock import RedisLocks, get_coalescing_redis_locks
+from app.logic.factories import transfer_importer_factory
+from app.logic.transfers.archive import TransferArchive, TransferArchiver
+from app.logic.transfers.exceptions import TransferImportError
+from app.logic.transfers.group_commit import get_transfer_group_committer
+from app.logic.transfers.importer import read_csv_chunks
+from app.logic.transfers.partitions import get_transfer_partition_maintainer
 from tests.conftest import create_transfer, get_balance
 
 
@@ -219,6 +236,81 @@ async def test_get_transfers_filtered_currency(
     assert all(t["currency"] == "BTC" for t in data)
 
 
+@pytest.mark.asyncio
+async def test_get_transfers_renders_like_create(
+    client, merchant_a, merchant_b, a_merchant_btc_balance
+):
+    created = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "render-1"
+    )
+
+    response = await client.get("/transfers/", params={"from": merchant_a["name"]})
+
+    [transfer] = response.json()["result"]
+    expected = created.json()["result"]
+    assert transfer["amount"] == expected["amount"] == "0.10000000"
+    assert transfer["id"] == expected["id"]
+    assert transfer["created"] == expected["created"]
+    assert re.fullmatch(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d{6})?Z", transfer["created"])
+
+
+@pytest.mark.asyncio
+async def test_get_transfers_pagination(
+    client, merchant_a, merchant_b, a_merchant_btc_balance, b_merchant_btc_balance
+):
+    for i in range(5):
+        await create_transfer(
+            client, merchant_a["name"], merchant_b["name"], "0.01", "BTC", f"page-{i}"
+        )
+
+    keys = []
+    cursor = None
+    while True:
+        params = {"currency": "BTC", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/transfers", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["result"]) <= 2
+        keys += [t["idempotency_key"] for t in data["result"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(keys) == [f"page-{i}" for i in range(5)]
+
+    response = await client.get("/transfers", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_transfers(
+    client, monkeypatch, merchant_a, merchant_b, a_merchant_btc_balance, a_merchant_usd_balance
+):
+    monkeypatch.setattr(settings, "transfers_export_chunk_size", 2)
+    for i in range(5):
+        await create_transfer(
+            client, merchant_a["name"], merchant_b["name"], "0.01", "BTC", f"export-{i}"
+        )
+    await create_transfer(client, merchant_a["name"], merchant_b["name"], "1", "USD", "export-usd")
+
+    response = await client.get("/transfers/export", params={"currency": "BTC"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["idempotency_key"] for row in rows] == [f"export-{i}" for i in range(5)]
+    assert rows[0]["amount"] == "0.01000000"
+
+    response = await client.get(
+        "/transfers/export", params={"format": "csv", "from": merchant_a["name"]}
+    )
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 6
+    assert rows[-1]["currency"] == "USD"
+
+
 @pytest.mark.asyncio
 async def test_transfer_missing_idempotency_key(
     client, merchant_a, merchant_b, a_merchant_btc_balance
@@ -234,3 +326,512 @@ async def test_transfer_missing_idempotency_key(
     )
 
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_conditional_transfer(
+    conditional_mode, client, merchant_a, merchant_b, a_merchant_btc_balance
+):
+    response = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "conditional-1"
+    )
+
+    assert response.status_code == 200
+    assert response.json()["result"]["percent_fee"] == "2.00000000"
+
+    a_balance = await get_balance(client, merchant_a["name"], "BTC")
+    b_balance = await get_balance(client, merchant_b["name"], "BTC")
+
+    assert a_balance == Decimal("1.0") - Decimal("0.102")
+    assert b_balance == Decimal("0.1")
+
+
+@pytest.mark.asyncio
+async def test_conditional_transfer_errors(
+    conditional_mode, client, merchant_a, merchant_b, a_merchant_btc_balance
+):
+    insufficient = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.99", "BTC", "conditional-err-1"
+    )
+    no_balance = await create_transfer(
+        client, merchant_b["name"], merchant_a["name"], "0.1", "BTC", "conditional-err-2"
+    )
+    no_merchant = await create_transfer(
+        client, merchant_a["name"], "123", "0.1", "BTC", "conditional-err-3"
+    )
+
+    assert insufficient.status_code == 400
+    assert no_balance.status_code == 404
+    assert no_merchant.status_code == 404
+    assert await get_balance(client, merchant_a["name"], "BTC") == Decimal("1.0")
+
+
+@pytest.mark.asyncio
+async def test_conditional_transfer_idempotency_and_concurrency(
+    conditional_mode, client, merchant_a, merchant_b, a_merchant_usd_balance
+):
+    results = await asyncio.gather(
+        *[
+            create_transfer(
+                client, merchant_a["name"], merchant_b["name"], "250", "USD", f"cond-{i % 5}"
+            )
+            for i in range(10)
+        ]
+    )
+
+    successful = [r for r in results if r.status_code == 200]
+    failed = [r for r in results if r.status_code == 400]
+
+    assert len(successful) > 0
+    assert len(failed) > 0
+    assert len({r.json()["result"]["id"] for r in successful}) <= 3
+    assert await get_balance(client, merchant_a["name"], "USD") >= 0
+
+
+@pytest.mark.asyncio
+async def test_batch_transfers(client, merchant_a, merchant_b, a_merchant_btc_balance):
+    await create_transfer(client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "batch-0")
+
+    def item(amount, idempotency_key, to_merchant=merchant_b["name"]):
+        return {
+            "from_merchant": merchant_a["name"],
+            "to_merchant": to_merchant,
+            "amount": amount,
+            "currency": "BTC",
+            "idempotency_key": idempotency_key,
+        }
+
+    response = await client.post(
+        "/transfers/batch",
+        json={
+            "transfers": [
+                item("0.1", "batch-0"),
+                item("0.2", "batch-1"),
+                item("0.2", "batch-1"),
+                item("0.2", "batch-2", to_merchant="123"),
+                item("0.9", "batch-3"),
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    results = response.json()["result"]
+    assert [r["status"] for r in results] == [200, 200, 200, 404, 400]
+    assert results[1]["result"]["id"] == results[2]["result"]["id"]
+    assert "insufficient" in results[4]["error"].lower()
+
+    a_balance = await get_balance(client, merchant_a["name"], "BTC")
+    b_balance = await get_balance(client, merchant_b["name"], "BTC")
+
+    assert a_balance == Decimal("1.0") - Decimal("0.102") - Decimal("0.204")
+    assert b_balance == Decimal("0.3")
+
+
+@pytest.mark.asyncio
+async def test_group_commit_transfers(
+    group_commit_mode, client, merchant_a, merchant_b, a_merchant_usd_balance
+):
+    results = await asyncio.gather(
+        *[
+            create_transfer(
+                client, merchant_a["name"], merchant_b["name"], "100", "USD", f"group-{i}"
+            )
+            for i in range(12)
+        ]
+    )
+
+    assert [r.status_code for r in results].count(200) == 9
+    assert [r.status_code for r in results].count(400) == 3
+    assert await get_balance(client, merchant_a["name"], "USD") == Decimal("82")
+    assert await get_balance(client, merchant_b["name"], "USD") == Decimal("900")
+
+    response = await client.get("/metrics")
+    assert "transfer_group_commit_batch_size" in response.json()["summaries"]
+
+
+@pytest.mark.asyncio
+async def test_group_commit_opposite_transfers(
+    monkeypatch,
+    group_commit_mode,
+    client,
+    merchant_a,
+    merchant_b,
+    a_merchant_btc_balance,
+    b_merchant_btc_balance,
+):
+    # small groups commit concurrently while holding locks of both balances
+    monkeypatch.setattr(get_transfer_group_committer(), "max_items", 2)
+    results = await asyncio.gather(
+        *[
+            create_transfer(
+                client,
+                *((merchant_a["name"], merchant_b["name"])[:: 1 if i % 2 else -1]),
+                "0.01",
+                "BTC",
+                f"opposite-{i}",
+            )
+            for i in range(20)
+        ]
+    )
+
+    assert [r.status_code for r in results] == [200] * 20
+
+
+@pytest.mark.asyncio
+async def test_idempotency_retry_served_from_cache(
+    client, merchant_a, merchant_b, a_merchant_btc_balance
+):
+    response1 = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "cached-retry-1"
+    )
+    hits_before = (
+        (await client.get("/metrics"))
+        .json()["counters"]
+        .get("idempotency_cache_hits{layer=local}", 0)
+    )
+
+    response2 = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "cached-retry-1"
+    )
+    hits_after = (await client.get("/metrics")).json()["counters"][
+        "idempotency_cache_hits{layer=local}"
+    ]
+
+    assert response2.status_code == 200
+    assert response2.json() == response1.json()
+    assert hits_after == hits_before + 1
+
+
+@pytest.mark.asyncio
+async def test_redis_locks_acquire_many(redis_client):
+    locks = RedisLocks()
+    events = []
+
+    async def hold(name, keys):
+        async with locks.acquire_many(keys, timeout=5):
+            events.append(f"{name}-in")
+            await asyncio.sleep(0.05)
+            events.append(f"{name}-out")
+
+    await asyncio.gather(hold("first", ["a", "b"]), hold("second", ["b", "c"]))
+
+    assert events in (
+        ["first-in", "first-out", "second-in", "second-out"],
+        ["second-in", "second-out", "first-in", "first-out"],
+    )
+    assert await redis_client.keys("*") == []
+
+
+@pytest.mark.asyncio
+async def test_coalescing_locks_hand_off_between_local_waiters(redis_client):
+    locks = get_coalescing_redis_locks()
+    handoffs = metrics.counter("lock_handoffs", backend="redis")
+    handoffs_before = handoffs.value
+    active = []
+
+    async def hold(keys):
+        async with locks.acquire_many(keys, timeout=5):
+            assert not active
+            active.append(keys)
+            await asyncio.sleep(0.01)
+            active.remove(keys)
+
+    await asyncio.gather(*[hold(["a", "b"]) for _ in range(10)])
+
+    assert handoffs.value > handoffs_before
+    assert await redis_client.keys("*") == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lock_backend", ["postgres", "local"])
+async def test_lock_backends_concurrent_transfers(
+    monkeypatch, lock_backend, client, merchant_a, merchant_b, a_merchant_usd_balance
+):
+    monkeypatch.setattr(settings, "lock_backend", lock_backend)
+
+    results = await asyncio.gather(
+        *[
+            create_transfer(
+                client, merchant_a["name"], merchant_b["name"], "250", "USD", f"backend-{i}"
+            )
+            for i in range(5)
+        ]
+    )
+
+    assert {r.status_code for r in results} == {200, 400}
+    assert await get_balance(client, merchant_a["name"], "USD") >= 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transfer_mode", ["locking", "conditional"])
+async def test_sharded_balances(
+    monkeypatch, transfer_mode, client, merchant_a, a_merchant_usd_balance
+):
+    monkeypatch.setattr(settings, "transfer_mode", transfer_mode)
+    response = await client.post(
+        "/merchants", json={"name": "carol", "percent_fee": "1.0", "balance_shards": 4}
+    )
+    assert response.status_code == 200
+
+    results = await asyncio.gather(
+        *[
+            create_transfer(client, merchant_a["name"], "carol", "10", "USD", f"shard-in-{i}")
+            for i in range(8)
+        ]
+    )
+    assert all(r.status_code == 200 for r in results)
+
+    balances = (await client.get("/merchants/carol/balance")).json()["result"]
+    assert len(balances) == 1
+    assert Decimal(balances[0]["amount"]) == Decimal("80")
+
+    response = await create_transfer(client, "carol", merchant_a["name"], "75", "USD", "shard-out")
+
+    assert response.status_code == 200
+    assert await get_balance(client, "carol", "USD") == Decimal("80") - Decimal("75.75")
+
+
+@pytest.mark.asyncio
+async def test_optimistic_transfers(
+    monkeypatch, client, merchant_a, merchant_b, a_merchant_usd_balance
+):
+    monkeypatch.setattr(settings, "transfer_mode", "optimistic")
+
+    results = await asyncio.gather(
+        *[
+            create_transfer(
+                client, merchant_a["name"], merchant_b["name"], "250", "USD", f"optimistic-{i}"
+            )
+            for i in range(5)
+        ]
+    )
+
+    succeeded = sum(r.status_code == 200 for r in results)
+    a_balance = await get_balance(client, merchant_a["name"], "USD")
+    b_balance = await get_balance(client, merchant_b["name"], "USD")
+
+    assert {r.status_code for r in results} <= {200, 400}
+    assert a_balance == Decimal("1000") - succeeded * Decimal("255")
+    assert b_balance == succeeded * Decimal("250")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transfer_mode", ["locking", "optimistic"])
+async def test_db_fast_path_transfers(
+    monkeypatch, transfer_mode, client, merchant_a, merchant_b, a_merchant_usd_balance
+):
+    monkeypatch.setattr(settings, "transfer_mode", transfer_mode)
+    monkeypatch.setattr(settings, "db_fast_path", True)
+    monkeypatch.setattr(settings, "transfer_optimistic_max_retries", 20)
+
+    results = await asyncio.gather(
+        *[
+            create_transfer(
+                client, merchant_a["name"], merchant_b["name"], "200", "USD", f"fast-{i % 4}"
+            )
+            for i in range(8)
+        ]
+    )
+
+    assert all(r.status_code == 200 for r in results)
+    assert len({r.json()["result"]["id"] for r in results}) == 4
+    assert await get_balance(client, merchant_a["name"], "USD") == Decimal("184")
+    assert await get_balance(client, merchant_b["name"], "USD") == Decimal("800")
+
+
+@pytest.mark.asyncio
+async def test_import_transfers(
+    client, tmp_path, merchant_a, merchant_b, a_merchant_btc_balance, b_merchant_btc_balance
+):
+    path = tmp_path / "transfers.csv"
+    path.write_text(
+        "from_merchant,to_merchant,amount,currency,idempotency_key,created,percent_fee\n"
+        f"{merchant_a['name']},{merchant_b['name']},0.1,BTC,import-1,2024-01-01T00:00:00,\n"
+        f"{merchant_b['name']},{merchant_a['name']},0.2,BTC,import-2,,0\n"
+        f"{merchant_a['name']},{merchant_b['name']},0.3,ETH,import-3,,\n"
+    )
+    importer = transfer_importer_factory()
+    progress = []
+
+    def read(chunk_size: int):
+        for chunk in read_csv_chunks(str(path), chunk_size):
+            yield [ImportTransferRow.model_validate(row).model_dump() for row in chunk]
+
+    with pytest.raises(TransferImportError):
+        # alice has no ETH, the whole import is rolled back
+        await importer.run(read(2))
+    assert await get_balance(client, merchant_b["name"], "BTC") == Decimal("0.5")
+
+    path.write_text("\n".join(path.read_text().splitlines()[:-1]) + "\n")
+    await importer.create_partitions(read(1))
+    assert get_partition_name(date(2024, 1, 1)) in await TransfersRepo().get_partitions()
+    assert await importer.run(read(1), progress.append) == 2
+    assert progress == [1, 2]
+    assert await get_balance(client, merchant_a["name"], "BTC") == Decimal("1.098")
+    assert await get_balance(client, merchant_b["name"], "BTC") == Decimal("0.4")
+
+    response = await client.get("/transfers/", params={"from": merchant_a["name"]})
+    [transfer] = response.json()["result"]
+    assert transfer["created"].startswith("2024-01-01")
+
+    with pytest.raises(TransferImportError, match="import-2"):
+        await importer.run(read(2))
+
+
+@pytest.mark.asyncio
+async def test_import_with_concurrent_transfers(
+    monkeypatch, client, tmp_path, merchant_a, merchant_b, a_merchant_btc_balance
+):
+    monkeypatch.setattr(settings, "transfer_mode", "locking")
+    path = tmp_path / "transfers.csv"
+    path.write_text(
+        "from_merchant,to_merchant,amount,currency,idempotency_key,created,percent_fee\n"
+        + "".join(
+            f"{merchant_a['name']},{merchant_b['name']},0.001,BTC,concurrent-import-{i},,0\n"
+            for i in range(200)
+        )
+    )
+
+    def read():
+        for chunk in read_csv_chunks(str(path), 10):
+            yield [ImportTransferRow.model_validate(row).model_dump() for row in chunk]
+
+    imported, *responses = await asyncio.gather(
+        transfer_importer_factory().run(read()),
+        *[
+            create_transfer(
+                client, merchant_a["name"], merchant_b["name"], "0.01", "BTC", f"concurrent-{i}"
+            )
+            for i in range(20)
+        ],
+    )
+
+    assert imported == 200
+    assert all(r.status_code == 200 for r in responses)
+    # 200 imported transfers of 0.001 without fee, 20 live ones of 0.01 with alice's 2% fee
+    assert await get_balance(client, merchant_a["name"], "BTC") == Decimal("0.5960")
+    assert await get_balance(client, merchant_b["name"], "BTC") == Decimal("0.4")
+
+
+@pytest.mark.asyncio
+async def test_transfer_partitions(
+    monkeypatch,
+    client,
+    db_engine,
+    merchant_a,
+    merchant_b,
+    a_merchant_btc_balance,
+    b_merchant_btc_balance,
+):
+    monkeypatch.setattr(settings, "idempotency_cache_enabled", False)
+    maintainer = get_transfer_partition_maintainer()
+    month = datetime.now(UTC).date().replace(day=1)
+    created = await maintainer.ensure_partitions()
+    assert get_partition_name(month) in created
+    assert await maintainer.ensure_partitions() == []
+
+    response = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "partitioned-1"
+    )
+    assert response.status_code == 200
+    duplicate = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "partitioned-1"
+    )
+    assert duplicate.json()["result"]["id"] == response.json()["result"]["id"]
+
+    params = {"from": merchant_a["name"], "created_from": month.isoformat()}
+    response = await client.get("/transfers/", params=params)
+    assert len(response.json()["result"]) == 1
+    response = await client.get("/transfers/", params={**params, "created_to": month.isoformat()})
+    assert response.json()["result"] == []
+
+    assert await maintainer.detach_partitions(next_month(month)) == [get_partition_name(month)]
+    response = await client.get("/transfers/", params=params)
+    assert response.json()["result"] == []
+    # the key stays taken, its transfer is neither in the table nor in the archive
+    duplicate = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "partitioned-1"
+    )
+    assert duplicate.status_code == 409
+
+    async with db_engine.begin() as conn:
+        await conn.exec_driver_sql(f"DROP TABLE {get_partition_name(month)}")
+
+
+@pytest.mark.asyncio
+async def test_archive_transfers(
+    monkeypatch, client, tmp_path, merchant_a, merchant_b, a_merchant_btc_balance
+):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(settings, "transfers_archive_dir", str(tmp_path))
+    for i in range(3):
+        response = await create_transfer(
+            client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", f"archive-{i}"
+        )
+        assert response.status_code == 200
+
+    archiver = TransferArchiver(
+        TransfersRepo(), TransferArchive(str(tmp_path)), 0, batch_size=2, interval_seconds=0
+    )
+    assert await archiver.run(datetime.now(UTC) + timedelta(seconds=1)) == 3
+    assert list(tmp_path.glob("month=*/currency=BTC/*.parquet"))
+
+    params = {"from": merchant_a["name"], "limit": 2}
+    response = await client.get("/transfers/", params=params)
+    assert response.json()["result"] == []
+
+    response = await client.get("/transfers/", params={**params, "include_archived": True})
+    page = response.json()
+    response = await client.get(
+        "/transfers/", params={**params, "include_archived": True, "cursor": page["next_cursor"]}
+    )
+    keys = [t["idempotency_key"] for t in page["result"] + response.json()["result"]]
+    assert keys == ["archive-2", "archive-1", "archive-0"]
+    assert response.json()["next_cursor"] is None
+
+    response = await client.get("/transfers/", params={"currency": "USD", "include_archived": True})
+    assert response.json()["result"] == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transfer_mode", ["locking", "conditional", "optimistic"])
+async def test_replay_archived_transfer(
+    monkeypatch, transfer_mode, client, tmp_path, merchant_a, merchant_b, a_merchant_btc_balance
+):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(settings, "transfers_archive_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "transfer_mode", transfer_mode)
+    monkeypatch.setattr(settings, "idempotency_cache_enabled", False)
+    response = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "archived-replay"
+    )
+    transfer = response.json()["result"]
+
+    archiver = TransferArchiver(
+        TransfersRepo(), TransferArchive(str(tmp_path)), 0, batch_size=10, interval_seconds=0
+    )
+    assert await archiver.run(datetime.now(UTC) + timedelta(seconds=1)) == 1
+
+    response = await create_transfer(
+        client, merchant_a["name"], merchant_b["name"], "0.1", "BTC", "archived-replay"
+    )
+    assert response.status_code == 200
+    assert response.json()["result"] == transfer
+
+    response = await client.post(
+        "/transfers/batch",
+        json={
+            "transfers": [
+                {
+                    "from_merchant": merchant_a["name"],
+                    "to_merchant": merchant_b["name"],
+                    "amount": "0.1",
+                    "currency": "BTC",
+                    "idempotency_key": "archived-replay",
+                }
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["result"][0]["result"] == transfer
+    assert await get_balance(client, merchant_a["name"], "BTC") == Decimal("0.898")